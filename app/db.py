@@ -0,0 +1,79 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+# Overridable so tools (e.g. the benchmark suite) can work on a scratch database.
+DB_PATH = Path(os.getenv("ATILA_DB_PATH", str(BASE_DIR / "atila.db")))
+
+# How long a writer waits on SQLITE_BUSY before giving up. The batch scorer
+# holds the write lock for one transaction per pass, so this must cover it.
+BUSY_TIMEOUT_MS = int(os.getenv("ATILA_SQLITE_BUSY_TIMEOUT_MS", "15000"))
+POOL_SIZE = int(os.getenv("ATILA_DB_POOL_SIZE", "8"))
+POOL_MAX_OVERFLOW = int(os.getenv("ATILA_DB_POOL_MAX_OVERFLOW", "16"))
+# Per-connection cache of prepared statements (sqlite3 defaults to 128).
+STATEMENT_CACHE_SIZE = 512
+
+# WAL lets readers proceed while the scorer writes; NORMAL is durable across
+# application crashes in WAL mode and skips an fsync per commit.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+)
+
+_connect_args = {
+    "check_same_thread": False,
+    "timeout": BUSY_TIMEOUT_MS / 1000,
+    "cached_statements": STATEMENT_CACHE_SIZE,
+}
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+engine = create_engine(
+    f"sqlite:///{DB_PATH}",
+    echo=False,
+    connect_args=_connect_args,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+)
+event.listen(engine, "connect", _set_sqlite_pragmas)
+
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{DB_PATH}",
+    echo=False,
+    connect_args=_connect_args,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+)
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def get_session() -> Iterator[Session]:
+    """FastAPI dependency yielding a session bound to the shared engine.
+
+    For handlers that run CPU-bound or blocking work in the threadpool.
+    """
+    with Session(engine) as session:
+        yield session
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding an ``AsyncSession`` over aiosqlite."""
+    async with AsyncSessionLocal() as session:
+        yield session
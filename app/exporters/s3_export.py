@@ -0,0 +1,323 @@
+# ==========================================================
+# s3_export.py — Incremental Parquet export to S3-compatible storage
+# ==========================================================
+# Each run ships only the tickets changed since the previous run, per
+# project, as zstd Parquet files:
+#
+#   {prefix}/data/project_id=3/{run_id}-00000.parquet
+#   {prefix}/manifests/{run_id}.json      files, row counts, watermarks
+#   {prefix}/_latest.json                 copy of the newest manifest
+#
+# Readers union the files of every manifest and keep the row with the
+# newest ``updated_at`` per ticket ``id``. Watermarks only advance after
+# the manifest is written, so a failed run is simply repeated in full.
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import boto3
+import pyarrow.parquet as pq
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from ..services.models import ExportWatermark, Project, Ticket
+from .tabular import DEFAULT_CHUNK_SIZE, TICKET_COLUMNS, arrow_schema, record_batches, select_columns
+
+log = logging.getLogger(__name__)
+
+S3_ENDPOINT_URL = os.getenv("ATILA_S3_ENDPOINT_URL") or None
+S3_BUCKET = os.getenv("ATILA_S3_BUCKET", "")
+S3_PREFIX = os.getenv("ATILA_S3_PREFIX", "atila/tickets")
+PART_SIZE = int(os.getenv("ATILA_S3_PART_SIZE_MB", "8")) * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+MAX_FILE_ROWS = 1_000_000
+# Rows younger than this are left for the next run, so a transaction that
+# commits late with an older updated_at cannot slip under the watermark.
+SETTLE_SECONDS = float(os.getenv("ATILA_EXPORT_SETTLE_SECONDS", "5"))
+
+EXPORT_FIELDS = list(TICKET_COLUMNS)
+
+
+def s3_client(endpoint_url: Optional[str] = S3_ENDPOINT_URL):
+    """boto3 S3 client; ``endpoint_url`` points it at any S3-compatible store."""
+    return boto3.client("s3", endpoint_url=endpoint_url)
+
+
+# ---------------------------
+# Multipart Upload Stream
+# ---------------------------
+class MultipartUpload:
+    """Write-only file object that uploads an S3 object part by part.
+
+    At most one part is buffered. Objects smaller than one part are sent
+    with a single ``put_object`` instead.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = PART_SIZE,
+                 content_type: str = "application/vnd.apache.parquet"):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.content_type = content_type
+        self.closed = False
+        self.size = 0
+        self._buf = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Dict[str, Any]] = []
+
+    def write(self, data) -> int:
+        self._buf += data
+        self.size += len(data)
+        while len(self._buf) >= self.part_size:
+            self._upload_part(bytes(self._buf[:self.part_size]))
+            del self._buf[:self.part_size]
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self) -> None:
+        pass
+
+    def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            resp = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type,
+            )
+            self._upload_id = resp["UploadId"]
+        number = len(self._parts) + 1
+        resp = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=body,
+        )
+        self._parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self.key, Body=bytes(self._buf), ContentType=self.content_type,
+            )
+        else:
+            if self._buf:
+                self._upload_part(bytes(self._buf))
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+        self._buf = bytearray()
+
+    def abort(self) -> None:
+        self.closed = True
+        self._buf = bytearray()
+        if self._upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+
+
+# ---------------------------
+# Delta Export
+# ---------------------------
+@dataclass
+class DeltaFile:
+    key: str
+    project_id: int
+    rows: int = 0
+    bytes: int = 0
+    min_updated_at: Optional[datetime] = None
+    max_updated_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "project_id": self.project_id,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "min_updated_at": self.min_updated_at.isoformat() if self.min_updated_at else None,
+            "max_updated_at": self.max_updated_at.isoformat() if self.max_updated_at else None,
+        }
+
+
+@dataclass
+class DeltaRun:
+    run_id: str
+    target: str
+    cutoff: datetime
+    files: List[DeltaFile] = field(default_factory=list)
+    watermarks: Dict[int, Tuple[Optional[datetime], int]] = field(default_factory=dict)
+
+    @property
+    def rows(self) -> int:
+        return sum(f.rows for f in self.files)
+
+    def manifest(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "target": self.target,
+            "cutoff": self.cutoff.isoformat(),
+            "format": "parquet",
+            "compression": "zstd",
+            "columns": EXPORT_FIELDS,
+            "rows": self.rows,
+            "files": [f.as_dict() for f in self.files],
+            "watermarks": {
+                str(pid): {"updated_at": ts.isoformat() if ts else None, "ticket_id": tid}
+                for pid, (ts, tid) in sorted(self.watermarks.items())
+            },
+        }
+
+
+class DeltaExporter:
+    """Ship tickets changed since each project's watermark to S3 as Parquet."""
+
+    def __init__(self, engine, client, bucket: str, prefix: str = S3_PREFIX,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, part_size: int = PART_SIZE,
+                 max_file_rows: int = MAX_FILE_ROWS):
+        self.engine = engine
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.chunk_size = chunk_size
+        self.part_size = part_size
+        self.max_file_rows = max_file_rows
+        self.target = f"s3://{bucket}/{self.prefix}"
+
+    def run(self, project_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> DeltaRun:
+        now = now or datetime.utcnow()
+        run = DeltaRun(run_id=now.strftime("%Y%m%dT%H%M%S%fZ"), target=self.target,
+                       cutoff=now - timedelta(seconds=SETTLE_SECONDS))
+
+        with Session(self.engine) as session:
+            if project_ids is None:
+                project_ids = session.execute(select(Project.id).order_by(Project.id)).scalars().all()
+            marks = {
+                w.project_id: w for w in session.execute(
+                    select(ExportWatermark).where(ExportWatermark.target == self.target)
+                ).scalars()
+            }
+
+        for pid in project_ids:
+            mark = marks.get(pid)
+            position = self._export_project(run, pid, mark)
+            if position is not None:
+                run.watermarks[pid] = position
+
+        if not run.files:
+            log.info("Delta export to %s: nothing changed", self.target)
+            return run
+
+        body = json.dumps(run.manifest(), indent=2).encode()
+        for key in (f"{self.prefix}/manifests/{run.run_id}.json", f"{self.prefix}/_latest.json"):
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType="application/json")
+        self._save_watermarks(run, now)
+        log.info("Delta export to %s: %d rows in %d files", self.target, run.rows, len(run.files))
+        return run
+
+    def _delta_stmt(self, project_id: int, mark: Optional[ExportWatermark], cutoff: datetime):
+        stmt = select(*select_columns(EXPORT_FIELDS)).where(Ticket.project_id == project_id)
+        if mark is None:
+            # First export also picks up legacy rows that never had updated_at.
+            stmt = stmt.where(or_(Ticket.updated_at.is_(None), Ticket.updated_at <= cutoff))
+        else:
+            stmt = stmt.where(Ticket.updated_at <= cutoff)
+            if mark.updated_at is not None:
+                stmt = stmt.where(or_(
+                    Ticket.updated_at > mark.updated_at,
+                    and_(Ticket.updated_at == mark.updated_at, Ticket.id > mark.ticket_id),
+                ))
+        return stmt.order_by(Ticket.updated_at, Ticket.id)
+
+    def _export_project(self, run: DeltaRun, project_id: int,
+                        mark: Optional[ExportWatermark]) -> Optional[Tuple[Optional[datetime], int]]:
+        schema = arrow_schema(EXPORT_FIELDS)
+        ts_col, id_col = EXPORT_FIELDS.index("updated_at"), EXPORT_FIELDS.index("id")
+        position = None
+        upload = writer = current = None
+
+        def finish():
+            writer.close()
+            upload.close()
+            current.bytes = upload.size
+            run.files.append(current)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(self._delta_stmt(project_id, mark, run.cutoff))
+                for _, batch in record_batches(result, EXPORT_FIELDS, self.chunk_size):
+                    if writer is not None and current.rows >= self.max_file_rows:
+                        finish()
+                        writer = None
+                    if writer is None:
+                        seq = sum(1 for f in run.files if f.project_id == project_id)
+                        key = f"{self.prefix}/data/project_id={project_id}/{run.run_id}-{seq:05d}.parquet"
+                        upload = MultipartUpload(self.client, self.bucket, key, self.part_size)
+                        writer = pq.ParquetWriter(upload, schema, compression="zstd")
+                        current = DeltaFile(key=key, project_id=project_id)
+                    writer.write_batch(batch)
+                    stamps = batch.column(ts_col)
+                    current.rows += batch.num_rows
+                    current.min_updated_at = current.min_updated_at or stamps[0].as_py()
+                    current.max_updated_at = stamps[-1].as_py()
+                    position = (stamps[-1].as_py(), batch.column(id_col)[-1].as_py())
+                if writer is not None:
+                    finish()
+        except Exception:
+            if upload is not None and not upload.closed:
+                upload.abort()
+            raise
+        return position
+
+    def _save_watermarks(self, run: DeltaRun, now: datetime) -> None:
+        rows = {f.project_id: 0 for f in run.files}
+        for f in run.files:
+            rows[f.project_id] += f.rows
+        with Session(self.engine) as session:
+            for pid, (updated_at, ticket_id) in run.watermarks.items():
+                mark = session.execute(
+                    select(ExportWatermark).where(
+                        ExportWatermark.target == self.target, ExportWatermark.project_id == pid,
+                    )
+                ).scalar_one_or_none()
+                if mark is None:
+                    mark = ExportWatermark(target=self.target, project_id=pid)
+                    session.add(mark)
+                mark.updated_at = updated_at
+                mark.ticket_id = ticket_id
+                mark.exported_at = now
+                mark.rows = rows.get(pid, 0)
+            session.commit()
+
+
+# ---------------------------
+# CLI (nightly job)
+# ---------------------------
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export changed tickets to S3 as Parquet")
+    parser.add_argument("--bucket", default=S3_BUCKET, required=not S3_BUCKET)
+    parser.add_argument("--prefix", default=S3_PREFIX)
+    parser.add_argument("--endpoint-url", default=S3_ENDPOINT_URL)
+    parser.add_argument("--project", type=int, action="append", dest="projects")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from ..db import engine
+    from ..services.models import Base, upgrade_schema
+
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    exporter = DeltaExporter(engine, s3_client(args.endpoint_url), args.bucket, args.prefix,
+                             chunk_size=args.chunk_size)
+    run = exporter.run(args.projects)
+    print(json.dumps(run.manifest(), indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,244 @@
+# ==========================================================
+# tabular.py — Chunked Parquet / Arrow IPC / CSV ticket export
+# ==========================================================
+from __future__ import annotations
+
+import zipfile
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+from sqlalchemy import Date, DateTime, Float, Integer, String, select, type_coerce
+
+from ..services.models import Ticket
+from ..services.timestamps import parse_timestamps
+
+DEFAULT_CHUNK_SIZE = 50_000
+TICKET_COLUMNS = {c.name: c for c in Ticket.__table__.columns}
+PARTITION_COLUMNS = ("project_id", "status")
+# Export order follows the rank index, so one partition's rows are contiguous.
+EXPORT_ORDER = ("project_id", "status", "ticket_order_id", "id")
+HIVE_NULL = "__HIVE_DEFAULT_PARTITION__"
+
+
+# ---------------------------
+# Schema
+# ---------------------------
+def _arrow_type(column) -> pa.DataType:
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(names: Sequence[str]) -> pa.Schema:
+    return pa.schema([pa.field(n, _arrow_type(TICKET_COLUMNS[n])) for n in names])
+
+
+def _to_array(values: List[Any], type_: pa.DataType) -> pa.Array:
+    # Dates are read as their stored ISO text and converted by Arrow in bulk.
+    if pa.types.is_timestamp(type_) or pa.types.is_date(type_):
+        text = pa.array(values, pa.string())
+        try:
+            return text.cast(type_)
+        except pa.ArrowInvalid:
+            parsed = parse_timestamps(values)
+            if pa.types.is_date(type_):
+                parsed = [d.date() if d else None for d in parsed]
+            return pa.array(parsed, type_)
+    return pa.array(values, type_)
+
+
+# ---------------------------
+# Chunked Reads
+# ---------------------------
+def select_columns(names: Sequence[str]) -> list:
+    """Ticket columns for ``names``; dates come back as their stored text."""
+    return [
+        type_coerce(TICKET_COLUMNS[n], String).label(n)
+        if isinstance(TICKET_COLUMNS[n].type, (Date, DateTime)) else TICKET_COLUMNS[n]
+        for n in names
+    ]
+
+
+def record_batches(
+    result, names: Sequence[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Tuple[Tuple[Any, ...], pa.RecordBatch]]:
+    """Turn a streaming result into ``(partition_key, RecordBatch)`` pairs.
+
+    Columns after ``names`` are the partition key; a batch never spans two
+    keys. Rows are pulled with ``fetchmany``, so memory is bounded by the
+    chunk size.
+    """
+    schema = arrow_schema(names)
+    width = len(names)
+    for rows in result.partitions(chunk_size):
+        start = 0
+        while start < len(rows):
+            key = tuple(rows[start][width:])
+            end = start + 1
+            while end < len(rows) and tuple(rows[end][width:]) == key:
+                end += 1
+            columns = list(zip(*rows[start:end]))
+            arrays = [_to_array(list(columns[i]), schema.field(i).type) for i in range(width)]
+            yield key, pa.RecordBatch.from_arrays(arrays, schema=schema)
+            start = end
+
+
+def iter_ticket_batches(
+    conn,
+    names: Sequence[str],
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    partition_by: Sequence[str] = (),
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Tuple[Tuple[Any, ...], pa.RecordBatch]]:
+    """Yield ``(partition_key, RecordBatch)`` with at most ``chunk_size`` rows.
+
+    One SELECT is stepped through in chunks, so the export reads one
+    consistent snapshot. Rows come out ordered by the partition columns
+    first, then in rank order.
+    """
+    order = list(partition_by) + [c for c in EXPORT_ORDER if c not in partition_by]
+    extra = [TICKET_COLUMNS[p].label(f"_part_{p}") for p in partition_by]
+    stmt = select(*select_columns(names), *extra)
+    if project_id is not None:
+        stmt = stmt.where(Ticket.project_id == project_id)
+    if status is not None:
+        stmt = stmt.where(Ticket.status == status)
+    stmt = stmt.order_by(*(TICKET_COLUMNS[c] for c in order))
+    yield from record_batches(conn.execute(stmt), names, chunk_size)
+
+
+# ---------------------------
+# Writers
+# ---------------------------
+class _ByteSink:
+    """Write-only, non-seekable file object that hands its bytes back on drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _drained(sink: _ByteSink) -> Iterator[bytes]:
+    data = sink.drain()
+    if data:
+        yield data
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    extension: str
+    media_type: str
+    open_writer: Callable[[Any, pa.Schema], Any]
+    # Parquet is compressed internally; storing it again in the zip is wasted work.
+    zip_compression: int
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "parquet": ExportFormat(
+        "parquet", "application/vnd.apache.parquet",
+        lambda sink, schema: pq.ParquetWriter(sink, schema, compression="zstd"),
+        zipfile.ZIP_STORED,
+    ),
+    "arrow": ExportFormat(
+        "arrows", "application/vnd.apache.arrow.stream",
+        lambda sink, schema: pa_ipc.new_stream(sink, schema),
+        zipfile.ZIP_STORED,
+    ),
+    "csv": ExportFormat(
+        "csv", "text/csv",
+        lambda sink, schema: pa_csv.CSVWriter(sink, schema),
+        zipfile.ZIP_DEFLATED,
+    ),
+}
+
+
+def partition_path(partition_by: Sequence[str], key: Tuple[Any, ...], extension: str) -> str:
+    """Hive-style member name, e.g. ``project_id=3/status=Active/part-0.parquet``."""
+    parts = [
+        f"{col}={HIVE_NULL if value is None else quote(str(value), safe='')}"
+        for col, value in zip(partition_by, key)
+    ]
+    return "/".join(parts + [f"part-0.{extension}"])
+
+
+def stream_export(
+    batches: Iterator[Tuple[Tuple[Any, ...], pa.RecordBatch]],
+    names: Sequence[str],
+    fmt: ExportFormat,
+    partition_by: Sequence[str] = (),
+) -> Iterator[bytes]:
+    """Encode batches as one file, or as a zip of Hive partitions.
+
+    Bytes are yielded after every batch, so the response starts before
+    the query finishes and nothing larger than a chunk is buffered.
+    """
+    schema = arrow_schema(names)
+    sink = _ByteSink()
+
+    if not partition_by:
+        writer = fmt.open_writer(sink, schema)
+        for _, batch in batches:
+            writer.write_batch(batch)
+            yield from _drained(sink)
+        writer.close()
+        yield from _drained(sink)
+        return
+
+    archive = zipfile.ZipFile(sink, "w", compression=fmt.zip_compression)
+    member = writer = None
+    member_sink = _ByteSink()
+    current = None
+
+    def close_member():
+        writer.close()
+        member.write(member_sink.drain())
+        member.close()
+
+    for key, batch in batches:
+        if key != current:
+            if writer is not None:
+                close_member()
+            current = key
+            member = archive.open(partition_path(partition_by, key, fmt.extension), "w", force_zip64=True)
+            writer = fmt.open_writer(member_sink, schema)
+        writer.write_batch(batch)
+        member.write(member_sink.drain())
+        yield from _drained(sink)
+    if writer is not None:
+        close_member()
+    archive.close()
+    yield from _drained(sink)
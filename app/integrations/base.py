@@ -0,0 +1,363 @@
+# ==========================================================
+# base.py — Shared plumbing for platform sync clients
+# ==========================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..services.ingest import IngestReport, TicketUpserter
+from ..services.models import SyncCursor
+from ..services.normalizers import load_platform_map
+from ..services.rescoring import scheduler
+from ..services.timestamps import parse_timestamp
+
+log = logging.getLogger(__name__)
+
+# Longest pause a rate limit may impose before the sync gives up instead.
+MAX_RATE_WAIT = float(os.getenv("ATILA_SYNC_MAX_RATE_WAIT_SECONDS", "900"))
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+# Checkpoints are stored as naive UTC in this format, whatever the platform uses.
+CURSOR_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+T = TypeVar("T")
+
+
+class RateLimited(RuntimeError):
+    """The platform asked us to wait longer than MAX_RATE_WAIT."""
+
+
+# ---------------------------
+# Sync Checkpoints
+# ---------------------------
+def load_cursor(engine, source: str, scope: str) -> SyncCursor:
+    """The stored checkpoint for ``(source, scope)``, or a fresh detached one."""
+    with Session(engine, expire_on_commit=False) as session:
+        cursor = session.execute(
+            select(SyncCursor).where(SyncCursor.source == source, SyncCursor.scope == scope)
+        ).scalar_one_or_none()
+    return cursor or SyncCursor(source=source, scope=scope, items=0)
+
+
+def save_cursor(engine, source: str, scope: str, cursor: Optional[str], etag: Optional[str] = None,
+                items: int = 0) -> None:
+    with Session(engine) as session:
+        row = session.execute(
+            select(SyncCursor).where(SyncCursor.source == source, SyncCursor.scope == scope)
+        ).scalar_one_or_none()
+        if row is None:
+            row = SyncCursor(source=source, scope=scope, items=0)
+            session.add(row)
+        row.cursor = cursor
+        row.etag = etag
+        row.synced_at = datetime.utcnow()
+        row.items = (row.items or 0) + items
+        session.commit()
+
+
+@dataclass
+class SyncResult:
+    """Outcome of syncing one scope; ``not_modified`` means a 304 short-circuit."""
+    source: str
+    scope: str
+    report: IngestReport
+    pages: int = 0
+    not_modified: bool = False
+    cursor: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        body = {
+            "source": self.source,
+            "scope": self.scope,
+            "pages": self.pages,
+            "not_modified": self.not_modified,
+            "cursor": self.cursor,
+            **self.report.as_dict(),
+        }
+        body.update(self.extra)
+        return body
+
+
+# ---------------------------
+# Rate Limits + Retries
+# ---------------------------
+class RateLimiter:
+    """Paces one client's requests and holds them while the platform says to back off.
+
+    ``rate`` caps requests per second. Understands ``Retry-After`` and
+    ``X-RateLimit-Remaining``/``-Reset`` (epoch seconds as sent by GitHub,
+    or an ISO timestamp as sent by Jira).
+    """
+
+    def __init__(self, max_wait: float = MAX_RATE_WAIT, rate: Optional[float] = None):
+        self.max_wait = max_wait
+        self.interval = 1.0 / rate if rate else 0.0
+        self._resume_at = 0.0
+        self._next_slot = 0.0
+        self.waits = 0
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            if delay > self.max_wait:
+                raise RateLimited(f"Rate limited for another {delay:.0f}s")
+            self.waits += 1
+            await asyncio.sleep(delay)
+        if self.interval:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+
+    def _pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + max(seconds, 0.0))
+
+    def observe(self, response: httpx.Response) -> bool:
+        """Record the response's limit headers; True when it should be retried."""
+        headers = response.headers
+        limited = response.status_code == 429 or (
+            response.status_code == 403 and headers.get("X-RateLimit-Remaining") == "0"
+        )
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None and (limited or response.status_code == 503):
+            self._pause(_seconds_until(retry_after))
+            return True
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            self._pause(_seconds_until(headers["X-RateLimit-Reset"]))
+        return limited
+
+
+def _seconds_until(value: str) -> float:
+    """Seconds to wait for a Retry-After / reset header value."""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        when = parse_timestamp(value)
+        if when is None:
+            try:
+                when = parsedate_to_datetime(value).replace(tzinfo=None)
+            except (TypeError, ValueError):
+                return 60.0
+        return (when - datetime.utcnow()).total_seconds()
+    # Small numbers are a delay, large ones an epoch timestamp.
+    return number if number < 1e9 else number - time.time()
+
+
+async def fetch(client: httpx.AsyncClient, limiter: RateLimiter, method: str, url: str,
+                **kwargs) -> httpx.Response:
+    """One API call with rate-limit pauses and retries on 5xx/transport errors."""
+    for attempt in range(MAX_RETRIES):
+        await limiter.wait()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            log.warning("%s %s failed (%s); retrying", method, url, e)
+            await asyncio.sleep(min(2 ** attempt, 30) + random.random())
+            continue
+        if limiter.observe(response):
+            log.info("%s %s rate limited; backing off", method, url)
+            continue
+        if response.status_code >= 500 and attempt < MAX_RETRIES - 1:
+            await asyncio.sleep(min(2 ** attempt, 30) + random.random())
+            continue
+        return response
+    response.raise_for_status()
+    return response
+
+
+async def as_completed_bounded(factories: Iterable[Callable[[], Awaitable[T]]],
+                               limit: int) -> AsyncIterator[T]:
+    """Yield results as they finish, with at most ``limit`` fetched but unconsumed.
+
+    A new request starts only when the consumer has taken a result, so a
+    slow database write holds back the fetches instead of piling pages up
+    in memory.
+    """
+    pending_factories = iter(factories)
+    running, ready = set(), []
+    try:
+        for factory in pending_factories:
+            running.add(asyncio.ensure_future(factory()))
+            if len(running) >= limit:
+                break
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            ready = list(done)
+            while ready:
+                yield ready.pop().result()
+                factory = next(pending_factories, None)
+                if factory is not None:
+                    running.add(asyncio.ensure_future(factory()))
+    finally:
+        for task in running:
+            task.cancel()
+        for task in ready:
+            if not task.cancelled():
+                task.exception()  # finished alongside a failure; nothing left to report it to
+
+
+def server_time(response: httpx.Response) -> Optional[datetime]:
+    """The response's ``Date`` header as naive UTC."""
+    try:
+        return parsedate_to_datetime(response.headers["Date"]).astimezone(timezone.utc).replace(tzinfo=None)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def pooled_client(base_url: str, concurrency: int, headers: Optional[Dict[str, str]] = None,
+                  **kwargs) -> httpx.AsyncClient:
+    """AsyncClient whose keep-alive pool is sized to the page concurrency."""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        **kwargs,
+    )
+
+
+# ---------------------------
+# Offset-Paged Incremental Sync
+# ---------------------------
+@dataclass
+class Page:
+    records: List[Dict[str, Any]]
+    total: int
+    # Offset increment the server actually honoured (it may cap page size).
+    step: int
+    server_time: Optional[datetime] = None
+
+
+class PagedSync(ABC):
+    """Incremental sync over an offset-paged listing sorted by last update.
+
+    Subclasses implement ``fetch_page`` and ``updated_at``. The first page
+    reports the total; the remaining offsets are fetched in parallel
+    (``concurrency`` at a time) and each page is normalized and upserted
+    as it arrives. The checkpoint advances as soon as every page before it
+    has been written, so a sync cut short by an outage resumes from there.
+    If records changed during a multi-page listing, later pages may have
+    shifted under us and the checkpoint is left where it started.
+    """
+
+    source = ""
+
+    def __init__(self, engine, client: httpx.AsyncClient, platform_map=None, concurrency: int = 4,
+                 project_id: Optional[int] = None, page_size: int = 100, rate: Optional[float] = None,
+                 owns_client: bool = False):
+        self.engine = engine
+        self.client = client
+        self.platform_map = platform_map if platform_map is not None else load_platform_map()
+        self.concurrency = concurrency
+        self.project_id = project_id
+        self.page_size = page_size
+        self.limiter = RateLimiter(rate=rate)
+        self._owns_client = owns_client
+        self._requests = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._requests:
+            response = await fetch(self.client, self.limiter, method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @abstractmethod
+    async def fetch_page(self, scope: str, since: Optional[datetime], offset: int) -> Page:
+        """One page of ``scope`` updated at or after ``since``, starting at ``offset``."""
+
+    @abstractmethod
+    def updated_at(self, record: Dict[str, Any]) -> Optional[datetime]:
+        """The record's last-update time in naive UTC, or None if it has none."""
+
+    def truncate(self, stamp: datetime) -> datetime:
+        """Round a checkpoint down to the precision the platform's filter compares at."""
+        return stamp.replace(microsecond=0)
+
+    async def sync_scope(self, scope: str) -> SyncResult:
+        stored = await asyncio.to_thread(load_cursor, self.engine, self.source, scope)
+        since = datetime.strptime(stored.cursor, CURSOR_FORMAT) if stored.cursor else None
+        first = await self.fetch_page(scope, since, 0)
+        step = first.step or self.page_size
+        offsets = list(range(step, first.total, step))
+
+        session = Session(self.engine)
+        upserter = TicketUpserter(session, self.source, self.platform_map, project_id=self.project_id)
+        newest: Dict[int, Optional[datetime]] = {}
+        checkpoint = stored.cursor
+        moved = False
+
+        async def ingest(offset: int, page: Page) -> None:
+            nonlocal checkpoint, moved
+            stamps = [self.updated_at(r) for r in page.records]
+            await asyncio.to_thread(upserter.upsert_chunk, list(enumerate(page.records, offset)))
+            newest[offset] = max((s for s in stamps if s), default=None)
+            if first.server_time and any(s and s >= first.server_time for s in stamps):
+                moved = True
+            if not moved:
+                checkpoint = await self._advance(scope, checkpoint, newest, step)
+
+        async def fetch_at(offset: int):
+            return offset, await self.fetch_page(scope, since, offset)
+
+        try:
+            await ingest(0, first)
+            factories = [lambda o=o: fetch_at(o) for o in offsets]
+            async for offset, page in as_completed_bounded(factories, self.concurrency):
+                await ingest(offset, page)
+        finally:
+            session.close()
+            scheduler.mark_dirty(upserter.report.project_ids)
+
+        if moved and offsets:
+            log.info("%s %s changed during a paged sync; keeping cursor %s", self.source, scope, stored.cursor)
+            checkpoint = stored.cursor
+        await asyncio.to_thread(save_cursor, self.engine, self.source, scope, checkpoint, None,
+                                upserter.report.received)
+        return SyncResult(self.source, scope, upserter.report, pages=1 + len(offsets), cursor=checkpoint,
+                          extra={"total": first.total})
+
+    async def sync_scopes(self, scopes: Iterable[str]) -> List[SyncResult]:
+        return list(await asyncio.gather(*(self.sync_scope(s) for s in scopes)))
+
+    async def _advance(self, scope: str, checkpoint: Optional[str],
+                       newest: Dict[int, Optional[datetime]], step: int) -> Optional[str]:
+        """Move the checkpoint to the end of the contiguous run of written pages."""
+        offset, latest = 0, None
+        while offset in newest:
+            latest = newest[offset] or latest
+            offset += step
+        if latest is None:
+            return checkpoint
+        value = self.truncate(latest).strftime(CURSOR_FORMAT)
+        if value == checkpoint:
+            return checkpoint
+        await asyncio.to_thread(save_cursor, self.engine, self.source, scope, value, None, 0)
+        return value
@@ -0,0 +1,327 @@
+# ==========================================================
+# engine.py — Scheduled sync of all configured integrations
+# ==========================================================
+# Each source polls its scopes (repos, Jira projects, SNOW tables, Azure
+# projects) every ``interval`` seconds. Jobs go through one bounded queue
+# to a fixed pool of workers, so at most ``workers`` scopes sync at once,
+# a scope is never queued twice, and a full queue defers the rest of a
+# source's scopes to the next tick instead of growing without bound.
+#
+# Every uvicorn worker runs an engine, but only the one holding the leader
+# lock (a file lock next to the database) runs the schedule; the others
+# keep retrying it each tick and take over if the leader exits. Syncs
+# triggered through the API run on whichever worker received the request.
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..services.normalizers import load_platform_map
+from .base import SyncResult
+
+try:  # leader election across uvicorn workers (POSIX only)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev boxes run one worker
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+SYNC_WORKERS = int(os.getenv("ATILA_SYNC_WORKERS", "4"))
+SYNC_QUEUE_SIZE = int(os.getenv("ATILA_SYNC_QUEUE_SIZE", "64"))
+SYNC_INTERVAL = float(os.getenv("ATILA_SYNC_INTERVAL_SECONDS", "300"))
+TICK_SECONDS = 1.0
+HISTORY = 20
+
+# source -> (scopes env var, settings that must be present, default requests/second)
+SOURCE_ENV: Dict[str, Tuple[str, Tuple[str, ...], float]] = {
+    "github": ("ATILA_GITHUB_REPOS", (), 10.0),
+    "jira": ("ATILA_JIRA_PROJECTS", ("ATILA_JIRA_URL",), 10.0),
+    "servicenow": ("ATILA_SNOW_TABLES", ("ATILA_SNOW_URL",), 5.0),
+    "azure": ("ATILA_AZURE_PROJECTS", ("ATILA_AZURE_ORG_URL",), 10.0),
+}
+
+
+class QueueFull(RuntimeError):
+    """The sync queue is at capacity; try again later."""
+
+
+class LeaderLock:
+    """Exclusive advisory file lock, taken without blocking and held until released."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+        self.held = False
+
+    def acquire(self) -> bool:
+        if self.held:
+            return True
+        if fcntl is not None:
+            fh = open(self.path, "a")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                fh.close()
+                return False
+            self._fh = fh
+        self.held = True
+        return True
+
+    def release(self) -> None:
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self.held = False
+
+
+@dataclass
+class SourceSpec:
+    name: str
+    scopes: List[str]
+    interval: float = SYNC_INTERVAL
+    rate: Optional[float] = None
+    # (engine, platform_map, rate) -> client exposing ``sync_scope`` and ``aclose``
+    factory: Optional[Callable[..., Any]] = None
+
+
+@dataclass
+class SourceState:
+    next_run: float = 0.0
+    runs: int = 0
+    failures: int = 0
+    deferred: int = 0
+    pending: List[str] = field(default_factory=list)
+    last_run: Optional[datetime] = None
+    last_error: Optional[str] = None
+    history: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=HISTORY))
+
+
+def _client_factory(name: str) -> Callable[..., Any]:
+    def build(engine, platform_map, rate):
+        if name == "github":
+            from .github import GitHubSync
+            return GitHubSync(engine, platform_map, rate=rate)
+        if name == "jira":
+            from .jira import JiraSync
+            return JiraSync(engine, platform_map, rate=rate)
+        if name == "servicenow":
+            from .service_now import ServiceNowSync
+            return ServiceNowSync(engine, platform_map, rate=rate)
+        from .azure import AzureSync
+        return AzureSync(engine, platform_map, rate=rate)
+    return build
+
+
+def sources_from_env() -> Dict[str, SourceSpec]:
+    """Sources with scopes (and required settings) configured in the environment."""
+    specs = {}
+    for name, (scopes_var, required, default_rate) in SOURCE_ENV.items():
+        scopes = [s.strip() for s in os.getenv(scopes_var, "").split(",") if s.strip()]
+        if not scopes or not all(os.getenv(var) for var in required):
+            continue
+        prefix = f"ATILA_{name.upper()}"
+        specs[name] = SourceSpec(
+            name=name,
+            scopes=scopes,
+            interval=float(os.getenv(f"{prefix}_SYNC_INTERVAL_SECONDS", SYNC_INTERVAL)),
+            rate=float(os.getenv(f"{prefix}_RPS", default_rate)),
+            factory=_client_factory(name),
+        )
+    return specs
+
+
+class SyncEngine:
+    """Runs integration syncs on schedules with a bounded worker pool."""
+
+    def __init__(self, sources: Optional[Dict[str, SourceSpec]] = None, workers: int = SYNC_WORKERS,
+                 queue_size: int = SYNC_QUEUE_SIZE, platform_map=None):
+        self.engine = None
+        self.sources = sources if sources is not None else sources_from_env()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.platform_map = platform_map
+        self.state = {name: SourceState() for name in self.sources}
+        self._clients: Dict[str, Any] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._leader: Optional[LeaderLock] = None
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def leader(self) -> bool:
+        """Whether this process runs the schedule (always, without a leader lock)."""
+        return self._leader is None or self._leader.held
+
+    async def start(self, engine, schedule: bool = True, lock_path: Optional[Path] = None) -> None:
+        """Start the workers (and the interval scheduler unless ``schedule`` is False).
+
+        With ``lock_path``, the schedule only runs while this process holds
+        the leader lock at that path.
+        """
+        if self.running or not self.sources:
+            return
+        self.engine = engine
+        self._leader = LeaderLock(lock_path) if lock_path is not None else None
+        if self.platform_map is None:
+            self.platform_map = load_platform_map()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"atila-sync-{i}") for i in range(self.workers)]
+        if schedule:
+            self._tasks.append(asyncio.create_task(self._scheduler(), name="atila-sync-scheduler"))
+        log.info("Sync engine started: %s", ", ".join(self.sources))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._inflight.values():
+            if not future.done():
+                future.cancel()
+        self._inflight.clear()
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        if self._leader is not None:
+            self._leader.release()
+
+    # ---------------------------
+    # Jobs
+    # ---------------------------
+    def trigger(self, source: str, scopes: Optional[List[str]] = None) -> List[asyncio.Future]:
+        """Queue a sync of ``scopes`` (default: all) now; returns one future per scope.
+
+        A scope that is already queued or running is joined rather than
+        queued again. Raises ``QueueFull`` when there is no room.
+        """
+        if source not in self.sources:
+            raise KeyError(source)
+        if not self.running:
+            raise RuntimeError("Sync engine is not running")
+        futures = []
+        for scope in scopes or self.sources[source].scopes:
+            futures.append(self._enqueue(source, scope))
+        return futures
+
+    def _enqueue(self, source: str, scope: str) -> asyncio.Future:
+        key = (source, scope)
+        if key in self._inflight:
+            return self._inflight[key]
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((source, scope, future))
+        except asyncio.QueueFull:
+            self.state[source].deferred += 1
+            raise QueueFull(f"Sync queue full ({self.queue_size} jobs)")
+        self._inflight[key] = future
+        return future
+
+    async def _scheduler(self) -> None:
+        while True:
+            if self._leader is not None and not self._leader.held:
+                if not self._leader.acquire():
+                    await asyncio.sleep(TICK_SECONDS)
+                    continue
+                log.info("Sync engine is the leader; running scheduled syncs")
+            now = time.monotonic()
+            for name, spec in self.sources.items():
+                state = self.state[name]
+                if not state.pending:
+                    if state.next_run > now:
+                        continue
+                    state.pending = list(spec.scopes)
+                # Scopes deferred by a full queue go first next tick, so none starve.
+                try:
+                    while state.pending:
+                        self._enqueue(name, state.pending[0])
+                        state.pending.pop(0)
+                except QueueFull:
+                    log.warning("Sync queue full; deferring %d %s scopes", len(state.pending), name)
+                    continue
+                state.next_run = now + spec.interval
+            await asyncio.sleep(TICK_SECONDS)
+
+    def _client(self, source: str):
+        if source not in self._clients:
+            spec = self.sources[source]
+            self._clients[source] = spec.factory(self.engine, self.platform_map, spec.rate)
+        return self._clients[source]
+
+    async def _worker(self) -> None:
+        while True:
+            source, scope, future = await self._queue.get()
+            state = self.state[source]
+            started = time.monotonic()
+            try:
+                result: SyncResult = await self._client(source).sync_scope(scope)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                log.exception("Sync %s/%s failed", source, scope)
+                state.failures += 1
+                state.last_error = f"{scope}: {e}"
+                state.history.append({"scope": scope, "ok": False, "error": str(e), "at": datetime.utcnow()})
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()  # retrieved here; triggers may not be waiting
+            else:
+                state.runs += 1
+                summary = result.as_dict()
+                summary.pop("errors", None)
+                state.history.append({
+                    "scope": scope, "ok": True, "at": datetime.utcnow(),
+                    "seconds": round(time.monotonic() - started, 3), **summary,
+                })
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                state.last_run = datetime.utcnow()
+                self._inflight.pop((source, scope), None)
+                self._queue.task_done()
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "running": self.running,
+            "leader": self.leader,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "inflight": sorted(f"{s}/{scope}" for s, scope in self._inflight),
+            "sources": {
+                name: {
+                    "scopes": spec.scopes,
+                    "interval": spec.interval,
+                    "rate": spec.rate,
+                    "next_run_in": max(0.0, round(self.state[name].next_run - now, 1)) if self.running else None,
+                    "runs": self.state[name].runs,
+                    "failures": self.state[name].failures,
+                    "deferred": self.state[name].deferred,
+                    "pending": list(self.state[name].pending),
+                    "last_run": self.state[name].last_run,
+                    "last_error": self.state[name].last_error,
+                    "history": list(self.state[name].history),
+                }
+                for name, spec in self.sources.items()
+            },
+        }
+
+
+# Process-wide engine; started and stopped with the app.
+sync_engine = SyncEngine()
@@ -0,0 +1,170 @@
+# ==========================================================
+# github.py — Incremental GitHub Issues sync
+# ==========================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ..services.ingest import IngestReport, TicketUpserter
+from ..services.normalizers import load_platform_map
+from ..services.rescoring import scheduler
+from ..services.timestamps import parse_timestamp
+from .base import (
+    RateLimiter,
+    SyncResult,
+    as_completed_bounded,
+    fetch,
+    load_cursor,
+    pooled_client,
+    save_cursor,
+    server_time,
+)
+
+log = logging.getLogger(__name__)
+
+SOURCE = "github"
+GITHUB_API_URL = os.getenv("ATILA_GITHUB_API_URL", "https://api.github.com")
+GITHUB_TOKEN = os.getenv("ATILA_GITHUB_TOKEN") or os.getenv("GITHUB_TOKEN")
+GITHUB_CONCURRENCY = int(os.getenv("ATILA_GITHUB_CONCURRENCY", "4"))
+PER_PAGE = 100
+
+
+def github_client(base_url: str = GITHUB_API_URL, token: Optional[str] = GITHUB_TOKEN,
+                  concurrency: int = GITHUB_CONCURRENCY, **kwargs) -> httpx.AsyncClient:
+    """Pooled client; keep-alive connections are sized to the page concurrency."""
+    headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return pooled_client(base_url, concurrency, headers, **kwargs)
+
+
+def _last_page(response: httpx.Response) -> int:
+    last = response.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    return int(parse_qs(urlparse(last).query).get("page", ["1"])[0])
+
+
+class GitHubSync:
+    """Pull issues changed since the last sync of each repository.
+
+    The first page of a repository is a conditional request: while the
+    stored ETag still matches, the sync costs one 304 (which GitHub does
+    not count against the rate limit). Otherwise the remaining pages are
+    fetched concurrently, at most ``concurrency`` at a time, and each page
+    goes through ``normalize_ticket`` and the bulk upsert as it arrives.
+    """
+
+    source = SOURCE
+
+    def __init__(self, engine, platform_map=None, client: Optional[httpx.AsyncClient] = None,
+                 concurrency: int = GITHUB_CONCURRENCY, project_id: Optional[int] = None,
+                 rate: Optional[float] = None):
+        self.engine = engine
+        self.platform_map = platform_map if platform_map is not None else load_platform_map()
+        self._owns_client = client is None
+        self.client = client or github_client(concurrency=concurrency)
+        self.limiter = RateLimiter(rate=rate)
+        self.concurrency = concurrency
+        self.project_id = project_id
+        self._pages = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> "GitHubSync":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _get(self, path: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        async with self._pages:
+            response = await fetch(self.client, self.limiter, "GET", path, params=params, headers=headers)
+        if response.status_code not in (200, 304):
+            response.raise_for_status()
+        return response
+
+    async def sync_repos(self, repos: Iterable[str]) -> List[SyncResult]:
+        return list(await asyncio.gather(*(self.sync_repo(r) for r in repos)))
+
+    async def sync_scope(self, scope: str) -> SyncResult:
+        return await self.sync_repo(scope)
+
+    async def sync_repo(self, repo: str) -> SyncResult:
+        """Sync one ``owner/name`` repository."""
+        stored = await asyncio.to_thread(load_cursor, self.engine, SOURCE, repo)
+        path = f"/repos/{repo}/issues"
+        params = {"state": "all", "sort": "updated", "direction": "asc", "per_page": PER_PAGE}
+        if stored.cursor:
+            params["since"] = stored.cursor
+        headers = {"If-None-Match": stored.etag} if stored.etag else None
+
+        first = await self._get(path, {**params, "page": 1}, headers)
+        if first.status_code == 304:
+            await asyncio.to_thread(save_cursor, self.engine, SOURCE, repo, stored.cursor, stored.etag)
+            return SyncResult(SOURCE, repo, IngestReport(source=SOURCE), not_modified=True,
+                              cursor=stored.cursor)
+
+        started = server_time(first)
+        session = Session(self.engine)
+        upserter = TicketUpserter(session, SOURCE, self.platform_map, project_id=self.project_id)
+        newest = stored.cursor
+        moved = False
+
+        async def ingest(response: httpx.Response) -> None:
+            nonlocal newest, moved
+            page = int(response.url.params.get("page", 1))
+            records = self._records(repo, response.json(), (page - 1) * PER_PAGE)
+            for _, raw in records:
+                updated = raw.get("updated_at")
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+                stamp = parse_timestamp(updated) if started and updated else None
+                if stamp and stamp >= started:
+                    moved = True
+            await asyncio.to_thread(upserter.upsert_chunk, records)
+
+        rest = [
+            lambda n=n: self._get(path, {**params, "page": n})
+            for n in range(2, _last_page(first) + 1)
+        ]
+        try:
+            await ingest(first)
+            async for response in as_completed_bounded(rest, self.concurrency):
+                await ingest(response)
+        finally:
+            session.close()
+
+        report = upserter.report
+        scheduler.mark_dirty(report.project_ids)
+        if moved and rest:
+            # Issues updated mid-listing shift later pages under our feet, so
+            # an unchanged issue may have been skipped; replay this window.
+            log.info("GitHub %s changed during a paged sync; keeping cursor %s", repo, stored.cursor)
+            cursor, etag = stored.cursor, None
+        elif newest != stored.cursor:
+            cursor, etag = newest, None  # the ETag belongs to the old since= window
+        else:
+            cursor, etag = stored.cursor, first.headers.get("ETag")
+        await asyncio.to_thread(save_cursor, self.engine, SOURCE, repo, cursor, etag, report.received)
+        return SyncResult(SOURCE, repo, report, pages=1 + len(rest), cursor=cursor)
+
+    @staticmethod
+    def _records(repo: str, items: List[Dict[str, Any]], offset: int) -> List[tuple]:
+        out = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or "pull_request" in item:
+                continue  # the issues endpoint also lists pull requests
+            # Repo-scoped listings omit ``repository``; the platform map reads its name.
+            item.setdefault("repository", {"name": repo.split("/")[-1], "full_name": repo})
+            out.append((offset + i, item))
+        return out
@@ -1,23 +1,37 @@
 from __future__ import annotations
-from pathlib import Path
-from typing import Optional
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from datetime import datetime
+from typing import Iterator, Optional
+from fastapi import Depends, FastAPI, Request, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, select
-from .services.models import Base, Project, Ticket
-from .services.scoring import recalc_scores, assign_all_scores_for_project
+from sqlalchemy import func, inspect, select
+from .db import BASE_DIR, DB_PATH, async_engine, engine, get_session
+from .integrations.engine import sync_engine
+from .services.models import Base, Project, Tag, Ticket, upgrade_schema
+from .services.rescoring import scheduler
+from .services.scoring_state import StartupRecalc
+from .services.pagination import RankCursor, first_page_signature, ranked_page
+from .services.rank_cache import make_etag, not_modified, validator_headers
+from .services.next_up import next_up
+from .services.rank_store import record_writes
+from .services.search import ensure_search_index
+from .services.versions import (
+    ensure_version_triggers, lock_versions, project_version, read_validators, read_versions,
+)
+from .services.tags import migrate_tags, normalize_tags, set_project_tags, tag_names
+from .services.scoring import (
+    STATUS_ORDER,
+    apply_score_coefficients,
+    compute_pscore,
+    scoring_now,
+)
 
 app = FastAPI(title="ATILA — Adaptive Ticket Intelligence Layer")
 
-BASE_DIR = Path(__file__).resolve().parent.parent
-DB_PATH = BASE_DIR / "atila.db"
-
-engine = create_engine(
-    f"sqlite:///{DB_PATH}", echo=False, connect_args={"check_same_thread": False}
-)
-
 # Ensure static + templates directories exist
 static_dir = BASE_DIR / "static"
 static_dir.mkdir(exist_ok=True)
@@ -25,111 +39,182 @@ app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 templates_dir = BASE_DIR / "templates"
 templates_dir.mkdir(exist_ok=True)
+jinja = Environment(loader=FileSystemLoader(str(templates_dir)), autoescape=select_autoescape())
+
+DASHBOARD_PAGE_SIZE = 25
+DASHBOARD_STREAM_EVENTS = 64
 
 
 # ---------------------------
 # DB Init
 # ---------------------------
 def init_db():
+    tags_existed = inspect(engine).has_table(Tag.__tablename__)
     Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    migrate_tags(engine, reimport_labels=not tags_existed)
+    ensure_search_index(engine)
+    ensure_version_triggers(engine)
+
+
+startup_recalc = StartupRecalc(engine, DB_PATH.with_suffix(".scoring.lock"))
 
 
 @app.on_event("startup")
-def startup():
-    init_db()
-    with Session(engine) as s:
-        recalc_scores(s)
+async def startup():
+    await run_in_threadpool(init_db)
+    # The recalc runs off the request path; /readyz reports when it is done.
+    startup_recalc.start()
+    scheduler.start(engine)
+    next_up.warm(engine)
+    # Scheduled syncs run on one worker only (the holder of this lock).
+    await sync_engine.start(engine, lock_path=DB_PATH.with_suffix(".sync.lock"))
 
 
-# ---------------------------
-# Helpers
-# ---------------------------
-def normalize_tags(raw: str | None) -> str:
-    """Ensure our two required defaults exist in the tag string."""
-    base_defaults = ["Score:[0.00]", "Ticket_ID:0"]
-    existing = [t.strip() for t in (raw or "").split(",") if t.strip()]
-    for d in base_defaults:
-        if d not in existing:
-            existing.append(d)
-    return ", ".join(existing)
-
-
-def render_dashboard(projects: list[Project], active_project: Optional[Project], tickets: list[Ticket]) -> str:
-    """Basic but usable HTML dashboard for ATILA."""
-    html = """
-    <html>
-      <head>
-        <title>ATILA Dashboard</title>
-        <style>
-          body { font-family: Arial, sans-serif; background: #f7f9fb; margin: 40px; }
-          h1 { color: #2563eb; }
-          form { margin-bottom: 30px; background: #fff; padding: 20px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.05); }
-          input, textarea, select { width: 100%; padding: 8px; margin: 5px 0 10px 0; border: 1px solid #ccc; border-radius: 6px; }
-          button { background: #2563eb; color: white; border: none; padding: 10px 18px; border-radius: 6px; cursor: pointer; }
-          button:hover { background: #1d4ed8; }
-          .card { background: #fff; padding: 15px; margin: 10px 0; border-radius: 8px; box-shadow: 0 0 6px rgba(0,0,0,0.05); }
-        </style>
-      </head>
-      <body>
-        <h1>🚀 ATILA — Adaptive Ticket Intelligence Layer</h1>
-        
-        <form action="/create_project" method="post">
-          <h2>Create Project</h2>
-          <input type="text" name="name" placeholder="Project Name" required>
-          <input type="text" name="description" placeholder="Description">
-          <input type="text" name="tags" placeholder="Tags (comma separated)">
-          <button type="submit">Create Project</button>
-        </form>
-    """
+@app.on_event("shutdown")
+async def shutdown():
+    await sync_engine.stop()
+    await run_in_threadpool(scheduler.stop)
+    await async_engine.dispose()
+
 
-    if not projects:
-        html += "<h3>No projects yet. Add your first project above!</h3></body></html>"
-        return html
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
 
-    html += "<h2>Existing Projects</h2>"
-    for p in projects:
-        html += f"<div class='card'><b>{p.name}</b> — {p.status}<br>{p.description or ''}</div>"
 
+@app.get("/readyz")
+def readyz():
+    """Readiness: boot-time scoring has finished (or was not needed)."""
+    body = {"status": "ready" if startup_recalc.ready else "starting", "scoring": startup_recalc.state}
+    if startup_recalc.error:
+        body["error"] = startup_recalc.error
+    return JSONResponse(body, status_code=200 if startup_recalc.ready else 503)
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def _section(session: Session, project_id: int, status: str, limit: int,
+             cursor: Optional[RankCursor] = None, as_of: Optional[datetime] = None, collapse: bool = False) -> dict:
+    rows, next_cursor = ranked_page(session, project_id, status, limit, cursor, as_of, collapse)
+    return {
+        "status": status,
+        "rows": rows,
+        "offset": cursor.shown if cursor else 0,
+        "next_cursor": next_cursor.encode() if next_cursor else None,
+    }
+
+
+def dashboard_projects(session: Session, project_id: Optional[int] = None):
+    """All projects by name, and the one the dashboard shows."""
+    projects = session.execute(select(Project).order_by(func.lower(Project.name))).scalars().all()
+    active_project: Optional[Project] = None
+    if project_id is not None:
+        active_project = session.get(Project, project_id)
+    if active_project is None and projects:
+        active_project = projects[0]
+    return projects, active_project
+
+
+def dashboard_etag(session: Session, projects, active_project: Optional[Project], limit: int, as_of: datetime,
+                   collapse: bool = False) -> str:
+    """Validator for the dashboard as rendered at ``as_of``, from the rank cache alone."""
+    catalog = tuple(tuple(getattr(p, c.name) for c in Project.__table__.columns) for p in projects)
+    sections = ()
     if active_project:
-        html += f"<h2>Active Project: {active_project.name}</h2>"
-        html += f"<form action='/add_ticket' method='post'>"
-        html += f"<input type='hidden' name='project_id' value='{active_project.id}'>"
-        html += f"<h3>Add Ticket to {active_project.name}</h3>"
-        html += "<input name='title' placeholder='Ticket title' required>"
-        html += "<textarea name='description' placeholder='Description'></textarea>"
-        html += "<select name='priority'><option>Highest</option><option>High</option><option>Medium</option><option>Low</option><option>Backlog</option></select>"
-        html += "<select name='status'><option>Backlog</option><option>Active</option><option>Completed</option></select>"
-        html += "<select name='category'><option>Product Management</option><option>Product Quality</option><option>Product Scaling</option><option>Other</option></select>"
-        html += "<button type='submit'>Add Ticket</button></form>"
+        sections = tuple(first_page_signature(session, active_project.id, status, limit, as_of, collapse)
+                         for status in STATUS_ORDER)
+    return make_etag("dashboard", catalog, active_project.id if active_project else None, limit, collapse, sections)
 
-        html += "<h3>Tickets</h3>"
-        for t in tickets:
-            html += f"<div class='card'>[{t.priority}] {t.title} — {t.status}</div>"
 
-    html += "</body></html>"
-    return html
+def render_dashboard(session: Session, projects, active_project: Optional[Project],
+                     limit: int = DASHBOARD_PAGE_SIZE, as_of: Optional[datetime] = None,
+                     collapse: bool = False) -> Iterator[str]:
+    """Stream the dashboard template: project list + top-N tickets per status.
 
+    Each status section is queried lazily as the template streams, so the
+    page head usually goes out before the ticket queries run. Output is sent
+    in chunks of ``DASHBOARD_STREAM_EVENTS`` template events: StreamingResponse
+    pays a threadpool hop per chunk.
+    """
+    def sections():
+        rows = jinja.get_template("_ticket_rows.html")
+        for status in STATUS_ORDER:
+            section = _section(session, active_project.id, status, limit, as_of=as_of, collapse=collapse)
+            # One event instead of a dozen per row.
+            section["rows_html"] = Markup(rows.render(section=section))
+            yield section
+
+    stream = jinja.get_template("dashboard.html").stream(
+        projects=projects, active_project=active_project, sections=sections() if active_project else (), limit=limit,
+        collapse=collapse,
+    )
+    stream.enable_buffering(DASHBOARD_STREAM_EVENTS)
+    return stream
 
 
 # ---------------------------
 # Routes
 # ---------------------------
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request):
-    with Session(engine) as session:
-        projects = session.execute(select(Project)).scalars().all()
-        projects.sort(key=lambda p: p.name.lower())
-
-        active_project: Optional[Project] = projects[0] if projects else None
-        tickets: list[Ticket] = []
-        if active_project:
-            tickets = session.execute(
-                select(Ticket).where(Ticket.project_id == active_project.id)
-            ).scalars().all()
-            tickets.sort(key=lambda t: t.display_score or 0)
-
-        html = render_dashboard(projects, active_project, tickets)
-        return HTMLResponse(html)
+def home(
+    request: Request,
+    project_id: Optional[int] = None,
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=500),
+    collapse: bool = Query(False, description="Show only the best ticket of each near-duplicate group"),
+):
+    """Dashboard; revalidates with ETag against the cached ranking (304 when unchanged)."""
+    # Not get_session: the template streams after this returns, so the
+    # response stream owns and closes the session.
+    session = Session(engine)
+    try:
+        as_of = scoring_now()
+        projects, active_project = dashboard_projects(session, project_id)
+        etag = dashboard_etag(session, projects, active_project, limit, as_of, collapse)
+        changed = read_validators(session, [active_project.id])[1] if active_project else None
+        headers = validator_headers(etag, changed)
+        if not_modified(request, etag):
+            session.close()
+            return Response(status_code=304, headers=headers)
+    except Exception:
+        session.close()
+        raise
+
+    def stream():
+        try:
+            yield from render_dashboard(session, projects, active_project, limit, as_of, collapse)
+        finally:
+            session.close()
+
+    return StreamingResponse(stream(), media_type="text/html", headers=headers)
+
+
+@app.get("/dashboard/tickets", response_class=HTMLResponse)
+def dashboard_tickets(
+    request: Request,
+    project_id: int,
+    status: str,
+    cursor: str,
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=500),
+    session: Session = Depends(get_session),
+):
+    """Next page of one status bucket as table rows ("load more"); collapsed if the first page was."""
+    try:
+        after = RankCursor.decode(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The cursor pins the ranking clock, so the page only changes on writes.
+    etag = make_etag("rows", project_id, status, cursor, limit, project_version(session, project_id))
+    changed = read_validators(session, [project_id])[1]
+    validators = validator_headers(etag, changed)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=validators)
+    section = _section(session, project_id, status, limit, after)
+    html = jinja.get_template("_ticket_rows.html").render(section=section)
+    headers = {"X-Next-Cursor": section["next_cursor"]} if section["next_cursor"] else {}
+    return HTMLResponse(html, headers={**headers, **validators})
 
 
 @app.post("/create_project")
@@ -137,23 +222,22 @@ def create_project(
     name: str = Form(...),
     description: str = Form(""),
     tags: str = Form(""),
+    session: Session = Depends(get_session),
 ):
-    with Session(engine) as session:
-        existing = session.execute(select(Project).where(Project.name == name)).scalar_one_or_none()
-        if existing:
-            raise HTTPException(status_code=400, detail="Project name already exists.")
-
-        project = Project(
-            name=name,
-            description=description or None,
-            status="Created",
-            tags=normalize_tags(tags),
-        )
-        session.add(project)
-        session.commit()
-        session.refresh(project)
-
-        assign_all_scores_for_project(session, project.id)
+    existing = session.execute(select(Project).where(Project.name == name)).scalar_one_or_none()
+    if existing:
+        raise HTTPException(status_code=400, detail="Project name already exists.")
+
+    project = Project(
+        name=name,
+        description=description or None,
+        status="Created",
+        tags=normalize_tags(tags),
+    )
+    session.add(project)
+    session.flush()
+    set_project_tags(session, {project.id: tag_names(tags)})
+    session.commit()
 
     return RedirectResponse(url="/", status_code=303)
 
@@ -166,40 +250,45 @@ def add_ticket(
     priority: str = Form("Medium"),
     status: str = Form("Backlog"),
     category: str = Form("Product Management"),
+    session: Session = Depends(get_session),
 ):
-    with Session(engine) as session:
-        project = session.get(Project, project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-
-        t = Ticket(
-            title=title,
-            description=description or None,
-            priority=priority,
-            status=status,
-            category=category,
-            project_id=project_id,
-        )
-        session.add(t)
-        session.commit()
-        session.refresh(t)
-
-        assign_all_scores_for_project(session, project_id)
-
-    return RedirectResponse(url="/", status_code=303)
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    before = lock_versions(session, [project_id])
+
+    t = Ticket(
+        title=title,
+        description=description or None,
+        priority=priority,
+        status=status,
+        category=category,
+        project_id=project_id,
+        created_at=datetime.utcnow(),
+    )
+    # Only the new row is written; the rest of the project is ranked at
+    # read time from each ticket's stored score line, and the stored
+    # ranks catch up in the background.
+    apply_score_coefficients(t)
+    t.pscore = compute_pscore(t, scoring_now())
+    session.add(t)
+    session.flush()
+    after = read_versions(session, before)
+    session.commit()
+    scheduler.mark_dirty([project_id])
+    record_writes(before, after, [t])
+
+    return RedirectResponse(url=f"/?project_id={project_id}", status_code=303)
 
 
 @app.post("/set_project_active")
-def set_project_active(project_id: int = Form(...)):
-    with Session(engine) as session:
-        project = session.get(Project, project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        project.status = "Active"
-        session.add(project)
-        session.commit()
-
-        assign_all_scores_for_project(session, project_id)
+def set_project_active(project_id: int = Form(...), session: Session = Depends(get_session)):
+    project = session.get(Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    project.status = "Active"
+    session.add(project)
+    session.commit()
 
     return RedirectResponse(url="/", status_code=303)
 
@@ -207,7 +296,8 @@ def set_project_active(project_id: int = Form(...)):
 # Routers
 # ==========================================================
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import normalize
+from app.routers import export, metrics, normalize, projects, sync, tickets
+from app.services.metrics import MetricsMiddleware
 
 # Enable CORS (optional but helpful for local testing)
 app.add_middleware(
@@ -216,7 +306,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so route latencies include every other middleware.
+app.add_middleware(MetricsMiddleware)
 
 # Mount routers
+app.include_router(export.router)
+app.include_router(metrics.router)
 app.include_router(normalize.router)
+app.include_router(projects.router)
+app.include_router(sync.router)
+app.include_router(tickets.router)
 
@@ -0,0 +1,65 @@
+# ================================================================
+# export.py — Bulk ticket export (Parquet / Arrow IPC / CSV)
+# ================================================================
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.db import engine
+from app.exporters.tabular import (
+    DEFAULT_CHUNK_SIZE,
+    FORMATS,
+    PARTITION_COLUMNS,
+    TICKET_COLUMNS,
+    iter_ticket_batches,
+    stream_export,
+)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+def _split(value: Optional[str], allowed, what: str) -> list:
+    names = [v.strip() for v in (value or "").split(",") if v.strip()]
+    unknown = [n for n in names if n not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {what}: {', '.join(unknown)}")
+    return names
+
+
+@router.get("/tickets")
+def export_tickets(
+    format: Literal["parquet", "arrow", "csv"] = "parquet",
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    partition_by: Optional[str] = Query(None, description="Comma-separated: project_id, status"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns (default: all)"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1000, le=500_000),
+):
+    """
+    Stream every matching ticket, including pscore, display_score and
+    ticket_order_id, as Parquet, Arrow IPC stream or CSV.
+
+    The table is read in ``chunk_size`` row batches (one Parquet row group
+    per batch), so memory stays flat however many tickets there are. With
+    ``partition_by`` the response is a zip of Hive-style partitions, e.g.
+    ``project_id=3/status=Active/part-0.parquet``.
+    """
+    names = _split(fields, TICKET_COLUMNS, "fields") or list(TICKET_COLUMNS)
+    partitions = _split(partition_by, PARTITION_COLUMNS, "partition columns")
+    fmt = FORMATS[format]
+
+    # The body streams after this returns, so the stream owns its connection
+    # rather than taking one from get_session.
+    def stream():
+        with engine.connect() as conn:
+            batches = iter_ticket_batches(conn, names, project_id, status, partitions, chunk_size)
+            yield from stream_export(batches, names, fmt, partitions)
+
+    if partitions:
+        media_type, filename = "application/zip", "tickets.zip"
+    else:
+        media_type, filename = fmt.media_type, f"tickets.{fmt.extension}"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,81 @@
+# ================================================================
+# metrics.py — Prometheus scrape endpoint and slow-request samples
+# ================================================================
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.integrations.engine import sync_engine
+from app.services.metrics import registry, slow_requests
+from app.services.next_up import next_up
+from app.services.rank_cache import rank_cache
+from app.services.rank_store import rank_store
+from app.services.rescoring import scheduler
+from app.services.timestamps import PARSE_STATS
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------------------------
+# Scrape-time collectors
+# ---------------------------
+# Stats the services already keep are read on scrape instead of being
+# counted twice on the hot path.
+def _one(value):
+    return lambda: [({}, value())]
+
+
+registry.collector(
+    "atila_timestamp_parse_failures_total", "counter",
+    "Platform timestamps that were missing or could not be parsed.",
+    lambda: [({"reason": r}, PARSE_STATS.snapshot()[r]) for r in ("missing", "failed")],
+)
+registry.collector(
+    "atila_timestamp_cache_lookups_total", "counter", "Timestamp parse cache lookups.",
+    lambda: [({"result": r}, PARSE_STATS.snapshot()[key]) for r, key in (("hit", "cache_hits"), ("miss", "cache_misses"))],
+)
+registry.collector(
+    "atila_rank_cache_lookups_total", "counter", "Ranked-view cache lookups.",
+    lambda: [({"result": "hit"}, rank_cache.hits), ({"result": "miss"}, rank_cache.misses)],
+)
+registry.collector("atila_rank_cache_evictions_total", "counter", "Ranked views evicted (LRU).",
+                   _one(lambda: rank_cache.evictions))
+registry.collector("atila_rank_cache_entries", "gauge", "Ranked views cached.",
+                   _one(lambda: rank_cache.stats()["entries"]))
+registry.collector("atila_rank_store_tickets", "gauge", "Tickets held in the in-memory rank store.",
+                   _one(lambda: rank_store.stats()["tickets"]))
+registry.collector("atila_rank_store_bytes", "gauge", "Memory held by rank store columns.",
+                   _one(lambda: rank_store.stats()["bytes"]))
+registry.collector("atila_rank_store_loads_total", "counter", "Projects (re)loaded into the rank store.",
+                   _one(lambda: rank_store.loads))
+registry.collector("atila_next_up_tickets", "gauge", "Tickets held in the next-up queue.",
+                   _one(lambda: next_up.stats()["tickets"]))
+registry.collector("atila_next_up_reloads_total", "counter", "Next-up queue (re)loads from the database.",
+                   _one(lambda: next_up.reloads))
+registry.collector("atila_rescores_total", "counter", "Background rescore passes.", _one(lambda: scheduler.rescores))
+registry.collector("atila_projects_rescored_total", "counter", "Projects rescored by background passes.",
+                   _one(lambda: scheduler.projects_rescored))
+registry.collector("atila_ticket_writes_total", "counter", "Project writes reported to the rescore scheduler.",
+                   _one(lambda: scheduler.marks))
+registry.collector("atila_sync_queue_depth", "gauge", "Sync jobs waiting for a worker.",
+                   _one(lambda: sync_engine.status()["queued"]))
+
+
+# ---------------------------
+# Routes
+# ---------------------------
+@router.get("", response_class=PlainTextResponse)
+def metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/slow", response_class=ORJSONResponse)
+def slow():
+    """Recent requests slower than ATILA_SLOW_REQUEST_MS, with their sampled stacks (newest first)."""
+    if not slow_requests.enabled:
+        raise HTTPException(status_code=404, detail="Slow-request sampling is off; set ATILA_SLOW_REQUEST_MS")
+    return ORJSONResponse({
+        "threshold_ms": slow_requests.threshold * 1000,
+        "requests": list(reversed(slow_requests.recent)),
+    })
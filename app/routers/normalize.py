@@ -1,9 +1,18 @@
 # ================================================================
 # normalize.py — ATILA Smart Ticket Normalization API Route
 # ================================================================
-from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.db import get_session
+from app.services.ingest import DEFAULT_CHUNK_SIZE, TicketUpserter, iter_json_records
+from app.services.metrics import NORMALIZE_SECONDS, TICKETS_NORMALIZED
+from app.services.models import Project
 from app.services.normalizers import normalize_ticket, load_platform_map
+from app.services.rescoring import scheduler
 import json, logging
 
 router = APIRouter(prefix="/normalize", tags=["Normalization"])
@@ -32,24 +41,86 @@ async def normalize_source_ticket(source: str, request: Request):
         "repository": {"name": "mlops"}
     }
     """
-    if not PLATFORM_MAP:
-        raise HTTPException(status_code=500, detail="Platform map not loaded")
-
     try:
         payload = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON payload")
 
+    source = _check_source(source)
+
+    try:
+        with NORMALIZE_SECONDS.time(source):
+            normalized = normalize_ticket(source, payload, PLATFORM_MAP)
+        TICKETS_NORMALIZED.labels(source).inc()
+        return JSONResponse(content=jsonable_encoder(normalized))
+    except Exception as e:
+        logging.exception(f"Normalization error for source={source}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{source}/batch")
+async def ingest_source_batch(
+    source: str,
+    request: Request,
+    project_id: Optional[int] = None,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+    wait: bool = Query(False, description="Wait until affected projects are rescored"),
+    session: Session = Depends(get_session),
+):
+    """
+    Stream a JSON array or NDJSON body of raw tickets, normalize each one and
+    upsert it into Ticket keyed on (integration_source, integration_id).
+
+    Records are written in chunked transactions as they arrive; failures are
+    reported per record by position. Affected projects are handed to the
+    background rescore scheduler once at the end (``wait=true`` blocks until
+    they are rescored). Tickets go to ``project_id`` when given, otherwise
+    to the project named by the platform's ``project`` field (created if
+    missing).
+    """
+    source = _check_source(source)
+
+    if project_id is not None and not await run_in_threadpool(session.get, Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    upserter = TicketUpserter(session, source, PLATFORM_MAP, project_id=project_id)
+    records = iter_json_records(request.stream())
+    chunk = []
+    while True:
+        # Only decoding errors end the stream; upsert errors are reported
+        # per record by upsert_chunk.
+        try:
+            item = await anext(records)
+        except StopAsyncIteration:
+            break
+        except ValueError as e:
+            upserter.report.error(upserter.report.received + len(chunk), str(e))
+            break
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            await run_in_threadpool(upserter.upsert_chunk, chunk)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(upserter.upsert_chunk, chunk)
+
+    report = upserter.report
+    # Hand the connection back before a possibly long wait.
+    session.close()
+
+    scheduler.mark_dirty(report.project_ids)
+    if wait:
+        await run_in_threadpool(scheduler.wait_fresh, report.project_ids)
+
+    return JSONResponse(content=report.as_dict())
+
+
+def _check_source(source: str) -> str:
+    if not PLATFORM_MAP:
+        raise HTTPException(status_code=500, detail="Platform map not loaded")
     source = source.lower().strip()
     if source not in PLATFORM_MAP:
         raise HTTPException(
             status_code=400,
             detail=f"Unsupported platform: {source}. Must be one of: {', '.join(PLATFORM_MAP.keys())}",
         )
-
-    try:
-        normalized = normalize_ticket(source, payload, PLATFORM_MAP)
-        return JSONResponse(content=normalized)
-    except Exception as e:
-        logging.exception(f"Normalization error for source={source}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return source
@@ -1,19 +1,116 @@
 
-from fastapi import APIRouter, Depends
-from sqlmodel import SQLModel, select
-from sqlmodel import Session
-from ..db import get_session
-from ..services.models import Project
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from ..db import engine, get_async_session
+from ..services.models import Project, ProjectCreate
+from ..services.projection import PROJECTED_STATUSES, project_ranking, projection_dates
+from ..services.scoring import scoring_now
+from ..services.tags import normalize_tags, set_project_tags, tag_names, tagged_projects
+
+router = APIRouter(prefix="/api/projects", tags=["projects"], default_response_class=ORJSONResponse)
+
+PROJECT_FIELDS = [c.name for c in Project.__table__.columns]
+MAX_PROJECTION_STEPS = 3650
+
+
+def _project_dict(p: Project) -> dict:
+    return {name: getattr(p, name) for name in PROJECT_FIELDS}
 
-router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 @router.get("")
-def list_projects(session: Session = Depends(get_session)):
-    return session.exec(select(Project)).all()
+async def list_projects(
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    tag: Optional[List[str]] = Query(None, description="Only projects carrying every one of these tags"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Projects by id, keyset-paginated: pass ``next_after_id`` back as ``after_id``."""
+    stmt = select(Project)
+    for name in tag or ():
+        stmt = stmt.where(Project.id.in_(tagged_projects(name)))
+    if after_id is not None:
+        stmt = stmt.where(Project.id > after_id)
+    rows = (await session.execute(stmt.order_by(Project.id).limit(limit + 1))).scalars().all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return ORJSONResponse({"items": [_project_dict(p) for p in rows[:limit]], "next_after_id": next_after})
+
 
 @router.post("")
-def create_project(project: Project, session: Session = Depends(get_session)):
-    session.add(project)
-    session.commit()
-    session.refresh(project)
-    return project
+async def create_project(project: ProjectCreate, session: AsyncSession = Depends(get_async_session)):
+    existing = (await session.execute(select(Project).where(Project.name == project.name))).scalar_one_or_none()
+    if existing:
+        raise HTTPException(status_code=400, detail="Project name already exists.")
+    p = Project(**project.model_dump(exclude={"tags"}), tags=normalize_tags(project.tags))
+    session.add(p)
+    await session.flush()
+    await session.run_sync(set_project_tags, {p.id: tag_names(project.tags)})
+    await session.commit()
+    await session.refresh(p)
+    return _project_dict(p)
+
+
+def _project_ranking(project_id: int, dates, top: int, statuses):
+    # CPU-bound numpy work: a sync session of its own in the threadpool,
+    # rather than run_sync on the event loop's session.
+    with Session(engine) as session:
+        return project_ranking(session, project_id, dates, top, statuses)
+
+
+@router.get("/{project_id}/projection")
+async def ranking_projection(
+    project_id: int,
+    steps: int = Query(90, ge=1, le=MAX_PROJECTION_STEPS, description="Future dates to rank"),
+    step_days: int = Query(1, ge=1, le=365, description="Days between dates"),
+    top: int = Query(20, ge=1, le=1000, description="Size of the queue head to track"),
+    status: Optional[List[str]] = Query(None, description=f"Statuses to rank (default: {', '.join(PROJECTED_STATUSES)})"),
+    start: Optional[datetime] = Query(None, description="First date (default: now)"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    How the project's queue will reorder on ``start`` and each of the next
+    ``steps`` dates, as pscores age. Read-only: nothing is rescored or written.
+
+    ``top_ids`` is the head of the queue on each date. ``tickets`` lists
+    every ticket in the top ``top`` on any date, with its ranks (1-based)
+    and the dates it first moves in (null when already in on ``start``)
+    and first drops out.
+    """
+    statuses = status or list(PROJECTED_STATUSES)
+    unknown = [s for s in statuses if s not in PROJECTED_STATUSES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot project statuses: {', '.join(unknown)}")
+    if not await session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone().replace(tzinfo=None)
+    dates = projection_dates(start or scoring_now(), steps, timedelta(days=step_days))
+    result = await run_in_threadpool(_project_ranking, project_id, dates, top, statuses)
+
+    def date(index: int):
+        return dates[index] if index >= 0 else None
+
+    # Tickets already at the head first, then in the order they reach it.
+    rows = [i for i in np.lexsort((result.rank_start, result.entered)).tolist() if result.best_rank[i] < top]
+    tickets = [{
+        "id": int(result.ids[i]),
+        "status": result.status[i],
+        "rank_start": int(result.rank_start[i]) + 1,
+        "rank_end": int(result.rank_end[i]) + 1,
+        "best_rank": int(result.best_rank[i]) + 1,
+        "entered_top": date(int(result.entered[i])),
+        "left_top": date(int(result.left[i])),
+    } for i in rows]
+    return ORJSONResponse({
+        "project_id": project_id,
+        "top": top,
+        "dates": dates,
+        "top_ids": result.top_ids.tolist(),
+        "tickets": tickets,
+    })
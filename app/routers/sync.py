@@ -0,0 +1,61 @@
+# ================================================================
+# sync.py — Integration sync status and manual triggers
+# ================================================================
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from app.integrations.engine import QueueFull, sync_engine
+
+router = APIRouter(prefix="/sync", tags=["Sync"], default_response_class=ORJSONResponse)
+
+WAIT_TIMEOUT = 300.0
+
+
+def _result(scope: str, future: asyncio.Future) -> dict:
+    if future.cancelled():
+        return {"scope": scope, "error": "cancelled"}
+    if future.exception() is not None:
+        return {"scope": scope, "error": str(future.exception())}
+    return future.result().as_dict()
+
+
+@router.get("")
+def sync_status():
+    """Configured sources, schedules, queue depth and recent runs."""
+    return sync_engine.status()
+
+
+@router.post("/{source}", status_code=202)
+async def trigger_sync(
+    source: str,
+    scope: Optional[List[str]] = Query(None, description="Scopes to sync (default: all configured)"),
+    wait: bool = Query(False, description="Block until the syncs finish and return their results"),
+):
+    """Queue a sync now, outside the source's schedule."""
+    if source not in sync_engine.sources:
+        raise HTTPException(status_code=404, detail=f"Sync source not configured: {source}")
+    # Only configured scopes: the source's credentials are not for arbitrary repos or projects.
+    configured = sync_engine.sources[source].scopes
+    unknown = [s for s in scope or () if s not in configured]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Scopes not configured for {source}: {', '.join(unknown)}")
+    scopes = list(dict.fromkeys(scope)) if scope else configured
+    try:
+        futures = sync_engine.trigger(source, scopes)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not wait:
+        return {"source": source, "queued": scopes}
+
+    # asyncio.wait neither cancels the jobs on timeout nor when the client
+    # disconnects: other callers may share them.
+    await asyncio.wait(futures, timeout=WAIT_TIMEOUT)
+    results = [_result(s, f) for s, f in zip(scopes, futures) if f.done()]
+    pending = [s for s, f in zip(scopes, futures) if not f.done()]
+    if pending:
+        # Still running after WAIT_TIMEOUT: report what finished, the rest stays queued.
+        return {"source": source, "results": results, "pending": pending}
+    return ORJSONResponse({"source": source, "results": results}, status_code=200)
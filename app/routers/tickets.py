@@ -1,46 +1,308 @@
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select
-from sqlmodel import Session
-from typing import Optional
-from ..db import get_session
-from ..services.models import Ticket, Project
-from ..services.scoring import recalc_scores
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import exists, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from ..db import engine, get_async_session, get_session
+from ..services.dedup import group_members, index_ticket
+from ..services.models import Ticket, Project, TicketCreate, TicketUpdate
+from ..services.next_up import OPEN_STATUSES, next_up
+from ..services.pagination import decode_cursor, encode_cursor
+from ..services.rank_cache import make_etag, not_modified, validator_headers
+from ..services.rank_store import record_writes
+from ..services.rescoring import scheduler
+from ..services.scoring import apply_score_coefficients, compute_pscore, recalc_scores, scoring_now
+from ..services.search import MANUAL_SOURCE, search_tickets
+from ..services.tags import set_ticket_tags, tagged_tickets, ticket_tags
+from ..services.versions import lock_versions, read_validators, read_versions
+
+router = APIRouter(prefix="/api/tickets", tags=["tickets"], default_response_class=ORJSONResponse)
+
+TICKET_FIELDS = {c.name: c for c in Ticket.__table__.columns}
+# List views skip the (potentially large) description unless asked for.
+DEFAULT_FIELDS = [name for name in TICKET_FIELDS if name != "description"]
+KEYSET = ("project_id", "status", "ticket_order_id", "id")
+MAX_PAGE_SIZE = 1000
+FRESH_TIMEOUT = 30.0
+
+
+def _parse_fields(fields: Optional[str]) -> list:
+    if not fields:
+        return DEFAULT_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in TICKET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _ticket_dict(t: Ticket) -> dict:
+    return {name: getattr(t, name) for name in TICKET_FIELDS}
+
+
+async def _wait_fresh(project_ids) -> None:
+    if not await run_in_threadpool(scheduler.wait_fresh, project_ids, FRESH_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Timed out waiting for a fresh ranking")
+
+
+def _unindexed(col):
+    """``+col``: SQLite plans no index lookup on a term behind a unary plus."""
+    return UnaryExpression(col, operator=custom_op("+"), type_=col.type)
+
+
+def _first_in_group():
+    """Whether no better-ranked ticket of the row's near-duplicate group shares its bucket.
+
+    A group is its root (``duplicate_of``, or the ticket itself) plus every
+    ticket linked to that root, each looked up by key; left to itself,
+    SQLite would walk the bucket's order index for every row instead.
+    """
+    t = Ticket.__table__
+    root = func.coalesce(t.c.duplicate_of, t.c.id)
+
+    def better(key: str):
+        other = t.alias("other")
+        return exists().where(
+            other.c[key] == root,
+            other.c.id != t.c.id,
+            _unindexed(other.c.project_id) == t.c.project_id,
+            _unindexed(other.c.status) == t.c.status,
+            tuple_(other.c.ticket_order_id, other.c.id) < tuple_(t.c.ticket_order_id, t.c.id),
+        )
+    return ~or_(better("id"), better("duplicate_of"))
+
+
+async def _list_validators(session: AsyncSession, project_id: Optional[int], *params) -> tuple:
+    """ETag and Last-Modified for a listing of stored columns: they change only
+    on writes and on the score passes that follow them."""
+    pids = [project_id] if project_id is not None else None
+    state, changed = await session.run_sync(read_validators, pids)
+    return make_etag("tickets", project_id, params, state), changed
 
-router = APIRouter(prefix="/api/tickets", tags=["tickets"])
 
 @router.get("")
-def list_tickets(project_id: Optional[int] = None, session: Session = Depends(get_session)):
-    query = select(Ticket)
+async def list_tickets(
+    request: Request,
+    project_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    tag: Optional[List[str]] = Query(None, description="Only tickets carrying every one of these tags/labels"),
+    fresh: bool = Query(False, description="Wait for pending rescores before reading"),
+    collapse: bool = Query(False, description="Return only the best ticket of each near-duplicate group per bucket"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Tickets in rank order: project, status bucket, then ticket_order_id.
+
+    Pages are keyset-paginated on (project_id, status, ticket_order_id, id)
+    over the matching composite index, so page N costs the same as page 1.
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page.
+    Each ``tag`` narrows the listing through the ticket_tag index.
+    ``collapse`` keeps the best-ranked ticket of each near-duplicate group
+    within a project's status bucket and drops its copies.
+    Ranks are refreshed in the background after writes (a new ticket
+    has ``ticket_order_id`` 0, so it lists first until then); ``fresh=true``
+    waits for that to finish first.
+    """
+    if fresh:
+        await _wait_fresh([project_id] if project_id is not None else None)
+    names = _parse_fields(fields)
+    etag, changed = await _list_validators(session, project_id, status, cursor, limit, names, tag, collapse)
+    validators = validator_headers(etag, changed)
+    if not_modified(request, etag, changed):
+        return Response(status_code=304, headers=validators)
+    keys = [TICKET_FIELDS[k] for k in KEYSET]
+    # Row-value comparisons need non-NULL keys; unassigned tickets are unranked.
+    stmt = select(*keys, *(TICKET_FIELDS[n] for n in names if n not in KEYSET)).where(
+        *(k.isnot(None) for k in keys)
+    )
     if project_id is not None:
-        query = query.where(Ticket.project_id == project_id)
-    return session.exec(query).all()
+        stmt = stmt.where(Ticket.project_id == project_id)
+    if status is not None:
+        stmt = stmt.where(Ticket.status == status)
+    for name in tag or ():
+        stmt = stmt.where(Ticket.id.in_(tagged_tickets(name)))
+    if collapse:
+        stmt = stmt.where(_first_in_group())
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+            if len(after) != len(KEYSET):
+                raise ValueError("Invalid cursor")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        stmt = stmt.where(tuple_(*keys) > tuple_(*after))
+    stmt = stmt.order_by(*keys).limit(limit + 1)
+
+    rows = (await session.execute(stmt)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][k] for k in KEYSET])
+    items = [{n: row[n] for n in names} for row in rows]
+    # Returned directly so FastAPI skips jsonable_encoder; orjson handles datetimes.
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor}, headers=validators)
+
+
+def _top_next_up(limit: int, statuses, category, assignee, collapse: bool):
+    # CPU-bound numpy work: a sync session of its own in the threadpool,
+    # rather than run_sync on the event loop's session.
+    with Session(engine) as session:
+        return next_up.top(session, limit, statuses=statuses, category=category, assignee=assignee,
+                           collapse=collapse)
+
+
+@router.get("/next-up")
+async def next_up_tickets(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[List[str]] = Query(None, description=f"Statuses to rank (default: {', '.join(OPEN_STATUSES)})"),
+    category: Optional[str] = None,
+    assignee: Optional[str] = None,
+    collapse: bool = Query(False, description="Return only the best ticket of each near-duplicate group"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    The highest-scoring tickets across all projects, by live pscore.
+
+    Served from the in-memory next-up queue; only the returned tickets
+    are read from the database. ``live_pscore`` is the score now, which
+    the stored ``pscore`` only catches up to on the next rescore.
+    """
+    names = _parse_fields(fields)
+    top = await run_in_threadpool(_top_next_up, limit, status, category, assignee, collapse)
+    ids = [tid for tid, _, _ in top]
+    cols = [TICKET_FIELDS[n] for n in dict.fromkeys(["id", *names])]
+    rows = {r["id"]: r for r in (await session.execute(select(*cols).where(Ticket.id.in_(ids)))).mappings()}
+    items = [{**{n: rows[tid][n] for n in names}, "live_pscore": score} for tid, _, score in top if tid in rows]
+    return ORJSONResponse({"items": items})
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, description="Words to find in titles and descriptions"),
+    project_id: Optional[int] = None,
+    source: Optional[str] = Query(None, description=f"Integration source, or '{MANUAL_SOURCE}'"),
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Full-text search over ticket titles and descriptions.
+
+    Every word must match. The best bm25 matches are ordered by relevance
+    blended with live pscore; ``relevance``, ``live_pscore`` and
+    ``search_score`` come with each item.
+    """
+    names = _parse_fields(fields)
+    items = await session.run_sync(search_tickets, q, names, limit, project_id, source, status)
+    return ORJSONResponse({"items": items})
+
+
+@router.get("/{ticket_id}")
+async def get_ticket(ticket_id: int, session: AsyncSession = Depends(get_async_session)):
+    t = await session.get(Ticket, ticket_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return {**_ticket_dict(t), "tags": await session.run_sync(ticket_tags, ticket_id)}
+
+
+@router.get("/{ticket_id}/duplicates")
+async def ticket_duplicates(
+    ticket_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Every ticket in this ticket's near-duplicate group (itself included), oldest first."""
+    names = _parse_fields(fields)
+    if not await session.get(Ticket, ticket_id):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    ids = await session.run_sync(group_members, ticket_id)
+    cols = [TICKET_FIELDS[n] for n in dict.fromkeys(["id", *names])]
+    rows = (await session.execute(select(*cols).where(Ticket.id.in_(ids)).order_by(Ticket.id))).mappings()
+    return ORJSONResponse({"items": [{n: row[n] for n in names} for row in rows]})
+
 
 @router.post("")
-def create_ticket(ticket: Ticket, session: Session = Depends(get_session)):
+async def create_ticket(ticket: TicketCreate, fresh: bool = False,
+                        session: AsyncSession = Depends(get_async_session)):
+    """
+    Create a ticket; its ``pscore`` is computed now.
+
+    ``ticket_order_id`` stays 0 until the background rescore ranks the
+    project, so until then the ticket lists first in its status bucket;
+    ``fresh=true`` waits for that rescore and returns the assigned rank.
+    """
     # validate project exists
-    project = session.get(Project, ticket.project_id)
+    project = await session.get(Project, ticket.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    session.add(ticket)
-    session.commit()
-    session.refresh(ticket)
-    recalc_scores(session)
-    return ticket
+    before = await session.run_sync(lock_versions, [ticket.project_id])
+    t = Ticket(**ticket.model_dump(exclude={"tags"}))
+    session.add(t)
+    await session.flush()
+    await session.run_sync(set_ticket_tags, {t.id: ticket.tags})
+    await session.run_sync(index_ticket, t)
+    apply_score_coefficients(t)
+    t.pscore = compute_pscore(t, scoring_now())
+    await session.flush()
+    after = await session.run_sync(read_versions, before)
+    await session.commit()
+    scheduler.mark_dirty([t.project_id])
+    record_writes(before, after, [t])
+    if fresh:
+        await _wait_fresh([t.project_id])
+        await session.refresh(t)
+    return _ticket_dict(t)
+
 
 @router.patch("/{ticket_id}")
-def update_ticket(ticket_id: int, payload: dict, session: Session = Depends(get_session)):
-    t = session.get(Ticket, ticket_id)
+async def update_ticket(ticket_id: int, payload: TicketUpdate, fresh: bool = False,
+                        session: AsyncSession = Depends(get_async_session)):
+    """
+    Update a ticket; its ``pscore`` is recomputed now.
+
+    ``ticket_order_id`` keeps its previous rank until the background
+    rescore; ``fresh=true`` waits for it.
+    """
+    t = await session.get(Ticket, ticket_id)
     if not t:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    for k, v in payload.items():
-        if hasattr(t, k):
-            setattr(t, k, v)
-    session.add(t)
-    session.commit()
-    recalc_scores(session)
-    session.refresh(t)
-    return t
+    changes = payload.model_dump(exclude_unset=True)
+    tags = changes.pop("tags", None)
+    if "project_id" in changes and not await session.get(Project, changes["project_id"]):
+        raise HTTPException(status_code=404, detail="Project not found")
+    old_project = t.project_id
+    before = await session.run_sync(lock_versions, {old_project, changes.get("project_id", old_project)})
+    for k, v in changes.items():
+        setattr(t, k, v)
+    if tags is not None:
+        await session.run_sync(set_ticket_tags, {t.id: tags})
+    regrouped = set()
+    if {"title", "description"} & changes.keys():
+        regrouped = await session.run_sync(index_ticket, t)
+    apply_score_coefficients(t)
+    t.pscore = compute_pscore(t, scoring_now())
+    await session.flush()
+    after = await session.run_sync(read_versions, before)
+    await session.commit()
+    scheduler.mark_dirty(after)
+    # Tickets regrouped with this one were not written through the ORM:
+    # their projects are reloaded rather than patched.
+    record_writes({p: v for p, v in before.items() if p not in regrouped}, after, [t], moved_from=old_project)
+    if fresh:
+        await _wait_fresh({old_project, t.project_id} - {None})
+        await session.refresh(t)
+    return _ticket_dict(t)
+
 
 @router.post("/recalc")
 def force_recalc(session: Session = Depends(get_session)):
@@ -0,0 +1,241 @@
+# ==========================================================
+# dedup.py — Near-duplicate tickets via MinHash / LSH
+# ==========================================================
+# The same incident filed in Jira, ServiceNow and GitHub becomes three
+# tickets. Each ticket's text (title + description) is reduced to word
+# shingles and a MinHash signature of NUM_PERM values; the signature is
+# cut into LSH_BANDS bands and each band hashed to a bucket. Tickets
+# sharing any bucket are candidates (likely when their shingle Jaccard
+# similarity is near DEDUP_THRESHOLD or above, unlikely well below), and
+# only candidates are compared exactly: at most DEDUP_MAX_CANDIDATES per
+# ticket, those sharing the most bands first (a true match at Jaccard 0.8
+# shares about four of twelve, a chance collision one), so the cost per
+# ticket stays flat however crowded common buckets get. Buckets live in
+# the ticket_lsh table, so the index is written in the same transaction
+# as the tickets and survives restarts; a lookup is one indexed query per
+# batch.
+#
+# A ticket similar enough to an older one gets ``duplicate_of`` set to
+# the oldest ticket of that group, so groups are flat and every link
+# points to a lower id.
+#
+#   python -m app.services.dedup      # index tickets written before dedup existed
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .metrics import DB_SECONDS, DUPLICATES_LINKED
+from .models import Ticket, TicketLSH
+
+DEDUP_THRESHOLD = float(os.getenv("ATILA_DEDUP_THRESHOLD", "0.8"))
+DEDUP_MAX_CANDIDATES = int(os.getenv("ATILA_DEDUP_MAX_CANDIDATES", "8"))
+SHINGLE_WORDS = 2
+# 12 bands of 5 rows: a pair at Jaccard 0.8 shares a bucket with p ≈ 0.99,
+# at 0.7 with p ≈ 0.89, at 0.3 with p ≈ 0.03.
+LSH_BANDS = 12
+LSH_ROWS = 5
+NUM_PERM = LSH_BANDS * LSH_ROWS
+# Like ingest chunks, small enough to keep bucket lookups under SQLite's parameter cap.
+BACKFILL_CHUNK = 500
+
+_PRIME = np.uint64((1 << 31) - 1)
+# Fixed seed: signatures (and so stored buckets) must not change between runs.
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, (1 << 31) - 1, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=(NUM_PERM, 1)).astype(np.uint64)
+# Per-row multipliers and a per-band offset fold a band into one 63-bit key.
+_BAND_MIX = _rng.randint(1, 1 << 62, size=(1, 1, LSH_ROWS), dtype=np.int64).astype(np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.randint(1, 1 << 62, size=(1, LSH_BANDS), dtype=np.int64).astype(np.uint64)
+_WORD = re.compile(r"\w+")
+# A dozen rows per ticket: plain DB-API parameters skip per-row ORM/Core
+# parameter processing, which costs more than the index writes themselves.
+LSH_INSERT = f"INSERT INTO {TicketLSH.__tablename__} (bucket, ticket_id) VALUES (?, ?)"
+LSH_LOOKUP = f"SELECT bucket, ticket_id FROM {TicketLSH.__tablename__} WHERE bucket IN (%s)"
+
+Text = Tuple[Optional[str], Optional[str]]
+
+
+# ---------------------------
+# Signatures
+# ---------------------------
+def shingles(title: Optional[str], description: Optional[str]) -> Set[str]:
+    """Lowercased word n-grams of a ticket's title and description."""
+    words = _WORD.findall(f"{title or ''} {description or ''}".lower())
+    if len(words) < SHINGLE_WORDS:
+        return set(words)
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def signatures(sets: List[Set[str]]) -> np.ndarray:
+    """MinHash signatures (rows) of non-empty shingle sets, in one vectorized pass."""
+    lengths = np.array([len(s) for s in sets], dtype=np.int64)
+    values = np.fromiter((zlib.crc32(s.encode()) for shingle_set in sets for s in shingle_set),
+                         dtype=np.uint64, count=int(lengths.sum()))
+    # (a * x + b) mod p for every permutation, then the minimum per set.
+    hashed = (_A * (values % _PRIME) + _B) % _PRIME
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(hashed, starts, axis=1).T
+
+
+def band_buckets(sigs: np.ndarray) -> np.ndarray:
+    """LSH bucket keys, one row of LSH_BANDS per signature (63-bit, SQLite-safe)."""
+    bands = sigs.reshape(len(sigs), LSH_BANDS, LSH_ROWS)
+    # Wrapping uint64 arithmetic is the hash; the band salt keeps bands apart.
+    with np.errstate(over="ignore"):
+        keys = (bands * _BAND_MIX).sum(axis=2) + _BAND_SALT
+    return (keys >> np.uint64(1)).astype(np.int64)
+
+
+# ---------------------------
+# Index
+# ---------------------------
+def _texts(session: Session, ids: Iterable[int]) -> Dict[int, Tuple[Text, Optional[int]]]:
+    rows = session.execute(
+        select(Ticket.id, Ticket.title, Ticket.description, Ticket.duplicate_of).where(Ticket.id.in_(list(ids)))
+    ).all()
+    return {tid: ((title, description), dup) for tid, title, description, dup in rows}
+
+
+def index_tickets(session: Session, texts: Mapping[int, Text],
+                  threshold: float = DEDUP_THRESHOLD) -> Tuple[Dict[int, Optional[int]], Set[int]]:
+    """(Re)index tickets just written and link each to an older near-duplicate.
+
+    ``texts`` maps ticket id -> (title, description). Sets ``duplicate_of``
+    where it changes (not committed) and returns it for every ticket given,
+    plus the projects of other tickets whose group moved along with them.
+    """
+    if not texts:
+        return {}, set()
+    ids = sorted(texts)
+    sets = {tid: shingles(*texts[tid]) for tid in ids}
+    indexed = [tid for tid in ids if sets[tid]]
+    with DB_SECONDS.time("dedup_index"):
+        session.execute(delete(TicketLSH).where(TicketLSH.ticket_id.in_(ids)))
+        buckets = band_buckets(signatures([sets[tid] for tid in indexed])) if indexed else np.empty((0, LSH_BANDS))
+        if indexed:
+            session.connection().exec_driver_sql(
+                LSH_INSERT, list(zip(buckets.ravel().tolist(), np.repeat(indexed, LSH_BANDS).tolist()))
+            )
+        # Only older tickets can be canonical, so only lower ids are candidates.
+        owners: Dict[int, List[int]] = {}
+        for tid, keys in zip(indexed, buckets.tolist()):
+            for b in keys:
+                owners.setdefault(b, []).append(tid)
+        shared: Dict[int, Counter] = {}
+        if owners:
+            for bucket, other in session.connection().exec_driver_sql(
+                LSH_LOOKUP % ",".join("?" * len(owners)), tuple(owners)
+            ):
+                for tid in owners[bucket]:
+                    if other < tid:
+                        shared.setdefault(tid, Counter())[other] += 1
+        candidates = {
+            tid: [other for other, _ in sorted(counts.items(), key=lambda kv: (-kv[1], -kv[0]))[:DEDUP_MAX_CANDIDATES]]
+            for tid, counts in shared.items()
+        }
+        stored = _texts(session, {c for found in candidates.values() for c in found} | set(ids))
+
+    links: Dict[int, Optional[int]] = {}
+    other_sets: Dict[int, Set[str]] = {}
+    for tid in ids:
+        best, best_score = None, threshold
+        for other in candidates.get(tid, ()):
+            if other not in stored:
+                continue
+            if other not in other_sets:
+                other_sets[other] = sets.get(other) or shingles(*stored[other][0])
+            score = jaccard(sets[tid], other_sets[other])
+            if score > best_score or (score == best_score and (best is None or other < best)):
+                best, best_score = other, score
+        if best is not None:
+            # Peers in this batch may have just been linked themselves.
+            group = links[best] if best in links else stored[best][1]
+            best = group or best
+        links[tid] = best
+
+    changed = {tid: dup for tid, dup in links.items() if tid in stored and stored[tid][1] != dup}
+    regrouped: Set[int] = set()
+    if changed:
+        ticket = Ticket.__table__
+        params = [{"tid": tid, "dup": dup} for tid, dup in changed.items()]
+        session.execute(update(ticket).where(ticket.c.id == bindparam("tid")).values(duplicate_of=bindparam("dup")), params)
+        # A ticket that joins a group brings its own duplicates along.
+        moved = [p for p in params if p["dup"] is not None]
+        if moved:
+            regrouped.update(session.execute(
+                select(Ticket.project_id).distinct().where(Ticket.duplicate_of.in_([p["tid"] for p in moved]))
+            ).scalars())
+            session.execute(update(ticket).where(ticket.c.duplicate_of == bindparam("tid"))
+                            .values(duplicate_of=bindparam("dup")), moved)
+        DUPLICATES_LINKED.inc(len(moved))
+    return links, regrouped
+
+
+def index_ticket(session: Session, ticket: Ticket) -> Set[int]:
+    """:func:`index_tickets` for one flushed ORM ticket, keeping its loaded ``duplicate_of`` current."""
+    links, regrouped = index_tickets(session, {ticket.id: (ticket.title, ticket.description)})
+    set_committed_value(ticket, "duplicate_of", links[ticket.id])
+    return regrouped
+
+
+def group_members(session: Session, ticket_id: int) -> List[int]:
+    """Ids of every ticket in ``ticket_id``'s duplicate group, oldest first."""
+    root = session.execute(select(Ticket.duplicate_of).where(Ticket.id == ticket_id)).scalar() or ticket_id
+    members = session.execute(select(Ticket.id).where(Ticket.duplicate_of == root)).scalars().all()
+    return sorted({root, *members})
+
+
+# ---------------------------
+# Backfill
+# ---------------------------
+def backfill(engine, chunk: int = BACKFILL_CHUNK) -> int:
+    """Index every ticket without buckets yet, oldest first; returns how many were read."""
+    done, after = 0, 0
+    with Session(engine) as session:
+        while True:
+            rows = session.execute(
+                select(Ticket.id, Ticket.title, Ticket.description)
+                .where(Ticket.id > after, Ticket.id.not_in(select(TicketLSH.ticket_id)))
+                .order_by(Ticket.id).limit(chunk)
+            ).all()
+            if not rows:
+                return done
+            index_tickets(session, {tid: (title, description) for tid, title, description in rows})
+            session.commit()
+            done += len(rows)
+            after = rows[-1][0]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Index existing tickets for duplicate detection")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK)
+    args = parser.parse_args(argv)
+
+    from ..db import engine
+    from .models import Base, upgrade_schema
+    from .versions import ensure_version_triggers
+
+    Base.metadata.create_all(engine)
+    upgrade_schema(engine)
+    ensure_version_triggers(engine)
+    print(f"indexed {backfill(engine, args.chunk_size)} tickets")
+
+
+if __name__ == "__main__":
+    main()
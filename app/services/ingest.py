@@ -0,0 +1,406 @@
+# ==========================================================
+# ingest.py — Streaming ticket ingest + bulk upsert into Ticket
+# ==========================================================
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .dedup import index_tickets
+from .metrics import DB_SECONDS, NORMALIZE_SECONDS, TICKETS_NORMALIZED
+from .models import Project, Ticket
+from .normalizers import field_accessor, normalize_ticket
+from .scoring import compute_pscore, score_coefficients, scoring_now
+from .tags import set_ticket_tags, tag_names
+from .timestamps import parse_timestamps
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+# Platform vocabularies folded onto ATILA's three status buckets.
+STATUS_MAP = {
+    "active": "Active",
+    "in progress": "Active",
+    "in review": "Active",
+    "committed": "Active",
+    "2": "Active",
+    "done": "Completed",
+    "closed": "Completed",
+    "resolved": "Completed",
+    "completed": "Completed",
+    "removed": "Completed",
+    "cancelled": "Completed",
+    "canceled": "Completed",
+    "6": "Completed",
+    "7": "Completed",
+    "8": "Completed",
+}
+PRIORITY_MAP = {
+    "highest": "Highest",
+    "critical": "Highest",
+    "blocker": "Highest",
+    "1": "Highest",
+    "high": "High",
+    "major": "High",
+    "2": "High",
+    "medium": "Medium",
+    "moderate": "Medium",
+    "3": "Medium",
+    "low": "Low",
+    "lowest": "Low",
+    "minor": "Low",
+    "4": "Low",
+    "planning": "Backlog",
+    "backlog": "Backlog",
+    "5": "Backlog",
+}
+
+
+# ---------------------------
+# Field Mapping
+# ---------------------------
+def map_status(value: Any) -> str:
+    """Map a platform status (Jira name, SNOW state code, ...) to an ATILA status."""
+    return STATUS_MAP.get(str(value or "").strip().lower(), "Backlog")
+
+
+def map_priority(value: Any) -> str:
+    """Map "1 - Critical", "High", 2 ... to an ATILA priority (Medium when unknown)."""
+    key = str(value or "").split(" - ")[0].strip().lower()
+    return PRIORITY_MAP.get(key, "Medium")
+
+
+def _naive_utc(value: Any) -> Optional[datetime]:
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _display_name(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("displayName") or value.get("display_value") or value.get("name")
+    return str(value) if value not in (None, "") else None
+
+
+def ticket_row(source: str, normalized: Dict[str, Any], project_id: int, now: datetime,
+               score_now: datetime, stored_created: Optional[datetime] = None) -> Dict[str, Any]:
+    """Build the Ticket column values for one normalized Smart Ticket.
+
+    Without a usable created_at a stored ticket keeps its own; only a new
+    one starts aging ``now``.
+    """
+    priority = map_priority(normalized.get("priority"))
+    created_at = _naive_utc(normalized.get("created_at")) or stored_created or now
+    intercept, slope = score_coefficients(priority, created_at)
+    row = {
+        "title": normalized.get("title") or "(untitled)",
+        "description": normalized.get("description"),
+        "priority": priority,
+        "status": map_status(normalized.get("status")),
+        "assignee": _display_name(normalized.get("assignee")),
+        "integration_source": source,
+        "integration_id": str(normalized["id"]),
+        "project_id": project_id,
+        "created_at": created_at,
+        "updated_at": now,
+        "score_intercept": intercept,
+        "score_slope": slope,
+    }
+    row["pscore"] = compute_pscore(SimpleNamespace(priority=priority, created_at=created_at), score_now)
+    return row
+
+
+UPSERT_COLUMNS = (
+    "title", "description", "priority", "status", "assignee", "project_id",
+    "created_at", "updated_at", "score_intercept", "score_slope", "pscore", "content_hash",
+)
+
+
+def content_hash(raw: Dict[str, Any], project_id: Optional[int] = None) -> str:
+    """Stable digest of a raw platform record (plus any project override)."""
+    try:
+        body = orjson.dumps(raw, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        body = json.dumps(raw, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(b"%d|" % (project_id or 0) + body, digest_size=16).hexdigest()
+
+
+def _upsert_stmt():
+    stmt = insert(Ticket)
+    return stmt.on_conflict_do_update(
+        index_elements=[Ticket.integration_source, Ticket.integration_id],
+        set_={c: stmt.excluded[c] for c in UPSERT_COLUMNS},
+    )
+
+
+# Built once so every chunk reuses the same compiled (and, per connection,
+# prepared) executemany statement.
+UPSERT_STMT = _upsert_stmt()
+
+
+# ---------------------------
+# Streaming JSON Decoding
+# ---------------------------
+async def iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Decode a JSON array or NDJSON body incrementally.
+
+    Yields ``(index, record)``; an NDJSON line that fails to parse yields
+    ``(index, ValueError)`` and decoding resumes at the next line. A broken
+    JSON array cannot be resynchronised, so it raises ``ValueError``.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    mode: Optional[str] = None
+    index = 0
+    done = False
+
+    async for chunk in chunks:
+        buf += text.decode(chunk)
+        if mode is None:
+            stripped = buf.lstrip()
+            if not stripped:
+                continue
+            mode = "array" if stripped[0] == "[" else "ndjson"
+            buf = stripped[1:] if mode == "array" else stripped
+
+        if mode == "ndjson":
+            *lines, buf = buf.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(line)
+                    index += 1
+            continue
+
+        pos = 0
+        while not done:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                break
+            if buf[pos] == "]":
+                done = True
+                break
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # incomplete record: wait for more bytes
+            yield index, record
+            index += 1
+            pos = end
+        buf = buf[pos:]
+
+    buf += text.decode(b"", final=True)
+    if mode == "ndjson" and buf.strip():
+        yield index, _parse_line(buf)
+    elif mode == "array" and not done:
+        raise ValueError(f"Malformed JSON array near record {index}")
+
+
+def _parse_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+
+# ---------------------------
+# Bulk Upsert
+# ---------------------------
+@dataclass
+class IngestReport:
+    source: str
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    unchanged: int = 0
+    unparsed_dates: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    project_ids: set = field(default_factory=set)
+
+    def error(self, index: int, message: str, ticket_id: Any = None) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "id": ticket_id, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "unchanged": self.unchanged,
+            "unparsed_dates": self.unparsed_dates,
+            "errors": self.errors,
+            "projects": sorted(self.project_ids),
+        }
+
+
+class TicketUpserter:
+    """Normalize raw tickets and upsert them chunk by chunk.
+
+    Tickets are keyed on ``(integration_source, integration_id)``. A record
+    whose content hash matches the stored one is skipped before
+    normalization, so re-polling unchanged tickets costs one indexed
+    lookup per chunk. Platform labels are stored as ticket tags and written
+    tickets are linked to near-duplicates (services/dedup.py). Each chunk
+    is one transaction; a chunk that fails is retried row by row so the
+    error lands on the record that caused it.
+    """
+
+    def __init__(self, session: Session, source: str, platform_map: Dict[str, Any],
+                 project_id: Optional[int] = None):
+        self.session = session
+        self.source = source
+        self.platform_map = platform_map
+        self.project_id = project_id
+        self.report = IngestReport(source=source)
+        self._projects: Dict[str, int] = {}
+        self._id_of = field_accessor(source, platform_map, "id")
+
+    def _resolve_project(self, name: Any) -> int:
+        if self.project_id is not None:
+            return self.project_id
+        name = str(name or self.source)
+        if name not in self._projects:
+            pid = self.session.execute(select(Project.id).where(Project.name == name)).scalar()
+            if pid is None:
+                project = Project(name=name, description=f"Imported from {self.source}")
+                self.session.add(project)
+                self.session.commit()  # survives a rollback of the ticket chunk
+                pid = project.id
+            self._projects[name] = pid
+        return self._projects[name]
+
+    def upsert_chunk(self, records: Iterable[Tuple[int, Any]]) -> None:
+        """Normalize and write one chunk of ``(index, raw_record)`` pairs."""
+        now = datetime.utcnow()
+        score_now = scoring_now()
+        candidates: List[Tuple[int, Dict[str, Any], str]] = []
+        for index, raw in records:
+            self.report.received += 1
+            if isinstance(raw, Exception):
+                self.report.error(index, str(raw))
+                continue
+            if not isinstance(raw, dict):
+                self.report.error(index, "Record is not a JSON object")
+                continue
+            candidates.append((index, raw, content_hash(raw, self.project_id)))
+
+        existing, stored = self._stored_rows(candidates)
+        pending: List[Tuple[int, Dict[str, Any], int, str]] = []
+        started = time.perf_counter()
+        for index, raw, digest in candidates:
+            if self._id_of is not None and existing.get(str(self._id_of(raw))) == digest:
+                self.report.unchanged += 1
+                continue
+            try:
+                normalized = normalize_ticket(self.source, raw, self.platform_map, parse_dates=False)
+                if normalized.get("id") in (None, ""):
+                    raise ValueError("Missing ticket id")
+                project_id = self._resolve_project(normalized.get("project"))
+                pending.append((index, normalized, project_id, digest))
+            except Exception as e:
+                self.report.error(index, str(e), raw.get("id") or raw.get("key") or raw.get("number"))
+        NORMALIZE_SECONDS.labels(self.source).observe(time.perf_counter() - started)
+        TICKETS_NORMALIZED.labels(self.source).inc(len(pending))
+
+        # Timestamps for the whole chunk are parsed in one vectorized pass.
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        unparsed_created = set()
+        for column in ("created_at", "updated_at"):
+            raw_values = [n.get(column) for _, n, _, _ in pending]
+            for (index, normalized, _, _), value, parsed in zip(pending, raw_values, parse_timestamps(raw_values)):
+                normalized[column] = parsed
+                if parsed is None and value not in (None, ""):
+                    self.report.unparsed_dates += 1
+                    if column == "created_at":
+                        unparsed_created.add(index)
+        labels: Dict[str, List[str]] = {}
+        for index, normalized, project_id, digest in pending:
+            try:
+                _, stored_created = stored.get(str(normalized["id"]), (None, None))
+                row = ticket_row(self.source, normalized, project_id, now, score_now, stored_created)
+            except (TypeError, ValueError) as e:
+                self.report.error(index, str(e), normalized.get("id"))
+                continue
+            # No hash for a record whose created_at did not parse: the next
+            # sync reads it again instead of skipping it as unchanged.
+            row["content_hash"] = None if index in unparsed_created else digest
+            rows.append((index, row))
+            labels[row["integration_id"]] = tag_names(normalized.get("labels"))
+        if not rows:
+            self.session.commit()
+            return
+
+        try:
+            self._write([r for _, r in rows], existing, labels, stored)
+        except (SQLAlchemyError, ValueError):
+            self.session.rollback()
+            for index, row in rows:
+                try:
+                    self._write([row], existing, labels, stored)
+                except (SQLAlchemyError, ValueError) as e:
+                    self.session.rollback()
+                    self.report.error(index, str(getattr(e, "orig", None) or e), row["integration_id"])
+
+    def _stored_rows(self, candidates: List[Tuple[int, Dict[str, Any], str]]) -> Tuple[
+            Dict[str, Optional[str]], Dict[str, Tuple[Optional[int], Optional[datetime]]]]:
+        """For the chunk's tickets already stored: ``integration_id -> content_hash``
+        and ``integration_id -> (project_id, created_at)``."""
+        if self._id_of is None:
+            return {}, {}
+        keys = {str(k) for k in (self._id_of(raw) for _, raw, _ in candidates) if k not in (None, "")}
+        if not keys:
+            return {}, {}
+        rows = self.session.execute(
+            select(Ticket.integration_id, Ticket.content_hash, Ticket.project_id, Ticket.created_at).where(
+                Ticket.integration_source == self.source, Ticket.integration_id.in_(keys),
+            )
+        ).all()
+        return {key: digest for key, digest, _, _ in rows}, {key: (pid, created) for key, _, pid, created in rows}
+
+    def _write(self, rows: List[Dict[str, Any]], existing: Dict[str, Optional[str]],
+               labels: Dict[str, List[str]], stored: Dict[str, Tuple[Optional[int], Optional[datetime]]]) -> None:
+        with DB_SECONDS.time("ingest_upsert"):
+            self.session.execute(UPSERT_STMT, rows)
+            ids = dict(self.session.execute(
+                select(Ticket.integration_id, Ticket.id).where(
+                    Ticket.integration_source == self.source,
+                    Ticket.integration_id.in_([r["integration_id"] for r in rows]),
+                )
+            ).all())
+            # Labels and duplicate links are replaced in the same transaction
+            # as their tickets; new tickets without labels have nothing to replace.
+            set_ticket_tags(self.session, {
+                tid: labels.get(key, []) for key, tid in ids.items() if labels.get(key) or key in existing
+            })
+            _, regrouped = index_tickets(
+                self.session, {ids[r["integration_id"]]: (r["title"], r["description"]) for r in rows}
+            )
+            self.session.commit()
+        self.report.project_ids.update(regrouped)
+        fresh = sum(1 for r in rows if r["integration_id"] not in existing)
+        self.report.inserted += fresh
+        self.report.updated += len(rows) - fresh
+        self.report.project_ids.update(r["project_id"] for r in rows)
+        # A ticket moved to another project leaves a gap in its old one.
+        self.report.project_ids.update(
+            pid for pid, _ in (stored.get(r["integration_id"], (None, None)) for r in rows) if pid is not None
+        )
@@ -0,0 +1,373 @@
+# ==========================================================
+# metrics.py — In-process counters, histograms and slow-request sampling
+# ==========================================================
+# Metrics are plain Python objects updated on the hot path (a bisect and a
+# lock per observation, ~1µs) and rendered in the Prometheus text format
+# on scrape. Existing stats objects (rank cache, parse stats, ...) are not
+# duplicated: collectors read them at scrape time.
+#
+# Slow-request sampling is off unless ATILA_SLOW_REQUEST_MS is set. Then a
+# watchdog thread samples every thread's stack while a request is past the
+# threshold, and the stacks of the slowest recent requests are kept.
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import Counter as StackCounter, deque
+from datetime import datetime
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; from a cached lookup to a full batch rescore.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SLOW_REQUEST_MS = float(os.getenv("ATILA_SLOW_REQUEST_MS", "0"))
+SLOW_SAMPLE_MS = float(os.getenv("ATILA_SLOW_REQUEST_SAMPLE_MS", "5"))
+SLOW_KEEP = int(os.getenv("ATILA_SLOW_REQUEST_KEEP", "50"))
+SLOW_TOP_STACKS = 20
+STACK_DEPTH = 40
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+
+# (labels, value) pairs for one sample family, as yielded by collectors.
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ---------------------------
+# Metric types
+# ---------------------------
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """The child for one label combination (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    @abstractmethod
+    def _child(self):
+        """A fresh child holding one label combination's state."""
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        """Exposition lines for one child."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic total; ``inc`` on a label child, or directly without labels."""
+
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"]
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the seconds spent inside it."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets (seconds by default)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self, *values: str) -> _Timer:
+        return _Timer(self.labels(*values))
+
+    def _render_child(self, values, child) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, running = [], 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            running += n
+            le = 'le="%s"' % _number(bound)
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {running}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {running}")
+        return lines
+
+
+# ---------------------------
+# Registry
+# ---------------------------
+class Registry:
+    """Metrics and scrape-time collectors, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Samples]]] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        if not metric.labelnames:
+            metric.labels()  # rendered as 0 before the first observation
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name: str, kind: str, help: str, collect: Callable[[], Samples]) -> None:
+        """A ``gauge`` or ``counter`` family whose samples are read from ``collect`` on scrape."""
+        self._collectors.append((name, kind, help, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, kind, help, collect in self._collectors:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "atila_http_request_duration_seconds", "HTTP requests by route template, including the streamed body.",
+    ("method", "route", "status"),
+)
+HTTP_SLOW_REQUESTS = registry.counter(
+    "atila_http_slow_requests_total", "Requests slower than ATILA_SLOW_REQUEST_MS (when set).", ("route",),
+)
+SCORING_SECONDS = registry.histogram(
+    "atila_scoring_seconds", "Scoring and ranking work by operation (batch passes include their DB sections).", ("op",),
+)
+TICKETS_SCORED = registry.counter(
+    "atila_tickets_scored_total", "Tickets rescored by batch passes (startup, recalc, background rescores).",
+)
+NORMALIZE_SECONDS = registry.histogram(
+    "atila_normalize_seconds", "Normalization of one batch: a /normalize request or one ingest chunk.", ("source",),
+)
+TICKETS_NORMALIZED = registry.counter(
+    "atila_tickets_normalized_total", "Raw platform records normalized.", ("source",),
+)
+DB_SECONDS = registry.histogram(
+    "atila_db_seconds", "Database sections: reads of scoring columns and bulk writes.", ("section",),
+)
+DUPLICATES_LINKED = registry.counter(
+    "atila_duplicate_links_total", "Written tickets linked to an earlier near-duplicate.",
+)
+SAFE_DATE_FALLBACKS = registry.counter(
+    "atila_safe_date_fallbacks_total", "Missing timestamps that normalize_ticket replaced with the current time.",
+)
+
+
+# ---------------------------
+# Slow requests
+# ---------------------------
+class SlowRequestSampler:
+    """Samples thread stacks while any request has run past ``threshold_ms``.
+
+    Requests run on the event loop or in the threadpool, so a sample takes
+    every thread whose stack passes through app code; with several slow
+    requests at once, each is credited with all of them.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, interval_ms: float = SLOW_SAMPLE_MS,
+                 keep: int = SLOW_KEEP):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._ids = count()
+        self._inflight: Dict[int, Tuple[float, StackCounter]] = {}
+        self.recent: deque = deque(maxlen=keep)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def begin(self) -> int:
+        token = next(self._ids)
+        with self._lock:
+            self._inflight[token] = (time.perf_counter(), StackCounter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="atila-slow-sampler", daemon=True)
+                self._thread.start()
+        return token
+
+    def end(self, token: int, elapsed: float, method: str, path: str, route: str, status: int) -> None:
+        with self._lock:
+            _, stacks = self._inflight.pop(token)
+        if elapsed < self.threshold:
+            return
+        HTTP_SLOW_REQUESTS.labels(route).inc()
+        self.recent.append({
+            "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "samples": sum(stacks.values()),
+            "stacks": [{"stack": s, "samples": n} for s, n in stacks.most_common(SLOW_TOP_STACKS)],
+        })
+
+    @staticmethod
+    def _stack(frame) -> Optional[str]:
+        names, in_app = [], False
+        while frame is not None and len(names) < STACK_DEPTH:
+            code = frame.f_code
+            in_app = in_app or code.co_filename.startswith(APP_DIR)
+            names.append(f"{Path(code.co_filename).stem}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names)) if in_app else None
+
+    def _loop(self) -> None:
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            cutoff = time.perf_counter() - self.threshold
+            with self._lock:
+                slow = [stacks for start, stacks in self._inflight.values() if start <= cutoff]
+            if not slow:
+                continue
+            stacks = [self._stack(f) for tid, f in sys._current_frames().items() if tid != me]
+            stacks = [s for s in stacks if s]
+            with self._lock:
+                for counter in slow:
+                    counter.update(stacks)
+
+
+slow_requests = SlowRequestSampler()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status.
+
+    Timing stops when the response is fully sent, so streamed bodies count.
+    """
+
+    def __init__(self, app, sampler: SlowRequestSampler = slow_requests):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = self.sampler.begin() if self.sampler.enabled else None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Unmatched paths and mounts share one label to bound cardinality.
+            route = getattr(scope.get("route"), "path", None) or "<other>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(elapsed)
+            if token is not None:
+                self.sampler.end(token, elapsed, scope["method"], scope["path"], route, status)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime, date
-from typing import Optional, List
+from typing import List, Literal, Optional
 
 from sqlalchemy import (
     Column,
@@ -10,9 +10,11 @@ from sqlalchemy import (
     Float,
     Integer,
     ForeignKey,
+    Index,
 )
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import relationship, declarative_base
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 Base = declarative_base()
 
@@ -31,6 +33,7 @@ class Project(Base):
     priority = Column(String, default="Medium")
     status = Column(String, default="Created")
 
+    # Display string; filters use the interned copy in project_tag (services/tags.py).
     tags = Column(String, default="Score:[0.00], Ticket_ID:0")
 
     planned_start_date = Column(Date, default=date.today)
@@ -54,6 +57,10 @@ class Ticket(Base):
     category = Column(String, default="Product Management")
 
     pscore = Column(Float, default=0.0, index=True)
+    # Time-invariant score line: pscore(t) = score_intercept + score_slope * t
+    # with t in epoch days (see scoring.score_coefficients).
+    score_intercept = Column(Float, nullable=True)
+    score_slope = Column(Float, nullable=True)
     display_score = Column(Integer, default=0)
     ticket_order_id = Column(Integer, default=0)
 
@@ -66,14 +73,162 @@ class Ticket(Base):
     assignee = Column(String, nullable=True)
     integration_source = Column(String, nullable=True)
     integration_id = Column(String, nullable=True)
+    # Digest of the raw platform record; unchanged records skip the upsert.
+    content_hash = Column(String, nullable=True)
+    # Oldest ticket of a near-duplicate group (see services/dedup.py);
+    # always a lower id, so groups are flat and acyclic.
+    duplicate_of = Column(Integer, ForeignKey("ticket.id"), nullable=True)
+
+    __table_args__ = (
+        # Upsert key for imported tickets; NULLs (manual tickets) never collide.
+        Index("ux_ticket_integration", "integration_source", "integration_id", unique=True),
+        # Per-status dashboard pages: filter + age/id ordering and keyset seeks.
+        Index("ix_ticket_project_status_created", "project_id", "status", "created_at", "id"),
+        # Rank-ordered API listings: keyset seeks on the materialized order.
+        Index("ix_ticket_project_status_order", "project_id", "status", "ticket_order_id", "id"),
+        # Delta exports: tickets changed since a project's export watermark.
+        Index("ix_ticket_project_updated", "project_id", "updated_at", "id"),
+        # Members of a duplicate group.
+        Index("ix_ticket_duplicate_of", "duplicate_of"),
+    )
 
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Tag(Base):
+    """Interned tag/label name shared by projects and tickets."""
+    __tablename__ = "tag"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True)
+
+
+class ProjectTag(Base):
+    __tablename__ = "project_tag"
+    __table_args__ = (
+        # The primary key serves tag -> projects filters; this one a project's tags.
+        Index("ix_project_tag_project", "project_id", "tag_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    tag_id = Column(Integer, ForeignKey("tag.id"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("project.id"), primary_key=True)
+
+
+class TicketTag(Base):
+    __tablename__ = "ticket_tag"
+    __table_args__ = (
+        # The primary key serves tag -> tickets filters; this one a ticket's tags.
+        Index("ix_ticket_tag_ticket", "ticket_id", "tag_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    tag_id = Column(Integer, ForeignKey("tag.id"), primary_key=True)
+    ticket_id = Column(Integer, ForeignKey("ticket.id"), primary_key=True)
+
+
+class TicketLSH(Base):
+    """MinHash LSH band buckets of a ticket's text (see services/dedup.py)."""
+    __tablename__ = "ticket_lsh"
+    __table_args__ = (
+        # The primary key serves bucket lookups; this one re-indexing a ticket.
+        Index("ix_ticket_lsh_ticket", "ticket_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+    bucket = Column(Integer, primary_key=True)
+    ticket_id = Column(Integer, ForeignKey("ticket.id"), primary_key=True)
+
+
+class RankingVersion(Base):
+    """Per-project write version, bumped by triggers on ticket (see services/versions.py)."""
+    __tablename__ = "ranking_version"
+
+    project_id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+    # Score passes stored; they rewrite score columns without bumping version.
+    rescores = Column(Integer, default=0)
+    # Highest version the stored scores cover; behind ``version`` means a rescore is due.
+    scored_version = Column(Integer, nullable=True)
+    # Wall-clock UTC of the latest write or score pass.
+    updated_at = Column(DateTime, nullable=True)
+
+
+class ScoringWatermark(Base):
+    """When the last full recalc ran, and with which scoring tables.
+
+    Per-project coverage is tracked in ranking_version.scored_version.
+    """
+    __tablename__ = "scoring_watermark"
+
+    id = Column(Integer, primary_key=True)
+    scored_at = Column(DateTime)
+    weights_hash = Column(String)
+
+
+class ExportWatermark(Base):
+    """Last ticket change shipped to an export target, per project."""
+    __tablename__ = "export_watermark"
+    __table_args__ = (Index("ux_export_watermark_target_project", "target", "project_id", unique=True),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    target = Column(String, nullable=False)
+    project_id = Column(Integer, nullable=False)
+    # Keyset position of the last exported row: (updated_at, ticket id).
+    updated_at = Column(DateTime, nullable=True)
+    ticket_id = Column(Integer, default=0)
+    exported_at = Column(DateTime, default=datetime.utcnow)
+    rows = Column(Integer, default=0)
+
+
+class SyncCursor(Base):
+    """Incremental sync checkpoint for one integration scope (repo, project, ...)."""
+    __tablename__ = "sync_cursor"
+    __table_args__ = (Index("ux_sync_cursor_source_scope", "source", "scope", unique=True),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String, nullable=False)
+    scope = Column(String, nullable=False)
+    # Platform-side "updated since" position, stored as the platform sent it.
+    cursor = Column(String, nullable=True)
+    etag = Column(String, nullable=True)
+    synced_at = Column(DateTime, nullable=True)
+    items = Column(Integer, default=0)
+
+
+# ---------------------------
+# Schema Upgrades
+# ---------------------------
+def upgrade_schema(engine) -> None:
+    """Add columns that exist on the models but not yet in the database.
+
+    ``create_all`` only creates missing tables, so databases created by an
+    older release need their new (nullable) columns and indexes added in place.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 
 # ---------------------------
 # Pydantic Models for API I/O
 # ---------------------------
+# The values scoring ranks and weighs (scoring.STATUS_ORDER / BASE_WEIGHTS);
+# anything else would drop a ticket out of every ranked listing.
+TicketStatus = Literal["Active", "Backlog", "Completed"]
+TicketPriority = Literal["Highest", "High", "Medium", "Low", "Backlog", "Completed"]
+
 class ProjectSchema(BaseModel):
     id: Optional[int]
     name: str
@@ -100,3 +255,46 @@ class TicketSchema(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class ProjectCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    type: str = "business"
+    priority: str = "Medium"
+    status: str = "Created"
+    tags: str = ""
+
+
+class TicketCreate(BaseModel):
+    project_id: int
+    title: str
+    description: Optional[str] = None
+    priority: TicketPriority = "Medium"
+    status: TicketStatus = "Backlog"
+    category: str = "Product Management"
+    assignee: Optional[str] = None
+    planned_start_date: Optional[date] = None
+    planned_end_date: Optional[date] = None
+    tags: List[str] = []
+
+
+class TicketUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[TicketPriority] = None
+    status: Optional[TicketStatus] = None
+    category: Optional[str] = None
+    assignee: Optional[str] = None
+    project_id: Optional[int] = None
+    planned_start_date: Optional[date] = None
+    planned_end_date: Optional[date] = None
+    tags: Optional[List[str]] = None
+
+    @field_validator("title", "priority", "status", "project_id")
+    @classmethod
+    def _not_null(cls, value):
+        # Omitted fields are left alone; an explicit null would be stored.
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
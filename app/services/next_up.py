@@ -0,0 +1,327 @@
+# ==========================================================
+# next_up.py — Global cross-project "next up" queue
+# ==========================================================
+# pscore(t) = max(base, intercept + slope * t), where base and slope depend
+# only on priority. Within one (status, priority) lane every ticket shares
+# base and slope, and intercept = base - slope * created, so a lane sorted
+# by (created_at, id) is in pscore order at every t, ties (tickets clamped
+# at base, future-dated or flat lanes) included, exactly as
+# scoring.ranked_tickets_stmt breaks them. Lanes are sorted once and stay
+# sorted as time passes. The global top K at any moment is among the first
+# K matching tickets of each lane; only those few candidates are scored
+# and ranked per request.
+#
+# Like the rank store, the queue follows each project's write version in
+# the database (services/versions.py): API writes are buffered and merged
+# in place, in one pass per lane when the queue is next read (or the
+# buffer fills up); anything it missed (other workers and tools included)
+# is re-read for just the stale projects on the next query.
+#
+# With ``collapse``, linked near-duplicates (services/dedup.py) count once:
+# each lane contributes its first ``limit`` distinct groups, and only the
+# best-scoring member of each group is returned.
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.orm import Session
+
+from .metrics import DB_SECONDS, SCORING_SECONDS
+from .models import Project, Ticket
+from .scoring import STATUS_ORDER, datetime_micros, micros_to_days, priority_weights, score_lines, scoring_now
+from .versions import read_versions
+
+log = logging.getLogger(__name__)
+
+# Statuses ranked when the caller does not ask for specific ones.
+OPEN_STATUSES = ("Active", "Backlog")
+QUEUE_COLUMNS = ["id", "project_id", "priority", "status", "category", "assignee", "created_at", "duplicate_of"]
+_LANE_COLUMNS = ("ids", "project", "intercept", "created", "category", "assignee", "group")
+# Buffered ticket writes; merged into the lanes at the next read, or once this many pile up.
+NEXT_UP_PENDING_LIMIT = int(os.getenv("ATILA_NEXT_UP_PENDING_LIMIT", "1024"))
+
+
+class _Lane:
+    """Tickets sharing status, base weight and slope, sorted by created_at then id."""
+
+    __slots__ = ("base", "slope") + _LANE_COLUMNS
+
+    def __init__(self, base: float, slope: float):
+        self.base = base
+        self.slope = slope
+        self.ids = np.empty(0, dtype=np.int64)
+        self.project = np.empty(0, dtype=np.int32)
+        self.intercept = np.empty(0, dtype=np.float64)
+        self.created = np.empty(0, dtype=np.int64)
+        self.category = np.empty(0, dtype=np.int32)
+        self.assignee = np.empty(0, dtype=np.int32)
+        self.group = np.empty(0, dtype=np.int64)  # duplicate_of, or the ticket's own id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in _LANE_COLUMNS)
+
+    def drop(self, mask: np.ndarray) -> None:
+        keep = ~mask
+        for name in _LANE_COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+
+    def merge(self, rows: Dict[str, np.ndarray]) -> None:
+        """Insert rows (already sorted by created_at, id) at their sorted positions in one pass."""
+        at = np.searchsorted(self.created, rows["created"], side="left")
+        end = np.searchsorted(self.created, rows["created"], side="right")
+        # Within a run of equal created_at, ids are ascending.
+        for i in np.flatnonzero(end > at):
+            at[i] += np.searchsorted(self.ids[at[i]:end[i]], rows["ids"][i])
+        for name in _LANE_COLUMNS:
+            setattr(self, name, np.insert(getattr(self, name), at, rows[name]))
+
+
+class NextUpQueue:
+    """Cross-project top-K by live pscore, filterable by status, category and assignee."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Serializes database reads so concurrent callers share one (re)load.
+        self._load_lock = threading.Lock()
+        self._lanes: Dict[Tuple[str, float, float], _Lane] = {}
+        self._versions: Dict[int, int] = {}
+        # ticket id -> lane row fields of writes not merged yet (see ``apply``)
+        self._pending: Dict[int, tuple] = {}
+        self._categories: Dict[Optional[str], int] = {}
+        self._assignees: Dict[Optional[str], int] = {}
+        self.loaded = False
+        self.reloads = 0
+        self.patches = 0
+
+    @staticmethod
+    def _intern(codes: Dict[Optional[str], int], values: Iterable[Optional[str]]) -> np.ndarray:
+        """Small integer per distinct value, stable for the life of the queue."""
+        local, uniques = pd.factorize(np.asarray(list(values), dtype=object), use_na_sentinel=False)
+        mapping = np.array([codes.setdefault(u, len(codes)) for u in uniques], dtype=np.int32)
+        return mapping[local] if len(local) else np.empty(0, dtype=np.int32)
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    def _read(self, session: Session, project_ids: Optional[List[int]] = None) -> pd.DataFrame:
+        stmt = select(
+            Ticket.id, Ticket.project_id, Ticket.priority, Ticket.status,
+            Ticket.category, Ticket.assignee, type_coerce(Ticket.created_at, String), Ticket.duplicate_of,
+        ).where(Ticket.project_id.in_(select(Project.id)))
+        if project_ids is not None:
+            stmt = stmt.where(Ticket.project_id.in_(project_ids))
+        # Core execution on the session's connection skips ORM row processing.
+        with DB_SECONDS.time("next_up_load"):
+            rows = session.connection().execute(stmt).fetchall()
+        df = pd.DataFrame(rows, columns=QUEUE_COLUMNS)
+        df["created_at"] = pd.to_datetime(df["created_at"], format="ISO8601", errors="coerce")
+        return df
+
+    def _insert(self, ids, project, priority, status, category, assignee, created: np.ndarray, group) -> None:
+        """Route rows to their lanes and merge them in (caller holds the lock)."""
+        base, mult = priority_weights(priority)
+        intercept, slope = score_lines(base, mult, created)
+        rows = {
+            "ids": np.asarray(ids, dtype=np.int64),
+            "project": np.asarray(project, dtype=np.int32),
+            "intercept": intercept,
+            "created": created,
+            "category": self._intern(self._categories, category),
+            "assignee": self._intern(self._assignees, assignee),
+            "group": np.asarray(group, dtype=np.int64),
+        }
+        if not len(rows["ids"]):
+            return
+        # One lane per (status, base, slope): factorize each, then combine the codes.
+        status_codes, statuses = pd.factorize(np.asarray(status, dtype=object), use_na_sentinel=False)
+        weight_codes, weights = pd.factorize(base.astype(np.float64) * 64 + slope)
+        lane_codes = status_codes * len(weights) + weight_codes
+        order = np.lexsort((rows["ids"], rows["created"], lane_codes))
+        bounds = np.flatnonzero(np.diff(lane_codes[order])) + 1
+        for chunk in np.split(order, bounds):
+            first = chunk[0]
+            lane_key = (statuses[status_codes[first]], float(base[first]), float(slope[first]))
+            if lane_key[0] not in STATUS_ORDER:
+                continue
+            lane = self._lanes.get(lane_key)
+            if lane is None:
+                lane = self._lanes[lane_key] = _Lane(lane_key[1], lane_key[2])
+            lane.merge({name: values[chunk] for name, values in rows.items()})
+
+    def _load(self, session: Session, project_ids: Optional[List[int]] = None) -> None:
+        versions = read_versions(session, project_ids)
+        df = self._read(session, project_ids)
+        created = df["created_at"].to_numpy().astype("datetime64[us]").astype(np.int64)
+        group = df["duplicate_of"].astype(np.float64).fillna(df["id"]).to_numpy(np.int64)
+        with self._lock:
+            if project_ids is None:
+                self._pending.clear()
+                self._lanes.clear()
+            else:
+                self._flush()
+                stale = np.asarray(project_ids, dtype=np.int32)
+                for lane in self._lanes.values():
+                    lane.drop(np.isin(lane.project, stale))
+            self._insert(df["id"].to_numpy(), df["project_id"].to_numpy(), df["priority"].tolist(),
+                         df["status"].to_numpy(), df["category"].tolist(), df["assignee"].tolist(), created, group)
+            if project_ids is None:
+                self._versions.clear()
+            self._versions.update(versions)
+            self.loaded = True
+            self.reloads += 1
+
+    def _stale(self, session: Session) -> List[int]:
+        versions = read_versions(session)
+        with self._lock:
+            return [pid for pid, v in versions.items() if v != self._versions.get(pid, 0)]
+
+    def refresh(self, session: Session) -> None:
+        """Load everything on first use, then re-read only projects with missed writes."""
+        if self.loaded and not self._stale(session):
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self._load(session)
+                return
+            stale = self._stale(session)
+            if stale:
+                self._load(session, stale)
+
+    def warm(self, engine) -> threading.Thread:
+        """Load the queue on a background thread so the first request finds it ready."""
+        def run():
+            try:
+                with Session(engine) as session:
+                    self.refresh(session)
+            except Exception:
+                log.exception("Next-up queue warm-up failed; it will load on first use")
+
+        thread = threading.Thread(target=run, name="atila-next-up-warm", daemon=True)
+        thread.start()
+        return thread
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def apply(self, before: Dict[int, int], after: Dict[int, int], tickets: Sequence = ()) -> None:
+        """Merge committed writes that took projects from ``before`` to ``after`` (see ``rank_store.record_writes``).
+
+        Applied only when every touched project was loaded at ``before``;
+        otherwise the projects stay stale and ``refresh`` re-reads them.
+        The tickets are buffered and merged at the next read, so a burst of
+        writes costs one pass over the lanes rather than one per write.
+        """
+        with self._lock:
+            if not self.loaded or any(self._versions.get(p, 0) != before.get(p) for p in after):
+                return
+            for t in tickets:
+                self._pending[t.id] = (
+                    t.project_id, t.priority, t.status, t.category, t.assignee,
+                    datetime_micros(t.created_at), t.duplicate_of or t.id,
+                )
+            self._versions.update(after)
+            self.patches += 1
+            if len(self._pending) >= NEXT_UP_PENDING_LIMIT:
+                self._flush()
+
+    def _flush(self) -> None:
+        """Merge buffered writes into the lanes (caller holds the lock)."""
+        if not self._pending:
+            return
+        ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+        for lane in self._lanes.values():
+            lane.drop(np.isin(lane.ids, ids))
+        live = [(tid, *row) for tid, row in self._pending.items() if row[0] is not None]
+        self._pending.clear()
+        if live:
+            tid, project, priority, status, category, assignee, created, group = zip(*live)
+            self._insert(tid, project, list(priority), status, category, assignee,
+                         np.array(created, dtype=np.int64), group)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def top(self, session: Session, limit: int = 50, now: Optional[datetime] = None,
+            statuses: Optional[Sequence[str]] = None, category: Optional[str] = None,
+            assignee: Optional[str] = None, collapse: bool = False) -> List[Tuple[int, int, float]]:
+        """(ticket id, project id, live pscore) of the ``limit`` highest-scoring tickets.
+
+        Ties break on created_at then id, as within a project. With
+        ``collapse``, only the best ticket of each duplicate group is kept.
+        """
+        self.refresh(session)
+        with SCORING_SECONDS.time("next_up_top"):
+            return self._top(limit, now, statuses, category, assignee, collapse)
+
+    @staticmethod
+    def _distinct_prefix(lane: _Lane, rows: Optional[np.ndarray], limit: int) -> np.ndarray:
+        """First row of each group among ``rows`` (default: the whole lane), up to ``limit`` groups."""
+        total = len(lane) if rows is None else len(rows)
+        window = limit
+        while True:
+            head = np.arange(min(window, total)) if rows is None else rows[:window]
+            _, first = np.unique(lane.group[head], return_index=True)
+            if len(first) >= limit or len(head) == total:
+                return head[np.sort(first)[:limit]]
+            window *= 2
+
+    def _top(self, limit: int, now: Optional[datetime], statuses: Optional[Sequence[str]],
+             category: Optional[str], assignee: Optional[str], collapse: bool = False) -> List[Tuple[int, int, float]]:
+        now_days = micros_to_days(datetime_micros(now or scoring_now()))
+        wanted = set(statuses or OPEN_STATUSES)
+        with self._lock:
+            self._flush()
+            cat = self._categories.get(category, -1) if category is not None else None
+            who = self._assignees.get(assignee, -1) if assignee is not None else None
+            picks = []
+            for (status, _, _), lane in self._lanes.items():
+                if status not in wanted or not len(lane):
+                    continue
+                if cat is None and who is None:
+                    rows = None if collapse else np.arange(min(limit, len(lane)))
+                else:
+                    mask = np.ones(len(lane), dtype=bool)
+                    if cat is not None:
+                        mask &= lane.category == cat
+                    if who is not None:
+                        mask &= lane.assignee == who
+                    rows = np.flatnonzero(mask)
+                rows = self._distinct_prefix(lane, rows, limit) if collapse else rows[:limit]
+                if len(rows):
+                    score = np.round(np.maximum(lane.base, lane.intercept[rows] + lane.slope * now_days), 4)
+                    picks.append((lane.ids[rows], lane.project[rows], score, lane.created[rows], lane.group[rows]))
+        if not picks:
+            return []
+        ids, project, score, created, group = (np.concatenate(c) for c in zip(*picks))
+        order = np.lexsort((ids, created, -score))
+        if collapse:
+            # A group may lead in several lanes; its best member comes first.
+            _, first = np.unique(group[order], return_index=True)
+            order = order[np.sort(first)]
+        order = order[:limit]
+        return list(zip(ids[order].tolist(), project[order].tolist(), score[order].tolist()))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._flush()
+            return {
+                "lanes": len(self._lanes),
+                "tickets": sum(len(lane) for lane in self._lanes.values()),
+                "bytes": sum(lane.nbytes for lane in self._lanes.values()),
+                "reloads": self.reloads,
+                "patches": self.patches,
+            }
+
+
+next_up = NextUpQueue()
@@ -3,15 +3,25 @@
 # ==========================================================
 import yaml
 import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
-# Load platform field mappings
-def load_platform_map(path: str = "config/platform_map.yaml") -> Dict[str, Any]:
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+from .metrics import SAFE_DATE_FALLBACKS
+from .timestamps import parse_timestamp
+
+Accessor = Callable[[Dict[str, Any]], Any]
+
+# Seconds between mtime checks of the platform map file
+RELOAD_INTERVAL = float(os.getenv("ATILA_PLATFORM_MAP_RELOAD_SECONDS", "2"))
 
 # Resolve nested key paths like fields.status.name or fields["System.Title"]
+# (legacy interpreter; normalize_ticket uses the compiled accessors below)
 def resolve_path(data: Dict[str, Any], path: str):
     try:
         if not path or path.lower() == "null":
@@ -29,29 +39,210 @@ def resolve_path(data: Dict[str, Any], path: str):
     except Exception:
         return None
 
+
+# ---------------------------
+# Compiled Accessors
+# ---------------------------
+_TOKEN = re.compile(r"""\[\s*(?:"([^"]*)"|'([^']*)')\s*\]|(\[\])|([^.\[\]]+)""")
+
+
+def _tokenize(path: str) -> List[Optional[str]]:
+    """Split a path into keys; ``None`` marks a ``[]`` map-over-list step."""
+    tokens: List[Optional[str]] = []
+    for quoted, single, mapper, bare in _TOKEN.findall(path):
+        if mapper:
+            tokens.append(None)
+        else:
+            tokens.append(quoted or single or bare)
+    return tokens
+
+
+def _key_chain(keys: Tuple[str, ...]) -> Accessor:
+    if not keys:
+        return lambda data: data
+    if len(keys) == 1:
+        (k,) = keys
+        return lambda data: data.get(k) if isinstance(data, dict) else None
+    if len(keys) == 2:
+        k1, k2 = keys
+
+        def get2(data):
+            data = data.get(k1) if isinstance(data, dict) else None
+            return data.get(k2) if isinstance(data, dict) else None
+        return get2
+
+    def get(data):
+        for k in keys:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(k)
+        return data
+    return get
+
+
+def _compile_tokens(tokens: List[Optional[str]]) -> Accessor:
+    if None not in tokens:
+        return _key_chain(tuple(tokens))
+    split = tokens.index(None)
+    head = _key_chain(tuple(tokens[:split]))
+    tail = _compile_tokens(tokens[split + 1:])
+
+    def mapped(data):
+        items = head(data)
+        if not isinstance(items, list):
+            return None
+        return [tail(item) for item in items]
+    return mapped
+
+
+def compile_path(path: Optional[str]) -> Accessor:
+    """Compile a dotted/bracketed path once into an accessor function.
+
+    ``fields["System.Title"]`` reads a key containing dots and
+    ``labels[].name`` maps the rest of the path over a list.
+    """
+    if not path or str(path).lower() == "null":
+        return lambda data: None
+    return _compile_tokens(_tokenize(str(path)))
+
+
+def compile_rules(rules: Dict[str, Any]) -> Tuple[Tuple[str, Accessor], ...]:
+    """Compile one platform's ``target_field: source_path`` rules."""
+    return tuple((target, compile_path(path)) for target, path in (rules or {}).items())
+
+
+def referenced_keys(rules: Dict[str, Any], under: Optional[str] = None) -> List[str]:
+    """Keys the rules read at the top level, or directly below ``under``.
+
+    Lets a sync client ask the platform for just the mapped fields, e.g.
+    ``referenced_keys(jira_rules, "fields")`` -> ["summary", "status", ...].
+    """
+    keys: List[str] = []
+    for path in (rules or {}).values():
+        if not path or str(path).lower() == "null":
+            continue
+        tokens = _tokenize(str(path))
+        if under is not None:
+            if len(tokens) < 2 or tokens[0] != under:
+                continue
+            tokens = tokens[1:]
+        if tokens and tokens[0] is not None and tokens[0] not in keys:
+            keys.append(tokens[0])
+    return keys
+
+
+class PlatformMap(Mapping):
+    """Platform rules from YAML plus their compiled accessors.
+
+    Behaves like the raw ``{platform: rules}`` dict. When built from a file
+    it re-stats it at most every ``RELOAD_INTERVAL`` seconds and swaps in a
+    freshly compiled snapshot when the mtime changes; readers always see
+    either the old or the new snapshot, never a mix. A file that fails to
+    load is logged and the previous snapshot stays live.
+    """
+
+    def __init__(self, rules: Dict[str, Any], path: Optional[str] = None, mtime: Optional[float] = None):
+        self.path = path
+        self._snapshot = self._build(rules, mtime)
+        self._next_check = time.monotonic() + RELOAD_INTERVAL
+        self._failed_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build(rules: Dict[str, Any], mtime: Optional[float]):
+        rules = {k.lower(): v for k, v in (rules or {}).items()}
+        compiled = {name: compile_rules(r) for name, r in rules.items()}
+        return rules, compiled, mtime
+
+    @classmethod
+    def from_file(cls, path: str) -> "PlatformMap":
+        mtime = os.stat(path).st_mtime
+        with open(path, "r") as f:
+            return cls(yaml.safe_load(f), path=path, mtime=mtime)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload from disk if the file changed; returns True on reload."""
+        now = time.monotonic()
+        if self.path is None or (not force and now < self._next_check):
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False
+        mtime = None
+        try:
+            self._next_check = now + RELOAD_INTERVAL
+            mtime = os.stat(self.path).st_mtime
+            if not force and mtime in (self._snapshot[2], self._failed_mtime):
+                return False
+            with open(self.path, "r") as f:
+                self._snapshot = self._build(yaml.safe_load(f), mtime)
+            logging.info(f"Reloaded platform map from {self.path}")
+            return True
+        except Exception as e:
+            self._failed_mtime = mtime
+            logging.error(f"Failed to reload platform map {self.path}: {e}")
+            return False
+        finally:
+            self._lock.release()
+
+    def compiled(self, source: str) -> Optional[Tuple[Tuple[str, Accessor], ...]]:
+        self.refresh()
+        return self._snapshot[1].get(source.lower())
+
+    def __getitem__(self, key):
+        return self._snapshot[0][key]
+
+    def __iter__(self):
+        return iter(self._snapshot[0])
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+
+def _accessors(source: str, platform_map: Dict[str, Any]) -> Optional[Tuple[Tuple[str, Accessor], ...]]:
+    if isinstance(platform_map, PlatformMap):
+        return platform_map.compiled(source)
+    rules = platform_map.get(source.lower())
+    return compile_rules(rules) if rules else None
+
+
+def field_accessor(source: str, platform_map: Dict[str, Any], target: str) -> Optional[Accessor]:
+    """The compiled accessor for one target field, e.g. a platform's ``id``."""
+    for name, get in _accessors(source, platform_map) or ():
+        if name == target:
+            return get
+    return None
+
+
+# Load platform field mappings
+def load_platform_map(path: str = "config/platform_map.yaml") -> PlatformMap:
+    return PlatformMap.from_file(path)
+
+
 # Normalize ticket into ATILA Smart Ticket
-def normalize_ticket(source: str, raw_ticket: Dict[str, Any], platform_map: Dict[str, Any]) -> Dict[str, Any]:
-    platform_rules = platform_map.get(source.lower())
-    if not platform_rules:
+# (parse_dates=False leaves raw timestamps for timestamps.parse_timestamps)
+def normalize_ticket(source: str, raw_ticket: Dict[str, Any], platform_map: Dict[str, Any],
+                     parse_dates: bool = True) -> Dict[str, Any]:
+    accessors = _accessors(source, platform_map)
+    if not accessors:
         raise ValueError(f"No mapping found for platform: {source}")
 
-    normalized = {}
-    for target_field, source_path in platform_rules.items():
-        normalized[target_field] = resolve_path(raw_ticket, source_path)
+    normalized = {target: get(raw_ticket) for target, get in accessors}
 
     # Default handling
     normalized["source"] = source
-    normalized["created_at"] = _safe_date(normalized.get("created_at"))
-    normalized["updated_at"] = _safe_date(normalized.get("updated_at"))
+    if parse_dates:
+        normalized["created_at"] = _safe_date(normalized.get("created_at"))
+        normalized["updated_at"] = _safe_date(normalized.get("updated_at"))
     return normalized
 
+# Missing timestamps default to now; unparseable ones come back as None and
+# are counted in timestamps.PARSE_STATS instead of silently becoming now.
 def _safe_date(val):
-    if isinstance(val, datetime):
-        return val
-    try:
-        return datetime.fromisoformat(val.replace("Z", "+00:00")) if val else datetime.utcnow()
-    except Exception:
+    parsed = parse_timestamp(val)
+    if parsed is None and (val is None or val == ""):
+        SAFE_DATE_FALLBACKS.inc()
         return datetime.utcnow()
+    return parsed
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+# ==========================================================
+# pagination.py — Keyset cursors over live-ranked tickets
+# ==========================================================
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Ticket
+from .rank_cache import rank_cache
+from .scoring import datetime_micros, scoring_now
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque, URL-safe token for a keyset position."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+@dataclass
+class RankCursor:
+    """Position after the last row of a page, pinned to one ranking clock."""
+    as_of: datetime
+    score: Optional[float]
+    created_at: Optional[datetime]
+    id: int
+    shown: int
+    # Pages of a collapsed listing stay collapsed.
+    collapse: bool = False
+
+    def encode(self) -> str:
+        payload = {
+            "t": self.as_of.isoformat(),
+            "s": self.score,
+            "c": self.created_at.isoformat() if self.created_at else None,
+            "i": self.id,
+            "n": self.shown,
+            "d": self.collapse,
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "RankCursor":
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return cls(
+                as_of=datetime.fromisoformat(payload["t"]),
+                score=payload["s"],
+                created_at=datetime.fromisoformat(payload["c"]) if payload["c"] else None,
+                id=int(payload["i"]),
+                shown=int(payload["n"]),
+                collapse=bool(payload.get("d", False)),
+            )
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {e}")
+
+
+def _seek(ids: np.ndarray, scores: np.ndarray, created: np.ndarray, cursor: RankCursor, by_score: bool) -> int:
+    """Number of ranked rows at or before the cursor's keyset position."""
+    cc = datetime_micros(cursor.created_at)
+    upto = (created < cc) | ((created == cc) & (ids <= cursor.id))
+    if by_score:
+        upto = (scores > cursor.score) | ((scores == cursor.score) & upto)
+    return int(np.count_nonzero(upto))
+
+
+def _view(session: Session, project_id: int, status: str, as_of: datetime, limit: Optional[int], collapse: bool):
+    if not collapse:
+        return rank_cache.view(session, project_id, status, as_of, prefix=limit)
+    # How far down a collapsed page reaches depends on the duplicates above
+    # it, so it needs the whole order to be valid.
+    return rank_cache.view(session, project_id, status, as_of).collapsed()
+
+
+def ranked_page(
+    session: Session,
+    project_id: int,
+    status: str,
+    limit: int,
+    cursor: Optional[RankCursor] = None,
+    as_of: Optional[datetime] = None,
+    collapse: bool = False,
+) -> Tuple[List[Tuple[Ticket, float]], Optional[RankCursor]]:
+    """One page of a status bucket in rank order, plus the cursor for the next.
+
+    Active/Backlog rank by live pscore (desc), Completed by age; ties break
+    on created_at then id, as in ``rank_and_assign_display_scores``. The
+    order comes from the rank cache (re-sorted only after writes or at a
+    score crossover); only the page's tickets are read from the database,
+    by primary key. Every page of one listing is evaluated at the cursor's
+    ``as_of`` so pages never overlap. With ``collapse``, only the best-ranked
+    ticket of each near-duplicate group in the bucket is listed.
+    """
+    as_of = cursor.as_of if cursor else (as_of or scoring_now())
+    collapse = cursor.collapse if cursor else collapse
+    # A first page only needs its own rows in order; later pages seek through the whole order.
+    view = _view(session, project_id, status, as_of, None if cursor else limit + 1, collapse)
+    start = 0
+    if cursor is not None:
+        start = _seek(view.ids, view.scores(as_of), view.created, cursor, view.by_score)
+    page_ids = view.ids[start:start + limit].tolist()
+    page_scores = view.scores(as_of, start, start + limit).tolist()
+
+    found = {t.id: t for t in session.execute(select(Ticket).where(Ticket.id.in_(page_ids))).scalars()}
+    rows = [(found[i], s) for i, s in zip(page_ids, page_scores) if i in found]
+    next_cursor = None
+    if rows and start + limit < len(view):
+        last, last_score = rows[-1]
+        shown = (cursor.shown if cursor else 0) + len(rows)
+        next_cursor = RankCursor(as_of, last_score, last.created_at, last.id, shown, collapse)
+    return rows, next_cursor
+
+
+def first_page_signature(session: Session, project_id: int, status: str, limit: int, as_of: datetime,
+                         collapse: bool = False) -> tuple:
+    """What the first page of a bucket shows at ``as_of``, without reading any ticket rows.
+
+    Row contents only change on writes, which bump ``version``; scores are
+    compared as displayed (two decimals).
+    """
+    view = _view(session, project_id, status, as_of, limit + 1, collapse)
+    scores = np.round(view.scores(as_of, 0, limit), 2)
+    return status, view.version, tuple(view.ids[:limit].tolist()), tuple(scores.tolist()), len(view) > limit
@@ -0,0 +1,124 @@
+# ==========================================================
+# projection.py — Read-only ranking projections over future dates
+# ==========================================================
+# A ticket's pscore is a line in time floored at its base weight, so its
+# score on any future date follows from the rank store's columns without
+# touching the database. Scores for every (date, ticket) pair are one
+# broadcast; ranking each date is one stable row-wise argsort per status,
+# over tickets pre-sorted by the display tie-breaks (created_at, id), so
+# the order on every date is exactly what the dashboard would show then.
+# Dates are processed in blocks of at most PROJECTION_BLOCK_CELLS scores,
+# which bounds memory however many tickets or steps are asked for.
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from sqlalchemy.orm import Session
+
+from .metrics import SCORING_SECONDS
+from .rank_store import ProjectRanks, rank_store
+from .scoring import STATUS_ORDER, datetime_micros, micros_to_days
+
+# Statuses ranked by pscore; Completed is ordered by age and never moves.
+PROJECTED_STATUSES = tuple(s for s in STATUS_ORDER if s != "Completed")
+PROJECTION_BLOCK_CELLS = 4_000_000
+
+
+@dataclass
+class Projection:
+    """Ranks of one project's tickets on each of ``dates`` (ranks are 0-based)."""
+    dates: List[datetime]
+    top: int
+    ids: np.ndarray          # tickets, by status then the display tie-breaks
+    status: np.ndarray       # status name per ticket
+    top_ids: np.ndarray      # (dates, min(top, tickets)) ids in rank order
+    rank_start: np.ndarray
+    rank_end: np.ndarray
+    best_rank: np.ndarray
+    entered: np.ndarray      # first date index a ticket moved into the top, or -1
+    left: np.ndarray         # first date index a ticket dropped out of it, or -1
+
+
+def projection_dates(start: datetime, steps: int, step: timedelta) -> List[datetime]:
+    """``start`` and the ``steps`` dates after it, ``step`` apart."""
+    return [start + step * k for k in range(steps + 1)]
+
+
+def _first(events: np.ndarray, found: np.ndarray, offset: int) -> None:
+    """Record, per ticket, the first row of ``events`` that is set (unless already found)."""
+    hit = events.any(axis=0) & (found < 0)
+    found[hit] = offset + events[:, hit].argmax(axis=0)
+
+
+def project_ranks(entry: ProjectRanks, status_codes: Dict[str, int], dates: Sequence[datetime],
+                  top: int, statuses: Sequence[str] = PROJECTED_STATUSES) -> Projection:
+    """Rank ``entry``'s tickets of ``statuses`` on every date in one vectorized pass.
+
+    Statuses rank in display order (Active before Backlog), each by live
+    pscore desc, then created_at and id. Nothing is written.
+    """
+    ordered = sorted(dict.fromkeys(statuses), key=STATUS_ORDER.__getitem__)
+    codes = [status_codes.get(s, -1) for s in ordered]
+    rows = np.flatnonzero(np.isin(entry.status, codes))
+    bucket = np.zeros(len(rows), dtype=np.int64)
+    for i, code in enumerate(codes):
+        bucket[entry.status[rows] == code] = i
+    # Ties on score keep this order under a stable sort: bucket, created_at, id.
+    by_tiebreak = np.lexsort((entry.ids[rows], entry.created[rows], bucket))
+    rows, bucket = rows[by_tiebreak], bucket[by_tiebreak]
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(bucket, minlength=len(codes)))))
+    n = len(rows)
+    ids, intercept = entry.ids[rows], entry.intercept[rows]
+    slope, base = entry.slope[rows], entry.base[rows]
+
+    days = micros_to_days(np.array([datetime_micros(d) for d in dates], dtype=np.int64))
+    k = min(top, n)
+    top_ids = np.empty((len(days), k), dtype=np.int64)
+    best = np.full(n, n, dtype=np.int64)
+    entered = np.full(n, -1, dtype=np.int64)
+    left = np.full(n, -1, dtype=np.int64)
+    rank_start = rank_end = np.zeros(n, dtype=np.int64)
+    previous: Optional[np.ndarray] = None
+    block = max(1, PROJECTION_BLOCK_CELLS // max(n, 1))
+    positions = np.arange(n, dtype=np.int64)
+    for start in range(0, len(days), block):
+        at = days[start:start + block, None]
+        scores = np.round(np.maximum(base, intercept + slope * at), 4)
+        order = np.empty(scores.shape, dtype=np.int64)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            order[:, lo:hi] = lo + np.argsort(-scores[:, lo:hi], axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(positions, order.shape), axis=1)
+
+        top_ids[start:start + len(at)] = ids[order[:, :k]]
+        np.minimum(best, ranks.min(axis=0), out=best)
+        if start == 0:
+            rank_start = ranks[0].copy()
+        rank_end = ranks[-1]
+        inside = ranks < top
+        # Transitions between consecutive dates, carried across blocks; row
+        # j of the pairs below is the move onto date ``offset + j``.
+        offset = start + 1
+        if previous is not None:
+            inside, offset = np.vstack([previous, inside]), start
+        _first(~inside[:-1] & inside[1:], entered, offset)
+        _first(inside[:-1] & ~inside[1:], left, offset)
+        previous = inside[-1]
+
+    return Projection(
+        list(dates), top, ids, np.asarray(ordered, dtype=object)[bucket], top_ids,
+        rank_start, rank_end, best, entered, left,
+    )
+
+
+def project_ranking(session: Session, project_id: int, dates: Sequence[datetime], top: int,
+                    statuses: Sequence[str] = PROJECTED_STATUSES) -> Projection:
+    """:func:`project_ranks` over a snapshot of the project's rank-store columns."""
+    entry = rank_store.snapshot(session, project_id)
+    codes = {s: rank_store.status_code(s) for s in statuses}
+    with SCORING_SECONDS.time("projection"):
+        return project_ranks(entry, codes, dates, top, statuses)
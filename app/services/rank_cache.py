@@ -0,0 +1,190 @@
+# ==========================================================
+# rank_cache.py — Ranking cache with crossover validity horizons
+# ==========================================================
+# Each ticket's pscore is a line in time, so a ranked status bucket keeps
+# its order until two adjacent tickets' lines cross. A cached order is
+# stamped with the earliest such crossover and reused until then, or
+# until a write (from any process) bumps the project's stored version; a first page can keep using
+# it for longer, until a swap reaches its own rows. Between those events
+# a page only re-evaluates scores; nothing is re-sorted. Entries are
+# evicted least recently used across projects.
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from .rank_store import RankedView, rank_store
+from .scoring import EPOCH, datetime_micros, micros_to_days
+from .versions import project_version
+
+RANK_CACHE_SIZE = int(os.getenv("ATILA_RANK_CACHE_SIZE", "256"))
+# Scores are compared rounded to 4 decimals, so two lines can tie (and the
+# tie re-break on created_at/id) slightly before they actually cross.
+CROSSOVER_EPSILON = 2e-4
+
+
+def _lines(view: RankedView) -> Tuple[np.ndarray, np.ndarray, List[float]]:
+    """Each ticket's score line from ``as_of`` on, plus times at which a line changes.
+
+    Tickets created after as_of sit on their base weight until then.
+    """
+    future = view.created > datetime_micros(view.as_of)
+    intercept = np.where(future, view.base, view.intercept)
+    slope = np.where(future, 0.0, view.slope)
+    changes = [float(micros_to_days(view.created[future].min()))] if future.any() else []
+    return intercept, slope, changes
+
+
+def _crossings(ahead_icpt, ahead_slope, behind_icpt, behind_slope) -> List[float]:
+    """Times (epoch days) at which each ``behind`` line comes within EPSILON of ``ahead``."""
+    rise = behind_slope - ahead_slope
+    steeper = rise > 0
+    gap = (ahead_icpt - behind_icpt)[steeper]
+    return ((gap - CROSSOVER_EPSILON) / rise[steeper]).tolist()
+
+
+def _as_datetime(view: RankedView, events: List[float]) -> Optional[datetime]:
+    if not events:
+        return None
+    return EPOCH + timedelta(days=max(min(events), float(micros_to_days(datetime_micros(view.as_of)))))
+
+
+def order_horizon(view: RankedView, prefix: Optional[int] = None) -> Optional[datetime]:
+    """Earliest time after ``view.as_of`` at which its order could change (None: never).
+
+    With ``prefix`` only the first ``prefix`` rows count: they keep their
+    order until two of them swap or a lower ticket overtakes the last of
+    them. Swaps further down do not matter until then.
+    """
+    if not view.by_score or len(view) < 2:
+        return None
+    intercept, slope, events = _lines(view)
+    if prefix is None or prefix >= len(view):
+        events += _crossings(intercept[:-1], slope[:-1], intercept[1:], slope[1:])
+    else:
+        k = max(prefix, 1)
+        events += _crossings(intercept[:k - 1], slope[:k - 1], intercept[1:k], slope[1:k])
+        events += _crossings(intercept[k - 1], slope[k - 1], intercept[k:], slope[k:])
+    return _as_datetime(view, events)
+
+
+class RankCache:
+    """LRU of ranked views keyed by (project, status)."""
+
+    def __init__(self, maxsize: int = RANK_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, str], RankedView]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _valid(view: RankedView, version: int, as_of: datetime, prefix: Optional[int]) -> bool:
+        if view.version != version or as_of < view.as_of:
+            return False
+        if as_of == view.as_of or view.valid_until is None or as_of < view.valid_until:
+            return True
+        if prefix is None:
+            return False
+        if prefix not in view.prefix_valid_until:
+            view.prefix_valid_until[prefix] = order_horizon(view, prefix)
+        until = view.prefix_valid_until[prefix]
+        return until is None or as_of < until
+
+    def view(self, session: Session, project_id: int, status: str, as_of: datetime,
+             prefix: Optional[int] = None) -> RankedView:
+        """``status`` tickets of a project in display order at ``as_of``.
+
+        With ``prefix``, only the first ``prefix`` rows are guaranteed to be
+        in order (enough for a first page), which lets an entry be reused
+        well past the point where rows further down have swapped.
+        """
+        key = (project_id, status)
+        version = project_version(session, project_id)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and self._valid(cached, version, as_of, prefix):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        view = rank_store.ranked(session, project_id, status, as_of)
+        view.valid_until = order_horizon(view)
+        with self._lock:
+            current = self._entries.get(key)
+            # Older as_of values (later pages of a listing) must not displace a newer order.
+            if current is None or current.as_of <= as_of or current.version < view.version:
+                self._entries[key] = view
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return view
+
+    def discard(self, project_ids=None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if project_ids is None or k[0] in project_ids]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+rank_cache = RankCache()
+
+
+# ---------------------------
+# HTTP validators
+# ---------------------------
+# Parts come from the database (versions.read_validators, rank views), so
+# every worker computes the same validator and restarts keep it valid.
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """ETag/Last-Modified (when known), and ``no-cache`` so proxies revalidate instead of serving stale ranks."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Whether the client's copy is current.
+
+    ``If-None-Match`` wins when present. ``If-Modified-Since`` is only
+    consulted when ``last_modified`` is given, i.e. for content that changes
+    only on writes (pages showing live scores change in between).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        # Weak comparison: W/"x" and "x" match.
+        return "*" in tags or etag.removeprefix("W/") in {t.removeprefix("W/") for t in tags}
+    since = request.headers.get("if-modified-since")
+    if since and last_modified is not None:
+        try:
+            client = parsedate_to_datetime(since).astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= client
+    return False
@@ -0,0 +1,281 @@
+# ==========================================================
+# rank_store.py — In-memory columnar ranking store
+# ==========================================================
+# Ranking needs six values per ticket: id, status, created_at, the pscore
+# line (intercept, slope, base floor) and its near-duplicate group. Each
+# project's tickets are held as parallel numpy arrays sorted by id, roughly
+# 42 bytes per ticket, against kilobytes for a hydrated ``Ticket`` with its
+# description.
+#
+# The store follows each project's write version in the database
+# (services/versions.py): a write whose version before it matches the one
+# the store holds is applied in place; anything else (bulk ingest, other
+# workers, other tools) leaves the project stale and the next read reloads
+# it with one narrow query.
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .metrics import SCORING_SECONDS
+from .next_up import next_up
+from .scoring import (
+    STATUS_ORDER,
+    datetime_micros,
+    load_scoring_frame,
+    micros_to_days,
+    priority_weights,
+    rank_order,
+    score_lines,
+)
+from .versions import project_version, read_versions
+
+
+def live_scores(intercept: np.ndarray, slope: np.ndarray, base: np.ndarray, now: datetime) -> np.ndarray:
+    """Live pscore at ``now``; the base weight is the floor, as in ``compute_pscore``."""
+    now_days = micros_to_days(datetime_micros(now))
+    return np.round(np.maximum(base, intercept + slope * now_days), 4)
+
+
+@dataclass
+class RankedView:
+    """One status of one project in display order, as ranked at ``as_of``."""
+    project_id: int
+    status: str
+    version: int
+    as_of: datetime
+    ids: np.ndarray
+    created: np.ndarray
+    intercept: np.ndarray
+    slope: np.ndarray
+    base: np.ndarray
+    # duplicate_of, or the ticket's own id
+    group: np.ndarray
+    by_score: bool = True
+    # When the order may next change without a write (set by the rank cache),
+    # in full and for the first k rows.
+    valid_until: Optional[datetime] = None
+    prefix_valid_until: Dict[int, Optional[datetime]] = field(default_factory=dict)
+    _collapsed: Optional["RankedView"] = field(default=None, repr=False, compare=False)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def collapsed(self) -> "RankedView":
+        """This order with only the best-ranked ticket of each near-duplicate group.
+
+        Derived from the full order, so it stays valid exactly as long as
+        that does; computed once per view.
+        """
+        if self._collapsed is None:
+            _, first = np.unique(self.group, return_index=True)
+            if len(first) == len(self):
+                self._collapsed = self
+            else:
+                rows = np.sort(first)
+                self._collapsed = replace(
+                    self, ids=self.ids[rows], created=self.created[rows], intercept=self.intercept[rows],
+                    slope=self.slope[rows], base=self.base[rows], group=self.group[rows],
+                    prefix_valid_until={}, _collapsed=None,
+                )
+        return self._collapsed
+
+    def scores(self, now: datetime, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        rows = slice(start, stop)
+        return live_scores(self.intercept[rows], self.slope[rows], self.base[rows], now)
+
+
+class ProjectRanks:
+    """One project's ranking columns, parallel arrays sorted by ticket id."""
+
+    __slots__ = ("project_id", "version", "ids", "status", "created", "intercept", "slope", "base", "group")
+
+    def __init__(self, project_id: int, version: int, ids, status, created, intercept, slope, base, group):
+        self.project_id = project_id
+        self.version = version
+        self.ids = ids
+        self.status = status
+        self.created = created
+        self.intercept = intercept
+        self.slope = slope
+        self.base = base
+        self.group = group
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, c).nbytes for c in self.__slots__[2:])
+
+    def copy(self) -> "ProjectRanks":
+        return ProjectRanks(self.project_id, self.version, *(getattr(self, c).copy() for c in self.__slots__[2:]))
+
+    def view(self, status: str, status_code: int, now: datetime) -> RankedView:
+        """Tickets of one status in display order at ``now`` (copies of the columns)."""
+        rows = np.flatnonzero(self.status == status_code)
+        ids, created = self.ids[rows], self.created[rows]
+        by_score = status != "Completed"
+        scores = live_scores(self.intercept[rows], self.slope[rows], self.base[rows], now)
+        bucket = np.full(len(rows), 0 if by_score else STATUS_ORDER["Completed"])
+        rows = rows[rank_order(bucket, scores, created, ids)]
+        return RankedView(
+            self.project_id, status, self.version, now, self.ids[rows], self.created[rows],
+            self.intercept[rows], self.slope[rows], self.base[rows], self.group[rows], by_score,
+        )
+
+    def patch(self, ids: np.ndarray, columns: Dict[str, np.ndarray], removed: Iterable[int] = ()) -> None:
+        """Upsert rows (``ids`` plus their columns) and drop ``removed`` ids, keeping id order."""
+        removed = np.asarray(sorted(set(removed) - set(ids.tolist())), dtype=np.int64)
+        if len(removed):
+            at = np.searchsorted(self.ids, removed)
+            inside = at < len(self.ids)
+            at = at[inside][self.ids[at[inside]] == removed[inside]]
+            for name in ("ids", *columns):
+                setattr(self, name, np.delete(getattr(self, name), at))
+        for i, tid in enumerate(ids.tolist()):
+            at = int(np.searchsorted(self.ids, tid))
+            if at < len(self.ids) and self.ids[at] == tid:
+                for name, values in columns.items():
+                    getattr(self, name)[at] = values[i]
+                continue
+            # New ids are usually the largest, so this is nearly always an append.
+            self.ids = np.insert(self.ids, at, tid)
+            for name, values in columns.items():
+                setattr(self, name, np.insert(getattr(self, name), at, values[i]))
+
+
+class RankStore:
+    """Per-project ranking columns, loaded on first use and kept in step with writes."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._projects: Dict[int, ProjectRanks] = {}
+        self._status_codes: Dict[Optional[str], int] = {}
+        self.loads = 0
+        self.patches = 0
+
+    def status_code(self, status: Optional[str]) -> int:
+        """Small integer for a status string (interned on first sight)."""
+        with self._lock:
+            code = self._status_codes.get(status)
+            if code is None:
+                code = self._status_codes[status] = len(self._status_codes)
+            return code
+
+    def _columns(self, priorities, statuses, created: np.ndarray, group: np.ndarray) -> Dict[str, np.ndarray]:
+        base, mult = priority_weights(priorities)
+        intercept, slope = score_lines(base, mult, created)
+        status = np.array([self.status_code(s) for s in statuses], dtype=np.int16)
+        return {"status": status, "created": created, "intercept": intercept, "slope": slope, "base": base,
+                "group": group}
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    def load(self, session: Session, project_ids: Iterable[int]) -> None:
+        """(Re)load projects from the database with one narrow query."""
+        pids = list(project_ids)
+        # Read versions first: a write landing during the query leaves the entry stale.
+        versions = read_versions(session, pids)
+        df = load_scoring_frame(session, pids)
+        created = df["created_at"].to_numpy().astype("datetime64[us]").astype(np.int64)
+        dup_group = df["duplicate_of"].astype(np.float64).fillna(df["id"]).to_numpy(np.int64)
+        groups = {pid: np.flatnonzero(df["project_id"].to_numpy() == pid) for pid in pids}
+        with self._lock:
+            for pid in pids:
+                rows = groups[pid]
+                rows = rows[np.argsort(df["id"].to_numpy()[rows], kind="stable")]
+                columns = self._columns(df["priority"].to_numpy()[rows], df["status"].to_numpy()[rows],
+                                        created[rows], dup_group[rows])
+                ids = df["id"].to_numpy(dtype=np.int64)[rows]
+                self._projects[pid] = ProjectRanks(pid, versions[pid], ids, **columns)
+            self.loads += len(pids)
+
+    def project(self, session: Session, project_id: int) -> ProjectRanks:
+        """A project's columns, reloaded first if a write has not been applied."""
+        current = project_version(session, project_id)
+        with self._lock:
+            entry = self._projects.get(project_id)
+            fresh = entry is not None and entry.version == current
+        if not fresh:
+            self.load(session, [project_id])
+        with self._lock:
+            return self._projects[project_id]
+
+    def snapshot(self, session: Session, project_id: int) -> ProjectRanks:
+        """A copy of a project's columns, safe to read while writes are applied."""
+        entry = self.project(session, project_id)
+        with self._lock:
+            return entry.copy()
+
+    def ranked(self, session: Session, project_id: int, status: str, now: datetime) -> RankedView:
+        entry = self.project(session, project_id)
+        code = self.status_code(status)
+        with self._lock, SCORING_SECONDS.time("rank_view"):
+            return entry.view(status, code, now)
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def apply(self, project_id: Optional[int], before: Optional[int], after: Optional[int],
+              tickets: Sequence = (), removed: Iterable[int] = ()) -> None:
+        """Apply committed ticket writes that took a project from version ``before`` to ``after``.
+
+        Only a project loaded at ``before`` is patched; otherwise a write was
+        missed and the entry stays stale until the next read.
+        """
+        if project_id is None or before is None or after is None:
+            return
+        with self._lock:
+            entry = self._projects.get(project_id)
+            if entry is None or entry.version != before:
+                return
+            ids = np.array([t.id for t in tickets], dtype=np.int64)
+            created = np.array([datetime_micros(t.created_at) for t in tickets], dtype=np.int64)
+            group = np.array([t.duplicate_of or t.id for t in tickets], dtype=np.int64)
+            columns = self._columns([t.priority for t in tickets], [t.status for t in tickets], created, group)
+            entry.patch(ids, columns, removed)
+            entry.version = after
+            self.patches += 1
+
+    def discard(self, project_ids: Optional[Iterable[int]] = None) -> None:
+        with self._lock:
+            if project_ids is None:
+                self._projects.clear()
+            for pid in project_ids or ():
+                self._projects.pop(pid, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "projects": len(self._projects),
+                "tickets": sum(len(p) for p in self._projects.values()),
+                "bytes": sum(p.nbytes for p in self._projects.values()),
+                "loads": self.loads,
+                "patches": self.patches,
+            }
+
+
+rank_store = RankStore()
+
+
+def record_writes(before: Dict[int, int], after: Dict[int, int], tickets: Sequence = (),
+                  moved_from: Optional[int] = None) -> None:
+    """Feed tickets just committed to the rank store and next-up queue.
+
+    ``before`` and ``after`` are the touched projects' versions from
+    ``lock_versions`` and ``read_versions`` around the write.
+    """
+    by_project: Dict[int, List] = {}
+    for t in tickets:
+        by_project.setdefault(t.project_id, []).append(t)
+    for pid, version in after.items():
+        removed = [t.id for t in tickets] if pid == moved_from and pid not in by_project else ()
+        rank_store.apply(pid, before.get(pid), version, by_project.get(pid, ()), removed)
+    next_up.apply(before, after, tickets)
@@ -0,0 +1,202 @@
+# ==========================================================
+# rescoring.py — Write-coalescing background rescore scheduler
+# ==========================================================
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .scoring import score_projects
+
+log = logging.getLogger(__name__)
+
+# Quiet period after the last write before a dirty project is rescored
+DEBOUNCE_SECONDS = float(os.getenv("ATILA_RESCORE_DEBOUNCE_SECONDS", "0.5"))
+# Upper bound on how long a project stays dirty under a continuous write stream
+MAX_STALENESS_SECONDS = float(os.getenv("ATILA_RESCORE_MAX_STALENESS_SECONDS", "5"))
+RETRY_SECONDS = 5.0
+
+
+@dataclass
+class _Dirty:
+    first: float
+    last: float
+    version: int
+    urgent: bool = False
+    not_before: float = 0.0
+
+
+class RescoreScheduler:
+    """Marks projects dirty on write and rescores them off the request path.
+
+    A burst of writes to one project collapses into a single rescore once
+    the project has been quiet for ``debounce`` seconds, or after
+    ``max_staleness`` seconds at the latest. Due projects are rescored
+    together in one batch pass. ``wait_fresh`` lets a caller block until
+    the writes it made are reflected in the stored ranks.
+    """
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS, max_staleness: float = MAX_STALENESS_SECONDS):
+        self.debounce = debounce
+        self.max_staleness = max_staleness
+        self.engine = None
+        self._cond = threading.Condition()
+        self._dirty: Dict[int, _Dirty] = {}
+        self._version: Dict[int, int] = {}
+        self._scored: Dict[int, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.rescores = 0
+        self.projects_rescored = 0
+        self.marks = 0
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine) -> None:
+        self.engine = engine
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="atila-rescore", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain and self.engine is not None:
+            self.flush()
+
+    # ---------------------------
+    # Producer API
+    # ---------------------------
+    def mark_dirty(self, project_ids: Iterable[Optional[int]]) -> Dict[int, int]:
+        """Record that tickets in these projects changed; returns their new versions."""
+        now = time.monotonic()
+        versions = {}
+        with self._cond:
+            for pid in project_ids:
+                if pid is None:
+                    continue
+                version = self._version.get(pid, 0) + 1
+                self._version[pid] = version
+                versions[pid] = version
+                entry = self._dirty.get(pid)
+                if entry is None:
+                    self._dirty[pid] = _Dirty(first=now, last=now, version=version)
+                else:
+                    entry.last = now
+                    entry.version = version
+                self.marks += 1
+            self._cond.notify_all()
+        return versions
+
+    def is_fresh(self, project_id: int) -> bool:
+        with self._cond:
+            return self._scored.get(project_id, 0) >= self._version.get(project_id, 0)
+
+    def wait_fresh(self, project_ids: Optional[Iterable[int]] = None, timeout: Optional[float] = None) -> bool:
+        """Block until writes seen so far are reflected in the stored ranks.
+
+        Waiting skips the debounce for those projects. Returns False on
+        timeout. Without a running scheduler the rescore runs inline.
+        """
+        with self._cond:
+            pids = list(self._dirty) if project_ids is None else [p for p in project_ids if p is not None]
+            targets = {pid: self._version.get(pid, 0) for pid in pids}
+            for pid in pids:
+                if pid in self._dirty:
+                    self._dirty[pid].urgent = True
+            self._cond.notify_all()
+
+        if not self.running:
+            self.flush(targets)
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(self._scored.get(pid, 0) < v for pid, v in targets.items()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def flush(self, targets: Optional[Dict[int, int]] = None) -> None:
+        """Rescore dirty projects now, on the calling thread."""
+        with self._cond:
+            pids = list(self._dirty) if targets is None else [p for p in targets if p in self._dirty]
+            batch = {pid: self._dirty.pop(pid).version for pid in pids}
+        if batch:
+            self._rescore(batch)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "dirty_projects": len(self._dirty),
+                "marks": self.marks,
+                "rescores": self.rescores,
+                "projects_rescored": self.projects_rescored,
+            }
+
+    # ---------------------------
+    # Worker
+    # ---------------------------
+    def _due(self, now: float) -> Tuple[List[int], Optional[float]]:
+        due, next_at = [], None
+        for pid, d in self._dirty.items():
+            at = d.first if d.urgent else min(d.last + self.debounce, d.first + self.max_staleness)
+            at = max(at, d.not_before)
+            if at <= now:
+                due.append(pid)
+            elif next_at is None or at < next_at:
+                next_at = at
+        return due, None if next_at is None else next_at - now
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                due, wait = self._due(time.monotonic())
+                if not due:
+                    self._cond.wait(wait)
+                    continue
+                batch = {pid: self._dirty.pop(pid).version for pid in due}
+            self._rescore(batch)
+
+    def _rescore(self, batch: Dict[int, int]) -> None:
+        try:
+            with Session(self.engine) as session:
+                score_projects(session, list(batch))
+        except Exception:
+            log.exception("Rescore failed for projects %s; retrying", sorted(batch))
+            now = time.monotonic()
+            with self._cond:
+                for pid, version in batch.items():
+                    entry = self._dirty.setdefault(pid, _Dirty(first=now, last=now, version=version))
+                    entry.not_before = now + RETRY_SECONDS
+            return
+        with self._cond:
+            for pid, version in batch.items():
+                self._scored[pid] = max(self._scored.get(pid, 0), version)
+            self.rescores += 1
+            self.projects_rescored += len(batch)
+            self._cond.notify_all()
+
+
+scheduler = RescoreScheduler()
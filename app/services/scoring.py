@@ -1,8 +1,13 @@
 from datetime import datetime, timezone
-from typing import List, Tuple
-from sqlalchemy import select
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import String, case, func, select, type_coerce
 from sqlalchemy.orm import Session
+from .metrics import DB_SECONDS, SCORING_SECONDS, TICKETS_SCORED
 from .models import Ticket, Project
+from .versions import mark_rescored, read_versions
 
 
 # ---------------------------
@@ -24,6 +29,18 @@ AGE_MULTIPLIER = {
     "Backlog": 5.0,      # backlog ages more aggressively
     "Completed": 0.0,
 }
+STATUS_ORDER = {
+    "Active": 0,
+    "Backlog": 1,
+    "Completed": 2,
+}
+EPOCH = datetime(1970, 1, 1)
+# (status bucket, display_score offset, ticket_order_id offset)
+RANK_OFFSETS = {
+    "Active": (0, 0, 0),
+    "Backlog": (1, 1000, 10000),
+    "Completed": (2, 10000, 100000),
+}
 
 
 # ---------------------------
@@ -46,31 +63,260 @@ def compute_pscore(ticket: Ticket, now: datetime) -> float:
     return round(base + mult * age_days, 4)
 
 
+# ---------------------------
+# Time-invariant Score Line
+# ---------------------------
+def scoring_now() -> datetime:
+    """Naive local time, the reference clock for every pscore evaluation."""
+    return datetime.now(timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def epoch_days(dt: datetime) -> float:
+    """Days since the Unix epoch for a (naive or aware) datetime."""
+    return (dt.replace(tzinfo=None) - EPOCH).total_seconds() / 86400.0
+
+
+def score_coefficients(priority: Optional[str], created_at: Optional[datetime]) -> Tuple[float, float]:
+    """Return the (intercept, slope) of a ticket's pscore line.
+
+    ``base + mult * age_days`` rewritten in epoch days is
+    ``(base - mult * created_days) + mult * now_days``; neither term depends
+    on ``now``, so they only change when priority or created_at change.
+    """
+    priority = str(priority or "Medium")
+    base = BASE_WEIGHTS.get(priority, 2)
+    mult = AGE_MULTIPLIER.get(priority, 1.0)
+    if not isinstance(created_at, datetime):
+        return float(base), 0.0
+    return base - mult * epoch_days(created_at), mult
+
+
+NAT = np.iinfo(np.int64).min
+_EPOCH_US = np.datetime64(EPOCH, "us").astype(np.int64)
+
+
+def datetime_micros(value: Optional[datetime]) -> int:
+    """Microseconds since the epoch for a datetime; NAT for anything else."""
+    if not isinstance(value, datetime):
+        return NAT
+    return int(np.datetime64(value.replace(tzinfo=None), "us").astype(np.int64))
+
+
+def micros_to_days(micros) -> np.ndarray:
+    return (np.asarray(micros) - _EPOCH_US) / 10**6 / 86400.0
+
+
+def priority_weights(priorities: Iterable[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(base weight, age multiplier) arrays for a sequence of priorities."""
+    names = pd.Series(list(priorities), dtype=object)
+    names = names.where(names.notna() & (names != ""), "Medium")
+    base = names.map(BASE_WEIGHTS).fillna(2).to_numpy(dtype=np.float32)
+    mult = names.map(AGE_MULTIPLIER).fillna(1.0).to_numpy(dtype=np.float32)
+    return base, mult
+
+
+def score_lines(base: np.ndarray, mult: np.ndarray, created: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``score_coefficients`` over created_at in epoch microseconds."""
+    has_created = created != NAT
+    intercept = np.where(has_created, base - mult * micros_to_days(created), base)
+    slope = np.where(has_created, mult, 0.0).astype(np.float32)
+    return intercept, slope
+
+
+def apply_score_coefficients(ticket: Ticket) -> None:
+    """Store the pscore line on a ticket (call whenever priority/created_at change)."""
+    ticket.score_intercept, ticket.score_slope = score_coefficients(ticket.priority, ticket.created_at)
+
+
+def live_pscore_expr(now: datetime):
+    """SQL expression evaluating pscore at ``now`` from the stored score line.
+
+    The base weight acts as a floor, mirroring the ``max(0, age)`` clamp in
+    ``compute_pscore``. Rows without coefficients fall back to the stored pscore.
+    """
+    base = case(BASE_WEIGHTS, value=Ticket.priority, else_=2)
+    line = Ticket.score_intercept + Ticket.score_slope * epoch_days(now)
+    return func.round(func.coalesce(func.max(base, line), Ticket.pscore), 4)
+
+
+def ranked_tickets_stmt(project_id: int, now: datetime):
+    """Select a project's tickets in display order, ranked at ``now`` by SQL.
+
+    Same order as ``rank_and_assign_display_scores``: Active then Backlog by
+    descending pscore, Completed oldest first, ties by created_at then id.
+    """
+    bucket = case(STATUS_ORDER, value=Ticket.status, else_=len(STATUS_ORDER))
+    score_key = case((Ticket.status == "Completed", 0.0), else_=-live_pscore_expr(now))
+    return (
+        select(Ticket)
+        .where(Ticket.project_id == project_id)
+        .order_by(bucket, score_key, Ticket.created_at, Ticket.id)
+    )
+
+
+def rank_order(bucket: np.ndarray, score: np.ndarray, created: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Indices in display order: status bucket, pscore desc (Completed:
+    oldest first), then created_at and id."""
+    score_key = np.where(bucket == STATUS_ORDER["Completed"], 0.0, -score)
+    # lexsort is stable and sorts by the last key first.
+    return np.lexsort((ids, created, score_key, bucket))
+
+
 def rank_and_assign_display_scores(tickets: List[Ticket]) -> Tuple[List[Ticket], List[Ticket], List[Ticket]]:
     """Rank tickets and assign display and ticket_order IDs."""
-    active = [t for t in tickets if t.status == "Active"]
-    backlog = [t for t in tickets if t.status == "Backlog"]
-    completed = [t for t in tickets if t.status == "Completed"]
+    tickets = [t for t in tickets if t.status in RANK_OFFSETS]
+    bucket = np.array([RANK_OFFSETS[t.status][0] for t in tickets], dtype=np.int64)
+    score = np.array([t.pscore or 0.0 for t in tickets], dtype=float)
+    created = np.array([t.created_at for t in tickets], dtype="datetime64[us]").astype(np.int64)
+    ids = np.array([t.id or 0 for t in tickets], dtype=np.int64)
+
+    ranked = {status: [] for status in RANK_OFFSETS}
+    for i in rank_order(bucket, score, created, ids).tolist():
+        t = tickets[i]
+        group = ranked[t.status]
+        group.append(t)
+        _, display_offset, order_offset = RANK_OFFSETS[t.status]
+        t.display_score = display_offset + len(group)
+        t.ticket_order_id = order_offset + len(group)
+    return ranked["Active"], ranked["Backlog"], ranked["Completed"]
+
+
+# ---------------------------
+# Batch Scoring Engine
+# ---------------------------
+SCORING_COLUMNS = ["id", "project_id", "priority", "status", "created_at", "duplicate_of"]
+UPDATE_CHUNK = 50_000
+
+# One prepared statement for every row, executed through the DBAPI's
+# executemany; unranked statuses keep their display columns.
+BULK_SCORE_UPDATE = (
+    "UPDATE ticket SET pscore = ?, score_intercept = ?, score_slope = ?, "
+    "display_score = COALESCE(?, display_score), "
+    "ticket_order_id = COALESCE(?, ticket_order_id) "
+    "WHERE id = ?"
+)
+
+
+def load_scoring_frame(session: Session, project_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """Fetch only the scoring columns for tickets that belong to a project.
+
+    created_at is read as its stored ISO text and parsed by pandas in one go.
+    """
+    stmt = select(
+        Ticket.id,
+        Ticket.project_id,
+        Ticket.priority,
+        Ticket.status,
+        type_coerce(Ticket.created_at, String),
+        Ticket.duplicate_of,
+    ).where(Ticket.project_id.in_(select(Project.id)))
+    if project_ids is not None:
+        stmt = stmt.where(Ticket.project_id.in_(list(project_ids)))
+    with DB_SECONDS.time("load_scoring_frame"):
+        rows = session.execute(stmt).all()
+    df = pd.DataFrame(rows, columns=SCORING_COLUMNS)
+    df["created_at"] = pd.to_datetime(df["created_at"], format="ISO8601", errors="coerce")
+    return df
 
-    # Active: highest first
-    active.sort(key=lambda t: (-t.pscore, t.created_at, t.id or 0))
-    for i, t in enumerate(active, start=1):
-        t.display_score = i
-        t.ticket_order_id = i
 
-    # Backlog: lower weight but aging
-    backlog.sort(key=lambda t: (-t.pscore, t.created_at, t.id or 0))
-    for i, t in enumerate(backlog, start=1):
-        t.display_score = 1000 + i
-        t.ticket_order_id = 10000 + i
+def _micros(values: np.ndarray) -> np.ndarray:
+    """datetime64 values as integer microseconds (NaT stays the int64 minimum)."""
+    return values.astype("datetime64[us]").astype(np.int64)
 
-    # Completed: oldest first
-    completed.sort(key=lambda t: (t.created_at, t.id or 0))
-    for i, t in enumerate(completed, start=1):
-        t.display_score = 10000 + i
-        t.ticket_order_id = 100000 + i
 
-    return active, backlog, completed
+def score_frame(df: pd.DataFrame, now: datetime) -> pd.DataFrame:
+    """Vectorized ``compute_pscore`` + ``rank_and_assign_display_scores``.
+
+    Adds pscore, score_intercept, score_slope, display_score and
+    ticket_order_id columns. Arithmetic follows ``compute_pscore`` step by
+    step (integer microseconds, the same float divisions and Python
+    rounding) so pscores and tie-breaks match the per-ticket path exactly.
+    Statuses outside Active/Backlog/Completed get a pscore but no rank.
+    """
+    out = df.copy()
+    n = len(out)
+    priority = out["priority"].where(out["priority"].notna() & (out["priority"] != ""), "Medium").astype(str)
+    base = priority.map(BASE_WEIGHTS).fillna(2).to_numpy(dtype=float)
+    mult = priority.map(AGE_MULTIPLIER).fillna(1.0).to_numpy(dtype=float)
+
+    created = _micros(pd.to_datetime(out["created_at"]).to_numpy())
+    has_created = created != np.iinfo(np.int64).min
+    now_us = _micros(np.array([np.datetime64(now)]))[0]
+    epoch_us = _micros(np.array([np.datetime64(EPOCH)]))[0]
+
+    age_days = np.where(has_created, (now_us - created) / 10**6 / 86400.0, 0.0)
+    raw = base + mult * np.maximum(0.0, age_days)
+    out["pscore"] = [round(x, 4) for x in raw.tolist()]
+    created_days = (created - epoch_us) / 10**6 / 86400.0
+    out["score_intercept"] = np.where(has_created, base - mult * created_days, base)
+    out["score_slope"] = np.where(has_created, mult, 0.0)
+
+    offsets = out["status"].map(RANK_OFFSETS)
+    ranked = offsets.notna().to_numpy()
+    bucket = np.array([o[0] if isinstance(o, tuple) else -1 for o in offsets], dtype=np.int64)
+    completed = bucket == RANK_OFFSETS["Completed"][0]
+    score_key = np.where(completed, 0.0, -out["pscore"].to_numpy(dtype=float))
+    project = out["project_id"].to_numpy(dtype=np.int64)
+    ids = out["id"].to_numpy(dtype=np.int64)
+
+    # lexsort is stable and sorts by the last key first.
+    order = np.lexsort((ids, created, score_key, bucket, project))
+    group = np.stack([project[order], bucket[order]], axis=1)
+    new_group = np.ones(n, dtype=bool)
+    if n > 1:
+        new_group[1:] = (group[1:] != group[:-1]).any(axis=1)
+    starts = np.maximum.accumulate(np.where(new_group, np.arange(n), 0))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - starts + 1
+
+    display_offset = np.array([o[1] if isinstance(o, tuple) else 0 for o in offsets], dtype=np.int64)
+    order_offset = np.array([o[2] if isinstance(o, tuple) else 0 for o in offsets], dtype=np.int64)
+    out["display_score"] = pd.array(display_offset + rank, dtype="Int64")
+    out["ticket_order_id"] = pd.array(order_offset + rank, dtype="Int64")
+    out.loc[~ranked, ["display_score", "ticket_order_id"]] = pd.NA
+    return out
+
+
+def write_scores(session: Session, scored: pd.DataFrame) -> None:
+    """Write a scored frame back with one executemany UPDATE per chunk."""
+    def nullable(col: str) -> list:
+        values = scored[col].astype(object)
+        return values.where(values.notna(), None).tolist()
+
+    params = list(zip(
+        scored["pscore"].tolist(),
+        scored["score_intercept"].tolist(),
+        scored["score_slope"].tolist(),
+        nullable("display_score"),
+        nullable("ticket_order_id"),
+        scored["id"].astype(int).tolist(),
+    ))
+    # Holds the SQLite write lock from the first UPDATE to the commit.
+    with DB_SECONDS.time("write_scores"):
+        conn = session.connection()
+        for start in range(0, len(params), UPDATE_CHUNK):
+            conn.exec_driver_sql(BULK_SCORE_UPDATE, params[start:start + UPDATE_CHUNK])
+        session.commit()
+
+
+def score_projects(session: Session, project_ids: Optional[Iterable[int]] = None, now: Optional[datetime] = None) -> int:
+    """Rescore the given projects (all projects when None) in one batch pass."""
+    if project_ids is not None:
+        project_ids = list(project_ids)
+    with SCORING_SECONDS.time("score_projects"):
+        # Read first: the pass covers at least these versions.
+        versions = read_versions(session, project_ids)
+        df = load_scoring_frame(session, project_ids)
+        if df.empty:
+            mark_rescored(session, versions)
+            session.commit()
+            return 0
+        with SCORING_SECONDS.time("score_frame"):
+            scored = score_frame(df, now or scoring_now())
+        mark_rescored(session, versions)
+        write_scores(session, scored)
+    TICKETS_SCORED.inc(len(df))
+    return len(df)
 
 
 # ---------------------------
@@ -78,22 +324,9 @@ def rank_and_assign_display_scores(tickets: List[Ticket]) -> Tuple[List[Ticket],
 # ---------------------------
 def assign_all_scores_for_project(session: Session, project_id: int):
     """Recalculate scores and display order for all tickets in a project."""
-    now = datetime.now(timezone.utc).astimezone().replace(tzinfo=None)
-
-    tickets = session.execute(
-        select(Ticket).where(Ticket.project_id == project_id)
-    ).scalars().all()
-
-    for t in tickets:
-        t.pscore = compute_pscore(t, now)
-
-    a, b, c = rank_and_assign_display_scores(tickets)
-    session.add_all(a + b + c)
-    session.commit()
+    score_projects(session, [project_id])
 
 
 def recalc_scores(session: Session):
     """Recalculate scores for all projects."""
-    projects = session.execute(select(Project)).scalars().all()
-    for p in projects:
-        assign_all_scores_for_project(session, p.id)
+    score_projects(session)
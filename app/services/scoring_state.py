@@ -0,0 +1,147 @@
+# ==========================================================
+# scoring_state.py — Scoring watermark + boot-time recalc
+# ==========================================================
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Project, ScoringWatermark, Ticket
+from .scoring import AGE_MULTIPLIER, BASE_WEIGHTS, RANK_OFFSETS, recalc_scores, score_projects
+from .versions import unscored_projects
+
+try:  # single-writer lock across uvicorn workers (POSIX only)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev boxes run one worker
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# "auto": rescore in the background only what the watermarks say is stale
+# "sync": always recalc before serving (the original behaviour)
+# "off":  never recalc at boot
+STARTUP_MODE = os.getenv("ATILA_STARTUP_RECALC", "auto").lower()
+MAX_SCORE_AGE = timedelta(hours=float(os.getenv("ATILA_SCORING_MAX_AGE_HOURS", "24")))
+
+
+def weights_hash() -> str:
+    """Fingerprint of the scoring tables; a change invalidates every score."""
+    blob = json.dumps([BASE_WEIGHTS, AGE_MULTIPLIER, RANK_OFFSETS], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def stale_projects(session: Session, now: Optional[datetime] = None) -> Optional[List[int]]:
+    """Projects whose stored scores miss writes; None when every project needs a recalc.
+
+    Every score pass (background rescores included) advances its projects'
+    watermark in ranking_version, so only writes no pass has covered count.
+    """
+    mark = session.get(ScoringWatermark, 1)
+    if mark is None or mark.weights_hash != weights_hash():
+        return None
+    if (now or datetime.utcnow()) - mark.scored_at > MAX_SCORE_AGE:
+        return None
+    stale = set(unscored_projects(session))
+    stale.update(session.execute(
+        select(Ticket.project_id).distinct()
+        .where(Ticket.score_slope.is_(None), Ticket.project_id.in_(select(Project.id)))
+    ).scalars())
+    return sorted(stale)
+
+
+def is_stale(session: Session, now: Optional[datetime] = None) -> bool:
+    """True when tickets changed (or scores aged out) since they were last scored."""
+    return stale_projects(session, now) != []
+
+
+def recalc_with_watermark(session: Session) -> None:
+    """Run the full recalc and record when it ran."""
+    started = datetime.utcnow()
+    recalc_scores(session)
+    mark = session.get(ScoringWatermark, 1) or ScoringWatermark(id=1)
+    mark.scored_at = started
+    mark.weights_hash = weights_hash()
+    session.add(mark)
+    session.commit()
+
+
+class _WriterLock:
+    """Exclusive advisory file lock held while one worker rescores."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fh = open(self.path, "a")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+class StartupRecalc:
+    """Boot-time recalc that never blocks the server from accepting traffic.
+
+    Every worker takes the writer lock in a background thread and re-checks
+    the watermark once it holds it, so the first worker rescores and the
+    rest find fresh scores and skip. ``state`` drives the readiness probe.
+    """
+
+    def __init__(self, engine, lock_path: Path, mode: str = STARTUP_MODE):
+        self.engine = engine
+        self.lock = _WriterLock(lock_path)
+        self.mode = mode
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ("fresh", "recalculated", "disabled")
+
+    def start(self) -> None:
+        if self.mode == "off":
+            self.state = "disabled"
+        elif self.mode == "sync":
+            self._run(force=True)
+        else:
+            self._thread = threading.Thread(target=self._run, name="atila-startup-recalc", daemon=True)
+            self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, force: bool = False) -> None:
+        try:
+            with self.lock, Session(self.engine) as session:
+                stale = None if force else stale_projects(session)
+                if stale == []:
+                    self.state = "fresh"
+                    return
+                self.state = "running"
+                if stale is None:
+                    recalc_with_watermark(session)
+                else:
+                    log.info("Rescoring %d projects with unscored writes", len(stale))
+                    score_projects(session, stale)
+                self.state = "recalculated"
+        except Exception as e:
+            log.exception("Startup recalc failed: %s", e)
+            self.error = str(e)
+            self.state = "failed"
@@ -0,0 +1,164 @@
+# ==========================================================
+# search.py — Full-text ticket search (SQLite FTS5)
+# ==========================================================
+# ticket_fts is a contentless FTS5 index over Ticket.title and
+# Ticket.description, plus one-token project/source/status columns so
+# filters are doclist intersections inside the MATCH rather than a join.
+# It stores only the inverted index (text is read back from ticket) and
+# is kept in sync by triggers, so every write path (ORM, bulk upsert,
+# raw SQL) updates it in the same transaction.
+#
+# A search takes the best SEARCH_CANDIDATES matches by bm25 (titles
+# weigh double), then re-ranks those by relevance blended with each
+# ticket's live pscore (completed tickets get no pscore boost). bm25 is
+# evaluated over every match, oldest tickets included; ORDER BY ... LIMIT
+# keeps only the best candidates in memory, so the cost of a search grows
+# with how many tickets match, not with the size of the table.
+from __future__ import annotations
+
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Integer, column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from .metrics import DB_SECONDS
+from .models import Ticket
+from .scoring import STATUS_ORDER, live_pscore_expr, scoring_now
+
+FTS_TABLE = "ticket_fts"
+SEARCH_CANDIDATES = int(os.getenv("ATILA_SEARCH_CANDIDATES", "200"))
+# Weight of the (candidate-normalized) pscore against relevance, both 0..1.
+SEARCH_PSCORE_WEIGHT = float(os.getenv("ATILA_SEARCH_PSCORE_WEIGHT", "0.5"))
+# Manual tickets have no integration source; ``source=manual`` selects them.
+MANUAL_SOURCE = "manual"
+
+# bm25 weights per column: title, description; filter columns never score.
+BM25_WEIGHTS = (2.0, 1.0, 0.0, 0.0, 0.0)
+# The values each trigger indexes; a 'delete' must repeat them exactly.
+_ROW = "{0}.id, {0}.title, {0}.description, {0}.project_id, coalesce({0}.integration_source, '%s'), {0}.status" % MANUAL_SOURCE
+_COLUMNS = "rowid, title, description, project, source, status"
+FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description, project, source, status, content='',
+        tokenize='porter unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER ticket_fts_insert AFTER INSERT ON ticket BEGIN
+        INSERT INTO {FTS_TABLE}({_COLUMNS}) VALUES ({_ROW.format("new")});
+    END""",
+    f"""CREATE TRIGGER ticket_fts_delete AFTER DELETE ON ticket BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, {_COLUMNS}) VALUES ('delete', {_ROW.format("old")});
+    END""",
+    # Upserts rewrite every column of a changed record; the index is only
+    # touched when an indexed value actually differs.
+    f"""CREATE TRIGGER ticket_fts_update
+    AFTER UPDATE OF title, description, project_id, integration_source, status ON ticket
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.project_id IS NOT new.project_id OR old.status IS NOT new.status
+        OR old.integration_source IS NOT new.integration_source BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, {_COLUMNS}) VALUES ('delete', {_ROW.format("old")});
+        INSERT INTO {FTS_TABLE}({_COLUMNS}) VALUES ({_ROW.format("new")});
+    END""",
+    f"INSERT INTO {FTS_TABLE}({_COLUMNS}) SELECT {_ROW.format('ticket')} FROM ticket",
+)
+
+_fts = table(FTS_TABLE, column("rowid", Integer))
+_bm25 = func.bm25(literal_column(FTS_TABLE), *BM25_WEIGHTS)
+_TERM = re.compile(r"\w+")
+
+
+# ---------------------------
+# Index Setup
+# ---------------------------
+def ensure_search_index(engine) -> bool:
+    """Create the FTS index and its triggers if missing, indexing existing tickets.
+
+    Returns whether the index was built.
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        if exists:
+            return False
+        for statement in FTS_DDL:
+            conn.exec_driver_sql(statement)
+    return True
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def _phrase(value: str) -> str:
+    return '"%s"' % value.replace('"', '""')
+
+
+def match_expression(query: str, project_id: Optional[int] = None, source: Optional[str] = None,
+                     status: Optional[str] = None) -> Optional[str]:
+    """An FTS5 MATCH expression requiring every word of ``query`` and the filters.
+
+    Everything is quoted, so user input never reaches the FTS5 query syntax.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    parts = [_phrase(t) for t in terms]
+    for name, value in (("project", project_id), ("source", source), ("status", status)):
+        # Values without a single token cannot narrow the index; the exact
+        # column checks in search_tickets still apply.
+        if value is not None and _TERM.search(str(value)):
+            parts.append(f"{name} : {_phrase(str(value))}")
+    return " ".join(parts)
+
+
+def _candidates(session: Session, expr: str, count: int) -> Dict[int, float]:
+    """``ticket id -> bm25 relevance`` (higher is better) of the best ``count`` matches."""
+    match = text(f"{FTS_TABLE} MATCH :expr").bindparams(expr=expr)
+    stmt = select(_fts.c.rowid, -_bm25).where(match).order_by(_bm25).limit(count)
+    return dict(session.execute(stmt).all())
+
+
+def search_tickets(session: Session, query: str, columns: Sequence[str], limit: int = 20,
+                   project_id: Optional[int] = None, source: Optional[str] = None,
+                   status: Optional[str] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Tickets matching ``query``, best first, with ``columns`` plus
+    ``relevance``, ``live_pscore`` and the blended ``search_score``."""
+    expr = match_expression(query, project_id, source, status)
+    if expr is None:
+        return []
+    now = now or scoring_now()
+    with DB_SECONDS.time("search"):
+        relevance = _candidates(session, expr, max(limit, SEARCH_CANDIDATES))
+        if not relevance:
+            return []
+        cols = [Ticket.__table__.c[n] for n in dict.fromkeys(["id", "status", *columns])]
+        stmt = select(*cols, live_pscore_expr(now).label("live_pscore")).where(Ticket.id.in_(list(relevance)))
+        # The index matches filter tokens; these make the filters exact.
+        if project_id is not None:
+            stmt = stmt.where(Ticket.project_id == project_id)
+        if source == MANUAL_SOURCE:
+            stmt = stmt.where(Ticket.integration_source.is_(None))
+        elif source is not None:
+            stmt = stmt.where(Ticket.integration_source == source)
+        if status is not None:
+            stmt = stmt.where(Ticket.status == status)
+        rows = session.execute(stmt).mappings().all()
+
+    top_relevance = max(relevance.values()) or 1.0
+    top_score = max((r["live_pscore"] or 0.0 for r in rows), default=0.0) or 1.0
+    items = []
+    for row in rows:
+        rel = relevance[row["id"]]
+        # Completed tickets rank by age, not pscore.
+        score = 0.0 if row["status"] == "Completed" else (row["live_pscore"] or 0.0)
+        blended = rel / top_relevance + SEARCH_PSCORE_WEIGHT * score / top_score
+        bucket = STATUS_ORDER.get(row["status"], len(STATUS_ORDER))
+        items.append((-round(blended, 6), bucket, row["id"], {
+            **{n: row[n] for n in columns},
+            "relevance": round(rel, 6),
+            "live_pscore": row["live_pscore"],
+            "search_score": round(blended, 4),
+        }))
+    items.sort(key=lambda item: item[:3])
+    return [item for *_, item in items[:limit]]
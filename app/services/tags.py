@@ -0,0 +1,126 @@
+# ==========================================================
+# tags.py — Interned tags for projects and tickets
+# ==========================================================
+# Project.tags stays the display string ("urgent, Score:[0.00], Ticket_ID:0");
+# the filterable copy lives in project_tag / ticket_tag, keyed by interned
+# tag ids so a tag filter is one primary-key range scan.
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Mapping
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import Project, ProjectTag, Tag, Ticket, TicketTag
+
+# Placeholders every project string carries; they are not real tags.
+DEFAULT_TAGS = ("Score:[0.00]", "Ticket_ID:0")
+# Azure sends "a; b", ServiceNow a single category, forms "a, b".
+_SEPARATORS = re.compile(r"[;,]")
+
+
+def normalize_tags(raw: str | None) -> str:
+    """Ensure our two required defaults exist in the tag string."""
+    existing = [t.strip() for t in (raw or "").split(",") if t.strip()]
+    for d in DEFAULT_TAGS:
+        if d not in existing:
+            existing.append(d)
+    return ", ".join(existing)
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+def tag_names(value: Any) -> List[str]:
+    """Distinct tag names from a tag string, a label list or GitHub-style label objects."""
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        items = _SEPARATORS.split(value)
+    elif isinstance(value, (list, tuple, set)):
+        items = [v.get("name") if isinstance(v, dict) else v for v in value]
+    else:
+        items = [value]
+    names = (" ".join(str(v).split()) for v in items if v not in (None, ""))
+    return [n for n in dict.fromkeys(names) if n and n not in DEFAULT_TAGS]
+
+
+# ---------------------------
+# Writes
+# ---------------------------
+def intern_tags(session: Session, names: Iterable[str]) -> Dict[str, int]:
+    """``name -> tag id``, creating missing tags in the session's transaction."""
+    names = sorted(set(names))
+    if not names:
+        return {}
+    session.execute(sqlite_insert(Tag).on_conflict_do_nothing(index_elements=[Tag.name]),
+                    [{"name": n} for n in names])
+    return dict(session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+
+
+def _replace(session: Session, link, owner, tags: Mapping[int, Iterable[str]]) -> None:
+    tags = {owner_id: tag_names(names) for owner_id, names in tags.items()}
+    if not tags:
+        return
+    ids = intern_tags(session, (n for names in tags.values() for n in names))
+    session.execute(delete(link).where(owner.in_(list(tags))))
+    rows = [{owner.key: owner_id, "tag_id": ids[n]} for owner_id, names in tags.items() for n in names]
+    if rows:
+        session.execute(insert(link), rows)
+
+
+def set_ticket_tags(session: Session, tags: Mapping[int, Iterable[str]]) -> None:
+    """Replace the tags of each ``ticket id -> names`` entry (not committed)."""
+    _replace(session, TicketTag, TicketTag.ticket_id, tags)
+
+
+def set_project_tags(session: Session, tags: Mapping[int, Iterable[str]]) -> None:
+    """Replace the tags of each ``project id -> names`` entry (not committed)."""
+    _replace(session, ProjectTag, ProjectTag.project_id, tags)
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def tagged_tickets(name: str):
+    """Subquery of ids of tickets tagged ``name``."""
+    return select(TicketTag.ticket_id).join(Tag, Tag.id == TicketTag.tag_id).where(Tag.name == name)
+
+
+def tagged_projects(name: str):
+    """Subquery of ids of projects tagged ``name``."""
+    return select(ProjectTag.project_id).join(Tag, Tag.id == ProjectTag.tag_id).where(Tag.name == name)
+
+
+def ticket_tags(session: Session, ticket_id: int) -> List[str]:
+    return list(session.execute(
+        select(Tag.name).join(TicketTag, TicketTag.tag_id == Tag.id)
+        .where(TicketTag.ticket_id == ticket_id).order_by(Tag.name)
+    ).scalars())
+
+
+# ---------------------------
+# Migration
+# ---------------------------
+def migrate_tags(engine, reimport_labels: bool = False) -> None:
+    """Index the tags of projects that have a tag string but no tag rows yet.
+
+    Labels of imported tickets used to be dropped on ingest, so with
+    ``reimport_labels`` (set when the tag tables are first created) their
+    content hashes are cleared: the next sync re-reads every record once
+    and stores its labels.
+    """
+    with Session(engine) as session:
+        untagged = session.execute(
+            select(Project.id, Project.tags).where(
+                Project.tags.isnot(None), Project.id.not_in(select(ProjectTag.project_id))
+            )
+        ).all()
+        set_project_tags(session, {pid: names for pid, raw in untagged if (names := tag_names(raw))})
+        if reimport_labels:
+            # updated_at is kept so delta exports do not re-ship every ticket.
+            session.execute(update(Ticket).where(Ticket.integration_source.isnot(None))
+                            .values(content_hash=None, updated_at=Ticket.updated_at))
+        session.commit()
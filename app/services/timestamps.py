@@ -0,0 +1,150 @@
+# ==========================================================
+# timestamps.py — Platform timestamp parsing for normalization
+# ==========================================================
+# Every parsed value is returned as a naive UTC datetime, the convention used
+# by the Ticket table; inputs without an offset are taken to be UTC already.
+#
+#   Jira        2025-11-09T14:30:00.000+0000
+#   ServiceNow  2025-11-09 14:30:00
+#   GitHub      2025-11-09T14:30:00Z
+#   Azure       2025-11-09T14:30:00.1234567Z
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+CACHE_SIZE = 4096
+
+# Rewrites for strings datetime.fromisoformat rejects on older Pythons:
+# "+0000" offsets and fractions longer than microseconds.
+_OFFSET = re.compile(r"([+-]\d{2})(\d{2})$")
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+log = logging.getLogger(__name__)
+
+
+class ParseStats:
+    """Thread-safe counters for the unhappy paths of timestamp parsing.
+
+    Successful parses are not counted here to keep the hot path lock-free;
+    the LRU cache statistics cover them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.missing = 0
+        self.failed = 0
+
+    def add(self, missing: int = 0, failed: int = 0) -> None:
+        with self._lock:
+            self.missing += missing
+            self.failed += failed
+
+    def snapshot(self) -> Dict[str, int]:
+        info = _parse_text.cache_info()
+        with self._lock:
+            return {
+                "missing": self.missing,
+                "failed": self.failed,
+                "cache_hits": info.hits,
+                "cache_misses": info.misses,
+            }
+
+
+PARSE_STATS = ParseStats()
+
+
+def _to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_text(text: str) -> Optional[datetime]:
+    text = text.strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        return _to_naive_utc(datetime.fromisoformat(text))
+    except ValueError:
+        pass
+    fixed = _FRACTION.sub(r"\1", _OFFSET.sub(r"\1:\2", text))
+    try:
+        return _to_naive_utc(datetime.fromisoformat(fixed))
+    except ValueError:
+        return None
+
+
+def _parse_epoch(value: float) -> Optional[datetime]:
+    # Heuristic: anything past ~5138 AD in seconds is really milliseconds.
+    seconds = value / 1000.0 if abs(value) >= 1e11 else value
+    try:
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _parse_one(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return _to_naive_utc(value)
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return _parse_epoch(value)
+    if isinstance(value, str):
+        return _parse_text(value)
+    return None
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse one platform timestamp; None when missing or unparseable.
+
+    Failures are counted in ``PARSE_STATS`` rather than papered over.
+    """
+    if value.__class__ is str and value:
+        parsed = _parse_text(value)
+    elif value is None or value == "":
+        PARSE_STATS.add(missing=1)
+        return None
+    else:
+        parsed = _parse_one(value)
+    if parsed is None:
+        PARSE_STATS.add(failed=1)
+        log.debug("Unparseable timestamp: %r", value)
+    return parsed
+
+
+def parse_timestamps(values: Sequence[Any]) -> List[Optional[datetime]]:
+    """Vectorized ``parse_timestamp`` for a batch of values.
+
+    Strings go through one ``pandas.to_datetime`` call; anything pandas
+    cannot read falls back to the scalar parser before being counted as
+    a failure.
+    """
+    series = pd.Series(list(values), dtype=object)
+    missing = series.isna() | (series == "")
+    parsed = pd.to_datetime(
+        series.where(series.map(lambda v: isinstance(v, str)) & ~missing),
+        format="ISO8601", utc=True, errors="coerce",
+    ).astype("datetime64[us, UTC]").dt.tz_localize(None)
+
+    out: List[Optional[datetime]] = []
+    n_failed = 0
+    converted = parsed.array.to_pydatetime().tolist()
+    for value, dt, ok, is_missing in zip(series.tolist(), converted, parsed.notna().tolist(), missing.tolist()):
+        if is_missing:
+            out.append(None)
+            continue
+        if not ok:
+            dt = _parse_one(value)
+        if dt is None:
+            n_failed += 1
+            log.debug("Unparseable timestamp: %r", value)
+        out.append(dt)
+    PARSE_STATS.add(missing=int(missing.sum()), failed=n_failed)
+    return out
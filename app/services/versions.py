@@ -0,0 +1,173 @@
+# ==========================================================
+# versions.py — Per-project ranking versions kept in the database
+# ==========================================================
+# Every worker caches rankings in memory (rank store, rank cache, next-up
+# queue), so "has this project changed since I loaded it?" must be
+# answered by the database rather than by one process's counters.
+# ranking_version holds one row per project whose ``version`` is bumped by
+# triggers on ticket: every insert, delete and update of a column other
+# than the stored scores, in the writer's own transaction. Every write
+# path (ORM, bulk upsert, dedup, sync, raw SQL from other tools) is
+# covered; score passes only rewrite score columns and never bump it.
+#
+# A writer that wants to patch its own caches in place instead of having
+# them reloaded calls ``lock_versions`` before writing and
+# ``read_versions`` after: holding SQLite's write lock in between, the
+# difference is exactly its own writes.
+#
+# Score passes count themselves in ``rescores`` instead, so HTTP
+# validators of stored score columns can follow both (``read_validators``),
+# and record the version they covered in ``scored_version``: a project
+# whose scored_version is behind its version has writes no score pass
+# has seen yet, whichever process made them (``unscored_projects``).
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .models import Project, RankingVersion, Ticket
+
+VERSION_TABLE = RankingVersion.__tablename__
+# Columns a score pass rewrites; updating only these leaves versions alone.
+SCORE_COLUMNS = ("pscore", "score_intercept", "score_slope", "display_score", "ticket_order_id")
+# Six fractional digits, as SQLAlchemy stores DateTime on SQLite.
+_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+def _placeholders(values) -> str:
+    return ",".join("?" * len(values))
+
+
+def _bump(row: str) -> str:
+    return (
+        f"INSERT INTO {VERSION_TABLE} (project_id, version, updated_at) VALUES ({row}.project_id, 1, {_NOW}) "
+        f"ON CONFLICT (project_id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at;"
+    )
+
+
+def _trigger_ddl():
+    watched = ", ".join(c.name for c in Ticket.__table__.columns if c.name not in SCORE_COLUMNS)
+    return {
+        "ticket_version_insert": f"""CREATE TRIGGER ticket_version_insert AFTER INSERT ON ticket
+            WHEN new.project_id IS NOT NULL BEGIN {_bump("new")} END""",
+        "ticket_version_delete": f"""CREATE TRIGGER ticket_version_delete AFTER DELETE ON ticket
+            WHEN old.project_id IS NOT NULL BEGIN {_bump("old")} END""",
+        "ticket_version_update": f"""CREATE TRIGGER ticket_version_update AFTER UPDATE OF {watched} ON ticket
+            WHEN new.project_id IS NOT NULL BEGIN {_bump("new")} END""",
+        # A ticket moved to another project changes its old project too.
+        "ticket_version_move": f"""CREATE TRIGGER ticket_version_move AFTER UPDATE OF project_id ON ticket
+            WHEN old.project_id IS NOT NULL AND old.project_id IS NOT new.project_id BEGIN {_bump("old")} END""",
+    }
+
+
+# ---------------------------
+# Setup
+# ---------------------------
+def ensure_version_triggers(engine) -> None:
+    """(Re)create the version triggers, so they follow the ticket columns.
+
+    Projects that already had tickets before the triggers existed get a
+    row at version 1, which every process reads as changed.
+    """
+    ddl = _trigger_ddl()
+    with engine.begin() as conn:
+        existing = {name for (name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'ticket_version_%'"
+        )}
+        if not existing:
+            conn.exec_driver_sql(
+                f"INSERT OR IGNORE INTO {VERSION_TABLE} (project_id, version, updated_at) "
+                f"SELECT DISTINCT project_id, 1, {_NOW} FROM ticket WHERE project_id IS NOT NULL"
+            )
+        for name, statement in ddl.items():
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+            conn.exec_driver_sql(statement)
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def project_version(session: Session, project_id: int) -> int:
+    """Current write version of one project (0 before its first write)."""
+    value = session.connection().exec_driver_sql(
+        f"SELECT version FROM {VERSION_TABLE} WHERE project_id = ?", (project_id,)
+    ).scalar()
+    return value or 0
+
+
+def read_versions(session: Session, project_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """Write versions of these projects (every project with a row when None)."""
+    sql = f"SELECT project_id, version FROM {VERSION_TABLE}"
+    if project_ids is None:
+        return dict(session.connection().exec_driver_sql(sql).all())
+    pids = sorted({p for p in project_ids if p is not None})
+    if not pids:
+        return {}
+    found = dict(session.connection().exec_driver_sql(
+        f"{sql} WHERE project_id IN ({_placeholders(pids)})", tuple(pids)
+    ).all())
+    return {pid: found.get(pid, 0) for pid in pids}
+
+
+def lock_versions(session: Session, project_ids: Iterable[Optional[int]]) -> Dict[int, int]:
+    """Take the database write lock and read these projects' versions before writing.
+
+    Call first in a write transaction; ``read_versions`` before the commit
+    then returns the versions including exactly this transaction's writes.
+    """
+    pids = sorted({p for p in project_ids if p is not None})
+    if not pids:
+        return {}
+    # A write statement, so SQLite holds the write lock until the commit.
+    session.connection().exec_driver_sql(
+        f"INSERT OR IGNORE INTO {VERSION_TABLE} (project_id, version) VALUES (?, 0)", [(p,) for p in pids]
+    )
+    return read_versions(session, pids)
+
+
+def read_validators(session: Session, project_ids: Optional[Iterable[int]] = None) -> Tuple[tuple, Optional[datetime]]:
+    """(project, version, rescores) rows and their latest change, for HTTP validators.
+
+    Covers every project with a row when ``project_ids`` is None; a project
+    without one reads as unchanged since it was created.
+    """
+    stmt = select(RankingVersion.project_id, RankingVersion.version, RankingVersion.rescores,
+                  RankingVersion.updated_at).order_by(RankingVersion.project_id)
+    if project_ids is not None:
+        stmt = stmt.where(RankingVersion.project_id.in_([p for p in project_ids if p is not None]))
+    rows = session.execute(stmt).all()
+    state = tuple((pid, version or 0, rescores or 0) for pid, version, rescores, _ in rows)
+    return state, max((r.updated_at for r in rows if r.updated_at is not None), default=None)
+
+
+# ---------------------------
+# Score passes
+# ---------------------------
+def mark_rescored(session: Session, versions: Dict[int, int]) -> None:
+    """Count a score pass over these projects, which covered them up to ``versions``.
+
+    ``versions`` must be read (``read_versions``) before the pass loads its
+    tickets. Runs in the caller's transaction, so it commits with the scores.
+    """
+    if not versions:
+        return
+    session.connection().exec_driver_sql(
+        f"INSERT INTO {VERSION_TABLE} (project_id, version, rescores, scored_version, updated_at) "
+        f"VALUES (?, 0, 1, ?, {_NOW}) ON CONFLICT (project_id) DO UPDATE SET "
+        f"rescores = COALESCE(rescores, 0) + 1, updated_at = excluded.updated_at, "
+        f"scored_version = MAX(COALESCE(scored_version, 0), excluded.scored_version)",
+        sorted(versions.items()),
+    )
+
+
+def unscored_projects(session: Session) -> List[int]:
+    """Projects with writes that no stored score pass covers yet."""
+    return session.execute(
+        select(RankingVersion.project_id)
+        .where(RankingVersion.version > func.coalesce(RankingVersion.scored_version, 0),
+               RankingVersion.project_id.in_(select(Project.id)))
+        .order_by(RankingVersion.project_id)
+    ).scalars().all()
@@ -0,0 +1,101 @@
+# ==========================================================
+# bench_normalize.py — Normalization throughput benchmark
+# Compares the legacy resolve_path interpreter with the
+# compiled accessors used by normalize_ticket.
+#
+#   python -m benchmarks.bench_normalize [--tickets 20000]
+# ==========================================================
+import argparse
+import time
+
+from app.services.normalizers import load_platform_map, normalize_ticket, resolve_path, _safe_date
+
+SAMPLES = {
+    "jira": {
+        "key": "OPS-101",
+        "fields": {
+            "summary": "Login failure",
+            "description": "Users cannot log in after update.",
+            "status": {"name": "In Progress"},
+            "priority": {"name": "High"},
+            "assignee": {"displayName": "David"},
+            "labels": ["auth", "bug"],
+            "created": "2025-11-09T14:30:00.000+0000",
+            "updated": "2025-11-09T15:00:00.000+0000",
+            "project": {"key": "OPS"},
+        },
+    },
+    "servicenow": {
+        "number": "INC0010001",
+        "short_description": "Login failure",
+        "description": "Users cannot log in after update.",
+        "state": "2",
+        "priority": "2 - High",
+        "assigned_to": {"display_value": "David"},
+        "category": "software",
+        "opened_at": "2025-11-09 14:30:00",
+        "updated_on": "2025-11-09 15:00:00",
+        "sys_class_name": "incident",
+    },
+    "github": {
+        "id": 1001,
+        "title": "Bug: login error",
+        "body": "Users cannot log in after update.",
+        "state": "open",
+        "assignee": {"login": "david"},
+        "labels": [{"name": "bug"}, {"name": "auth"}],
+        "created_at": "2025-11-09T14:30:00Z",
+        "updated_at": "2025-11-09T15:00:00Z",
+        "repository": {"name": "ai-pipeline"},
+    },
+    "azure": {
+        "id": 42,
+        "fields": {
+            "System.Title": "Login failure",
+            "System.Description": "Users cannot log in after update.",
+            "System.State": "Active",
+            "Microsoft.VSTS.Common.Priority": 2,
+            "System.AssignedTo": {"displayName": "David"},
+            "System.Tags": "auth; bug",
+            "System.CreatedDate": "2025-11-09T14:30:00.123Z",
+            "System.ChangedDate": "2025-11-09T15:00:00.456Z",
+            "System.TeamProject": "Platform",
+        },
+    },
+}
+
+
+def legacy_normalize(source, raw, rules):
+    """The pre-compilation normalize_ticket: walk the YAML rules per ticket."""
+    normalized = {}
+    for target_field, source_path in rules.items():
+        normalized[target_field] = resolve_path(raw, source_path)
+    normalized["source"] = source
+    normalized["created_at"] = _safe_date(normalized.get("created_at"))
+    normalized["updated_at"] = _safe_date(normalized.get("updated_at"))
+    return normalized
+
+
+def _rate(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalization throughput: legacy vs compiled")
+    parser.add_argument("--tickets", type=int, default=20000)
+    args = parser.parse_args()
+
+    platform_map = load_platform_map()
+    print(f"{'platform':<12}{'legacy/s':>12}{'compiled/s':>12}{'speedup':>9}")
+    for source, raw in SAMPLES.items():
+        rules = dict(platform_map[source])
+        legacy = _rate(lambda: legacy_normalize(source, raw, rules), args.tickets)
+        compiled = _rate(lambda: normalize_ticket(source, raw, platform_map), args.tickets)
+        print(f"{source:<12}{legacy:>12,.0f}{compiled:>12,.0f}{compiled / legacy:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
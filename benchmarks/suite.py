@@ -0,0 +1,398 @@
+# ==========================================================
+# suite.py — End-to-end benchmark suite with regression gates
+# Grows a scratch database through the real ingest path with
+# synthetic tickets and, at each size, times normalization,
+# per-ticket and batch scoring, dashboard rendering and the
+# HTTP routes (in-process, no server needed).
+#
+#   python -m benchmarks.suite --sizes 1k,10k,100k --out results.json
+#   python -m benchmarks.suite --sizes 1m --baseline results.json
+#
+# Results are JSON. The run fails (exit 1) when a case breaks its
+# limit in benchmarks/thresholds.json or, with --baseline, slows
+# down by more than --tolerance against an earlier run.
+# ==========================================================
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .synthetic import PLATFORMS, Generator
+
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+DEFAULT_SIZES = "1k,10k,100k"
+INGEST_CHUNK = 2000
+# Slow-downs smaller than this are noise, whatever the tolerance says.
+NOISE_FLOOR_MS = 0.5
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+# ---------------------------
+# Measurement
+# ---------------------------
+def measure(case: str, tickets: int, fn: Callable[[], Any], runs: int = 1, items: Optional[int] = None,
+            warmup: int = 0, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time ``fn`` ``runs`` times (after ``warmup`` untimed calls; ``setup`` runs untimed before each).
+
+    ``items`` is the work per call (tickets normalized, rows ranked ...);
+    ``us_per_item`` is what the size-independent thresholds check, so a
+    cost that grows faster than the data shows up as a regression.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc.collect()
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return result(case, tickets, samples, items)
+
+
+def result(case: str, tickets: int, samples: List[float], items: Optional[int] = None) -> Dict[str, Any]:
+    ms = np.array(samples) * 1000
+    median = float(np.median(ms))
+    row = {
+        "case": case,
+        "tickets": tickets,
+        "runs": len(samples),
+        "median_ms": round(median, 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "min_ms": round(float(ms.min()), 3),
+    }
+    if items:
+        row["items"] = items
+        row["us_per_item"] = round(median * 1000 / items, 3)
+    return row
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+class Suite:
+    """Benchmarks against one scratch database, grown size by size."""
+
+    def __init__(self, seed: int, projects: int, runs: int):
+        # Imported here: app.db reads ATILA_DB_PATH at import time.
+        from app import main as web
+        from app.services.normalizers import load_platform_map
+
+        self.web = web
+        self.gen = Generator(seed, projects)
+        self.platform_map = load_platform_map()
+        self.runs = runs
+        self.size = 0
+        self.results: List[Dict[str, Any]] = []
+        web.init_db()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.results.append(row)
+        us = f"{row['us_per_item']:>10.2f}" if "us_per_item" in row else f"{'':>10}"
+        print(f"{row['case']:<28}{row['tickets']:>10,}{row['median_ms']:>12.2f}{row['p95_ms']:>12.2f}{us}", flush=True)
+
+    def grow(self, size: int) -> None:
+        """Ingest tickets ``self.size`` .. ``size - 1``, timing each platform's share after a warm-up."""
+        from sqlalchemy.orm import Session
+        from app.services.ingest import TicketUpserter
+        from app.services.rescoring import scheduler
+
+        touched = set()
+        with Session(self.web.engine) as session:
+            shares = {}
+            for p in PLATFORMS:
+                first, stop = self.gen.share(p, self.size), self.gen.share(p, size)
+                upserter = TicketUpserter(session, p, self.platform_map)
+                records = self.gen.records(p, first, stop)
+                # Every platform upserts the first half of its share (up to one
+                # chunk) untimed before any is timed: first-write costs (the
+                # database and WAL growing, statement caches filling) scale with
+                # the rows written and would all land on the first platform.
+                warmup = min(INGEST_CHUNK, (stop - first) // 2)
+                if warmup:
+                    upserter.upsert_chunk([(i, r) for i, r in zip(range(warmup), records)])
+                shares[p] = (upserter, records, stop - first - warmup)
+            for p, (upserter, records, count) in shares.items():
+                chunks = iter(lambda: [(i, r) for i, r in zip(range(INGEST_CHUNK), records)], [])
+                elapsed = 0.0
+                for chunk in chunks:
+                    start = time.perf_counter()
+                    upserter.upsert_chunk(chunk)
+                    elapsed += time.perf_counter() - start
+                if upserter.report.failed:
+                    raise RuntimeError(f"ingest/{p}: {upserter.report.errors[:3]}")
+                self.add(result(f"ingest/{p}", size, [elapsed], count))
+                touched |= upserter.report.project_ids
+        scheduler.mark_dirty(touched)
+        self.size = size
+
+    def bench_normalize(self) -> None:
+        from app.services.normalizers import normalize_ticket
+
+        for p in PLATFORMS:
+            count = self.gen.share(p, self.size)
+            records = self.gen.records(p, 0, count)
+            elapsed = 0.0
+            # Chunked so a million raw records never sit in memory at once.
+            while True:
+                chunk = [r for _, r in zip(range(10_000), records)]
+                if not chunk:
+                    break
+                start = time.perf_counter()
+                for raw in chunk:
+                    normalize_ticket(p, raw, self.platform_map)
+                elapsed += time.perf_counter() - start
+            self.add(result(f"normalize/{p}", self.size, [elapsed], count))
+
+    def bench_scoring(self) -> None:
+        from sqlalchemy.orm import Session
+        from app.services.scoring import compute_pscore, load_scoring_frame, rank_and_assign_display_scores, recalc_scores, scoring_now
+
+        with Session(self.web.engine) as session:
+            df = load_scoring_frame(session)
+            created = df["created_at"].to_numpy().astype("datetime64[us]").tolist()
+            tickets = [SimpleNamespace(id=i, priority=p, status=s, created_at=c, pscore=0.0)
+                       for i, p, s, c in zip(df["id"].tolist(), df["priority"].tolist(), df["status"].tolist(), created)]
+            del df
+            now = scoring_now()
+
+            def score_all():
+                for t in tickets:
+                    t.pscore = compute_pscore(t, now)
+
+            n = len(tickets)
+            runs = self.runs if n <= 100_000 else 1
+            self.add(measure("scoring/compute_pscore", self.size, score_all, runs, n))
+            self.add(measure("scoring/rank_display", self.size, lambda: rank_and_assign_display_scores(tickets), runs, n))
+            del tickets
+            self.add(measure("scoring/recalc_scores", self.size, lambda: recalc_scores(session), runs, n))
+
+    def _largest_project(self) -> tuple:
+        from sqlalchemy import func, select
+        from sqlalchemy.orm import Session
+        from app.services.models import Ticket
+
+        with Session(self.web.engine) as session:
+            pid, count = session.execute(
+                select(Ticket.project_id, func.count()).group_by(Ticket.project_id).order_by(func.count().desc()).limit(1)
+            ).one()
+        return pid, count
+
+    def bench_dashboard(self) -> None:
+        from sqlalchemy.orm import Session
+        from app.services.rank_cache import rank_cache
+        from app.services.rank_store import rank_store
+        from app.services.scoring import scoring_now
+
+        pid, count = self._largest_project()
+        with Session(self.web.engine) as session:
+            def render():
+                projects, active = self.web.dashboard_projects(session, pid)
+                return "".join(self.web.render_dashboard(session, projects, active, as_of=scoring_now()))
+
+            def cold():
+                rank_store.discard()
+                rank_cache.discard()
+                render()
+
+            # Cold: the project's ranking columns are read and sorted; per item is per project ticket.
+            self.add(measure("dashboard/render_cold", self.size, cold, min(self.runs, 5), count))
+            self.add(measure("dashboard/render_warm", self.size, render, self.runs, warmup=1))
+
+    def bench_projection(self) -> None:
+        from datetime import timedelta
+        from sqlalchemy.orm import Session
+        from app.services.projection import project_ranking, projection_dates
+        from app.services.scoring import scoring_now
+
+        pid, count = self._largest_project()
+        dates = projection_dates(scoring_now(), 90, timedelta(days=1))
+        with Session(self.web.engine) as session:
+            # 90 daily steps; per item is per project ticket.
+            self.add(measure("scoring/projection_90d", self.size, lambda: project_ranking(session, pid, dates, 20),
+                             self.runs, count, warmup=1))
+
+    def bench_http(self) -> None:
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import Session
+
+        # Without a ``with`` block TestClient skips startup, so no background
+        # rescore or sync threads run while requests are timed.
+        client = TestClient(self.web.app)
+        pid, count = self._largest_project()
+        with Session(self.web.engine) as session:
+            cursor = self.web._section(session, pid, "Backlog", self.web.DASHBOARD_PAGE_SIZE)["next_cursor"]
+        sample = next(self.gen.records("jira", 0, 1))
+        routes = [
+            ("http/dashboard", "GET", f"/?project_id={pid}", {}, None, 200),
+            ("http/dashboard_304", "GET", f"/?project_id={pid}", {"If-None-Match": ""}, None, 304),
+            ("http/dashboard_collapse", "GET", f"/?project_id={pid}&collapse=true", {}, None, 200),
+            ("http/tickets", "GET", f"/api/tickets?project_id={pid}&limit=100", {}, None, 200),
+            ("http/tickets_collapse", "GET", f"/api/tickets?project_id={pid}&limit=100&collapse=true", {}, None, 200),
+            ("http/next_up", "GET", "/api/tickets/next-up?limit=50", {}, None, 200),
+            ("http/next_up_collapse", "GET", "/api/tickets/next-up?limit=50&collapse=true", {}, None, 200),
+            ("http/projects", "GET", "/api/projects", {}, None, 200),
+            ("http/projection", "GET", f"/api/projects/{pid}/projection?steps=90&top=20", {}, None, 200),
+            # Synthetic text draws on a 16-word vocabulary, so every word matches a
+            # large share of tickets: a worst case for relevance ranking.
+            ("http/search", "GET", "/api/tickets/search?q=login+timeout", {}, None, 200),
+            ("http/search_project", "GET", f"/api/tickets/search?q=payment+search&project_id={pid}", {}, None, 200),
+            ("http/normalize", "POST", "/normalize/jira", {}, sample, 200),
+        ]
+        if cursor:
+            routes.insert(2, ("http/load_more", "GET", f"/dashboard/tickets?project_id={pid}&status=Backlog&cursor={cursor}",
+                              {}, None, 200))
+
+        for case, method, url, headers, body, expected in routes:
+            def call():
+                response = client.request(method, url, headers=headers, json=body)
+                if response.status_code != expected:
+                    raise RuntimeError(f"{case}: {method} {url} returned {response.status_code}, expected {expected}")
+
+            setup = None
+            if "If-None-Match" in headers:
+                # Displayed scores tick over every few seconds, so revalidate against a fresh tag.
+                def setup():
+                    headers["If-None-Match"] = client.request(method, url).headers["etag"]
+
+            self.add(measure(case, self.size, call, self.runs * 5, warmup=0 if setup else 1, setup=setup))
+        # Streams every ticket of the project, so it is judged per row.
+        self.add(measure("http/export_arrow", self.size,
+                         lambda: client.get(f"/export/tickets?format=arrow&project_id={pid}").content,
+                         min(self.runs, 3), count))
+
+    def run(self, size: int) -> None:
+        self.grow(size)
+        self.bench_normalize()
+        self.bench_scoring()
+        self.bench_dashboard()
+        self.bench_projection()
+        self.bench_http()
+
+
+# ---------------------------
+# Gates
+# ---------------------------
+def check_thresholds(results: List[Dict[str, Any]], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """Limits per case: ``max_us_per_item``, ``max_median_ms`` and/or ``max_p95_ms``.
+
+    ``min_items`` exempts small runs from the per-item limit, where fixed
+    costs (a query, a sort setup) dominate.
+    """
+    failures = []
+    for row in results:
+        limits = dict(thresholds.get(row["case"], {}))
+        if row.get("items", 0) < limits.pop("min_items", 0):
+            limits.pop("max_us_per_item", None)
+        for key, limit in limits.items():
+            metric = key[len("max_"):]
+            value = row.get(metric)
+            if value is not None and value > limit:
+                failures.append(f"{row['case']} @ {row['tickets']:,}: {metric} {value} > {limit}")
+    return failures
+
+
+def check_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Cases whose median grew by more than ``tolerance`` since the baseline run."""
+    before = {(r["case"], r["tickets"]): r for r in baseline.get("results", [])}
+    failures = []
+    for row in results:
+        old = before.get((row["case"], row["tickets"]))
+        if old is None:
+            continue
+        limit = max(old["median_ms"] * (1 + tolerance), old["median_ms"] + NOISE_FLOOR_MS)
+        if row["median_ms"] > limit:
+            failures.append(f"{row['case']} @ {row['tickets']:,}: median {row['median_ms']}ms "
+                            f"vs {old['median_ms']}ms baseline (+{row['median_ms'] / old['median_ms'] - 1:.0%})")
+    return failures
+
+
+def environment() -> Dict[str, Any]:
+    import pandas
+    import sqlalchemy
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ATILA benchmark suite")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Ticket counts, ascending, e.g. 1k,10k,100k,1m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--projects", type=int, default=8, help="Projects per platform (Zipf-skewed)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per case (HTTP cases use 5x)")
+    parser.add_argument("--db", help="Scratch database path (must not exist; default: a temp file)")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_PATH))
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slow-down against --baseline")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(parse_size(s) for s in args.sizes.split(","))
+    db = Path(args.db) if args.db else Path(tempfile.mkdtemp(prefix="atila-bench-")) / "bench.db"
+    if db.exists():
+        parser.error(f"{db} already exists; the suite seeds its own database")
+    os.environ["ATILA_DB_PATH"] = str(db)
+
+    started = datetime.utcnow()
+    print(f"database: {db}")
+    print(f"{'case':<28}{'tickets':>10}{'median ms':>12}{'p95 ms':>12}{'us/item':>10}")
+    try:
+        suite = Suite(args.seed, args.projects, args.runs)
+        for size in sizes:
+            suite.run(size)
+    finally:
+        if not args.db:
+            shutil.rmtree(db.parent, ignore_errors=True)
+
+    thresholds = json.loads(Path(args.thresholds).read_text()) if args.thresholds else {}
+    failures = check_thresholds(suite.results, thresholds)
+    if args.baseline:
+        failures += check_baseline(suite.results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "sizes": sizes,
+        "environment": environment(),
+        "results": suite.results,
+        "failures": failures,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
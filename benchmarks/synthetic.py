@@ -0,0 +1,227 @@
+# ==========================================================
+# synthetic.py — Reproducible synthetic tickets for every platform
+# Raw records follow the shapes in config/platform_map.yaml
+# (Jira, ServiceNow, GitHub, Azure DevOps); the same seed and
+# index always give the same ticket, whatever range is asked for.
+#
+#   python -m benchmarks.synthetic jira --tickets 1000 > jira.ndjson
+# ==========================================================
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+PLATFORMS = ("jira", "servicenow", "github", "azure")
+# Tickets are generated in blocks with one RNG each, so index ranges can be
+# produced independently (a 10k database grows into a 100k one unchanged).
+BLOCK = 1000
+ANCHOR = datetime(2025, 11, 1)
+MAX_AGE_DAYS = 365
+
+WORDS = (
+    "login", "payment", "export", "sync", "dashboard", "timeout", "cache", "token",
+    "upload", "search", "report", "webhook", "latency", "billing", "migration", "alert",
+)
+LABELS = ("bug", "auth", "perf", "ui", "api", "infra", "security", "docs", "data", "mobile")
+PEOPLE = ("Ada", "Grace", "Linus", "Barbara", "Ken", "Margaret", "Dennis", "Frances")
+
+# Platform vocabularies, weighted towards open work as in a live tracker.
+JIRA_STATUS = (("To Do", 40), ("In Progress", 25), ("In Review", 10), ("Done", 25))
+JIRA_PRIORITY = (("Highest", 5), ("High", 20), ("Medium", 45), ("Low", 20), ("Lowest", 10))
+SNOW_STATE = (("1", 35), ("2", 30), ("3", 10), ("6", 15), ("7", 10))
+SNOW_PRIORITY = (("1 - Critical", 5), ("2 - High", 20), ("3 - Moderate", 45), ("4 - Low", 20), ("5 - Planning", 10))
+SNOW_CLASS = ("incident", "problem", "change_request", "sc_req_item")
+GITHUB_STATE = (("open", 70), ("closed", 30))
+AZURE_STATE = (("New", 35), ("Active", 30), ("Resolved", 15), ("Closed", 20))
+AZURE_PRIORITY = ((1, 10), (2, 30), (3, 45), (4, 15))
+
+
+class _Choices:
+    """Weighted choice over a fixed table with precomputed cumulative weights."""
+
+    def __init__(self, table):
+        self.values = [v for v, _ in table]
+        self.cum = list(accumulate(w for _, w in table))
+
+    def __call__(self, rng: random.Random):
+        return rng.choices(self.values, cum_weights=self.cum)[0]
+
+
+_JIRA_STATUS = _Choices(JIRA_STATUS)
+_JIRA_PRIORITY = _Choices(JIRA_PRIORITY)
+_SNOW_STATE = _Choices(SNOW_STATE)
+_SNOW_PRIORITY = _Choices(SNOW_PRIORITY)
+_GITHUB_STATE = _Choices(GITHUB_STATE)
+_AZURE_STATE = _Choices(AZURE_STATE)
+_AZURE_PRIORITY = _Choices(AZURE_PRIORITY)
+
+
+def project_names(platform: str, count: int) -> List[str]:
+    """Distinct project names per platform (ServiceNow projects are record classes)."""
+    if platform == "servicenow":
+        return [SNOW_CLASS[i % len(SNOW_CLASS)] + (f"_{i // len(SNOW_CLASS)}" if i >= len(SNOW_CLASS) else "")
+                for i in range(count)]
+    prefix = {"jira": "OPS", "github": "repo-", "azure": "Team"}[platform]
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+class Generator:
+    """Raw platform records for one seed.
+
+    Projects are Zipf-skewed (project k gets ~1/(k+1) of the tickets), so
+    a few large projects dominate as in real trackers. ``bad_dates`` is the
+    share of records with a missing or unparseable created timestamp.
+    """
+
+    def __init__(self, seed: int = 0, projects: int = 8, bad_dates: float = 0.001, anchor: datetime = ANCHOR):
+        self.seed = seed
+        self.bad_dates = bad_dates
+        self.anchor = anchor
+        self.projects = {p: project_names(p, projects) for p in PLATFORMS}
+        self._project_cum = list(accumulate(1.0 / (k + 1) for k in range(projects)))
+
+    # ---------------------------
+    # Shared fields
+    # ---------------------------
+    def _common(self, platform: str, rng: random.Random) -> Dict[str, Any]:
+        age = timedelta(seconds=rng.randrange(MAX_AGE_DAYS * 86400), milliseconds=rng.randrange(1000))
+        created = self.anchor - age
+        updated = created + timedelta(seconds=rng.randrange(30 * 86400))
+        topic = rng.sample(WORDS, 2)
+        bad = rng.random() < self.bad_dates
+        return {
+            "title": f"{topic[0].capitalize()} {topic[1]} issue",
+            "description": " ".join(rng.choices(WORDS, k=rng.randrange(8, 40))),
+            "assignee": rng.choice(PEOPLE) if rng.random() < 0.8 else None,
+            "labels": rng.sample(LABELS, rng.randrange(0, 4)),
+            "created": None if bad else created,
+            # A bad date is either missing or garbage; both are real-world failures.
+            "garbage": bad and rng.random() < 0.5,
+            "updated": updated,
+            "project": rng.choices(self.projects[platform], cum_weights=self._project_cum)[0],
+        }
+
+    @staticmethod
+    def _stamp(c: Dict[str, Any], fmt) -> Optional[str]:
+        if c["garbage"]:
+            return "not-a-date"
+        return fmt(c["created"]) if c["created"] is not None else None
+
+    # ---------------------------
+    # Platform shapes
+    # ---------------------------
+    def jira(self, i: int, rng: random.Random) -> Dict[str, Any]:
+        c = self._common("jira", rng)
+        fmt = lambda d: d.strftime("%Y-%m-%dT%H:%M:%S.") + f"{d.microsecond // 1000:03d}+0000"
+        return {
+            "key": f"{c['project']}-{i + 1}",
+            "fields": {
+                "summary": c["title"],
+                "description": c["description"],
+                "status": {"name": _JIRA_STATUS(rng)},
+                "priority": {"name": _JIRA_PRIORITY(rng)},
+                "assignee": {"displayName": c["assignee"]} if c["assignee"] else None,
+                "labels": c["labels"],
+                "created": self._stamp(c, fmt),
+                "updated": fmt(c["updated"]),
+                "project": {"key": c["project"]},
+            },
+        }
+
+    def servicenow(self, i: int, rng: random.Random) -> Dict[str, Any]:
+        c = self._common("servicenow", rng)
+        fmt = lambda d: d.strftime("%Y-%m-%d %H:%M:%S")
+        return {
+            "number": f"INC{i + 1:07d}",
+            "short_description": c["title"],
+            "description": c["description"],
+            "state": _SNOW_STATE(rng),
+            "priority": _SNOW_PRIORITY(rng),
+            "assigned_to": {"display_value": c["assignee"]} if c["assignee"] else "",
+            "category": c["labels"][0] if c["labels"] else "inquiry",
+            "opened_at": self._stamp(c, fmt),
+            "updated_on": fmt(c["updated"]),
+            "sys_class_name": c["project"],
+        }
+
+    def github(self, i: int, rng: random.Random) -> Dict[str, Any]:
+        c = self._common("github", rng)
+        fmt = lambda d: d.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return {
+            "id": i + 1,
+            "title": c["title"],
+            "body": c["description"],
+            "state": _GITHUB_STATE(rng),
+            "assignee": {"login": c["assignee"].lower()} if c["assignee"] else None,
+            "labels": [{"name": label} for label in c["labels"]],
+            "created_at": self._stamp(c, fmt),
+            "updated_at": fmt(c["updated"]),
+            "repository": {"name": c["project"]},
+        }
+
+    def azure(self, i: int, rng: random.Random) -> Dict[str, Any]:
+        c = self._common("azure", rng)
+        # Azure sends 7 fractional digits; the parser has to trim them.
+        fmt = lambda d: d.strftime("%Y-%m-%dT%H:%M:%S.") + f"{d.microsecond:06d}{rng.randrange(10)}Z"
+        return {
+            "id": i + 1,
+            "fields": {
+                "System.Title": c["title"],
+                "System.Description": c["description"],
+                "System.State": _AZURE_STATE(rng),
+                "Microsoft.VSTS.Common.Priority": _AZURE_PRIORITY(rng),
+                "System.AssignedTo": {"displayName": c["assignee"]} if c["assignee"] else None,
+                "System.Tags": "; ".join(c["labels"]),
+                "System.CreatedDate": self._stamp(c, fmt),
+                "System.ChangedDate": fmt(c["updated"]),
+                "System.TeamProject": c["project"],
+            },
+        }
+
+    # ---------------------------
+    # Streams
+    # ---------------------------
+    def records(self, platform: str, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+        """Records ``start`` .. ``stop - 1`` of one platform."""
+        make = getattr(self, platform)
+        for block in range(start // BLOCK, (stop + BLOCK - 1) // BLOCK):
+            rng = random.Random(f"{self.seed}:{platform}:{block}")
+            for i in range(block * BLOCK, min((block + 1) * BLOCK, stop)):
+                record = make(i, rng)
+                if i >= start:
+                    yield record
+
+    @staticmethod
+    def share(platform: str, n: int) -> int:
+        """How many of the first ``n`` tickets are ``platform``'s (ticket i is platform i % 4)."""
+        k = PLATFORMS.index(platform)
+        return max(0, (n - k + len(PLATFORMS) - 1) // len(PLATFORMS))
+
+    def mixed(self, start: int, stop: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(platform, record) for tickets ``start`` .. ``stop - 1``, platforms interleaved."""
+        streams = [self.records(p, self.share(p, start), self.share(p, stop)) for p in PLATFORMS]
+        for n in range(start, stop):
+            k = n % len(PLATFORMS)
+            yield PLATFORMS[k], next(streams[k])
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic raw tickets as NDJSON")
+    parser.add_argument("platform", choices=PLATFORMS)
+    parser.add_argument("--tickets", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--projects", type=int, default=8)
+    parser.add_argument("--bad-dates", type=float, default=0.001)
+    args = parser.parse_args()
+
+    gen = Generator(args.seed, args.projects, args.bad_dates)
+    out = sys.stdout.buffer
+    for record in gen.records(args.platform, 0, args.tickets):
+        out.write(orjson.dumps(record) + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# ==========================================================
+# conftest.py — Shared fixtures: one scratch database per test run
+# ==========================================================
+# app.db reads ATILA_DB_PATH at import time, so it is pointed at a
+# temporary directory before anything from the app is imported. Tests
+# share that database (and the process-wide rank store, rank cache and
+# next-up queue, as workers do); each one works in projects of its own.
+from __future__ import annotations
+
+import itertools
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+_DB_DIR = tempfile.mkdtemp(prefix="atila-tests-")
+os.environ["ATILA_DB_PATH"] = os.path.join(_DB_DIR, "atila.db")
+os.environ["ATILA_STARTUP_RECALC"] = "sync"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import main
+from app.db import engine
+from app.services.ingest import TicketUpserter
+from app.services.models import Ticket
+from app.services.normalizers import load_platform_map
+from app.services.scoring import apply_score_coefficients
+
+_names = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def session(client):
+    with Session(engine) as s:
+        yield s
+
+
+@pytest.fixture(scope="session")
+def platform_map():
+    return load_platform_map()
+
+
+@pytest.fixture
+def make_project(client):
+    """Create a project with a name no other test uses; returns its id."""
+    def make(prefix: str = "test") -> int:
+        resp = client.post("/api/projects", json={"name": f"{prefix}-{next(_names)}"})
+        assert resp.status_code == 200, resp.text
+        return resp.json()["id"]
+    return make
+
+
+def add_tickets(session: Session, project_id: int, specs: Iterable[Dict[str, Any]]) -> List[int]:
+    """Insert tickets with their score lines (not yet ranked); returns their ids in order."""
+    tickets = []
+    for spec in specs:
+        t = Ticket(title=spec.get("title", "ticket"), project_id=project_id,
+                   priority=spec.get("priority", "Medium"), status=spec.get("status", "Active"),
+                   created_at=spec.get("created_at", datetime(2025, 1, 1)), category=spec.get("category"))
+        apply_score_coefficients(t)
+        tickets.append(t)
+    session.add_all(tickets)
+    session.commit()
+    return [t.id for t in tickets]
+
+
+def ingest(session: Session, platform_map, source: str, records: List[Dict[str, Any]],
+           project_id: int = None) -> TicketUpserter:
+    """Upsert raw platform records in one chunk; returns the upserter (see ``.report``)."""
+    upserter = TicketUpserter(session, source, platform_map, project_id=project_id)
+    upserter.upsert_chunk(enumerate(records))
+    return upserter
+
+
+def project_tickets(session: Session, project_id: int) -> List[Ticket]:
+    session.expire_all()
+    return session.query(Ticket).filter(Ticket.project_id == project_id).order_by(Ticket.id).all()
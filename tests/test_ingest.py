@@ -0,0 +1,118 @@
+"""Batch ingest: upserts, unchanged skips, project moves, created_at and dedup links."""
+from __future__ import annotations
+
+import json
+
+from app.services.dedup import group_members
+from app.services.versions import read_versions
+
+from .conftest import ingest, project_tickets
+
+DESCRIPTION = (
+    "Checkout fails for customers paying with saved cards after the payment provider "
+    "rotated its signing keys overnight and every retry returns the same gateway error"
+)
+
+
+def jira(key: str, summary: str, description: str = "Steps to reproduce are attached",
+         created: str = "2025-06-01T10:00:00.000+0000", priority: str = "High") -> dict:
+    return {
+        "key": key,
+        "fields": {
+            "summary": summary,
+            "description": description,
+            "status": {"name": "In Progress"},
+            "priority": {"name": priority},
+            "assignee": {"displayName": "Dana"},
+            "labels": ["payments"],
+            "created": created,
+            "updated": "2025-06-02T10:00:00.000+0000",
+            "project": {"key": "PAY"},
+        },
+    }
+
+
+def test_unchanged_records_are_skipped(session, platform_map, make_project):
+    pid = make_project("ingest")
+    records = [jira(f"SKIP{pid}-{i}", f"ticket {i}") for i in range(3)]
+    report = ingest(session, platform_map, "jira", records, pid).report
+    assert (report.inserted, report.updated, report.failed) == (3, 0, 0)
+    assert [t.title for t in project_tickets(session, pid)] == ["ticket 0", "ticket 1", "ticket 2"]
+    version = read_versions(session, [pid])
+
+    report = ingest(session, platform_map, "jira", records, pid).report
+    assert (report.inserted, report.updated, report.unchanged) == (0, 0, 3)
+    assert read_versions(session, [pid]) == version
+
+
+def test_changed_record_is_updated_in_place(session, platform_map, make_project):
+    pid = make_project("ingest")
+    ingest(session, platform_map, "jira", [jira(f"UPD{pid}-1", "before")], pid)
+    (before,) = project_tickets(session, pid)
+
+    report = ingest(session, platform_map, "jira", [jira(f"UPD{pid}-1", "after", priority="Highest")], pid).report
+    assert (report.inserted, report.updated) == (0, 1)
+    (after,) = project_tickets(session, pid)
+    assert (after.id, after.title, after.priority) == (before.id, "after", "Highest")
+
+
+def test_moved_ticket_marks_both_projects(session, platform_map, make_project):
+    old, new = make_project("from"), make_project("to")
+    record = jira(f"MOVE{old}-1", "moving")
+    ingest(session, platform_map, "jira", [record], old)
+    (ticket,) = project_tickets(session, old)
+
+    report = ingest(session, platform_map, "jira", [record], new).report
+    assert report.updated == 1
+    assert report.project_ids == {old, new}
+    assert project_tickets(session, old) == []
+    (moved,) = project_tickets(session, new)
+    assert (moved.id, moved.created_at) == (ticket.id, ticket.created_at)
+
+
+def test_unusable_created_at_keeps_the_stored_one(session, platform_map, make_project):
+    pid = make_project("ingest")
+    ingest(session, platform_map, "jira", [jira(f"DATE{pid}-1", "dated")], pid)
+    (stored,) = project_tickets(session, pid)
+
+    garbled = jira(f"DATE{pid}-1", "dated", created="not-a-date")
+    report = ingest(session, platform_map, "jira", [garbled], pid).report
+    assert (report.updated, report.unparsed_dates) == (1, 1)
+    (ticket,) = project_tickets(session, pid)
+    assert ticket.created_at == stored.created_at
+    # Not recorded as unchanged: the next sync reads it again.
+    assert ingest(session, platform_map, "jira", [garbled], pid).report.unchanged == 0
+
+
+def test_near_duplicates_are_linked_to_the_oldest(session, platform_map, make_project):
+    pid = make_project("dedup")
+    records = [
+        jira(f"DUP{pid}-1", "Checkout fails with saved cards", DESCRIPTION),
+        jira(f"DUP{pid}-2", "Checkout fails with saved card", DESCRIPTION),
+        jira(f"DUP{pid}-3", "Dark mode toggle is missing from settings"),
+    ]
+    ingest(session, platform_map, "jira", records, pid)
+    first, second, other = project_tickets(session, pid)
+    assert first.duplicate_of is None
+    assert second.duplicate_of == first.id
+    assert other.duplicate_of is None
+    assert group_members(session, second.id) == [first.id, second.id]
+
+
+def test_batch_route_reports_bad_records_by_position(client, make_project):
+    pid = make_project("batch")
+    lines = [json.dumps(jira(f"BATCH{pid}-1", "one")), "5", json.dumps(jira(f"BATCH{pid}-2", "two")), '{"key": ']
+    resp = client.post(f"/normalize/jira/batch?project_id={pid}", content="\n".join(lines),
+                       headers={"Content-Type": "application/x-ndjson"})
+    assert resp.status_code == 200, resp.text
+    report = resp.json()
+    assert (report["received"], report["inserted"], report["failed"]) == (4, 2, 2)
+    assert [e["index"] for e in report["errors"]] == [1, 3]
+    assert report["projects"] == [pid]
+
+    # A broken array cannot be resynchronised: records before the break are kept.
+    body = "[" + json.dumps(jira(f"BATCH{pid}-3", "three")) + ', {"key": '
+    report = client.post(f"/normalize/jira/batch?project_id={pid}", content=body).json()
+    assert (report["received"], report["inserted"], report["failed"]) == (1, 1, 1)
+    assert "Malformed JSON array" in report["errors"][0]["error"]
+    assert client.post("/normalize/jira/batch?project_id=999999", content="[]").status_code == 404
@@ -0,0 +1,180 @@
+"""Keyset pagination of the ticket listing and the dashboard, and their HTTP validators."""
+from __future__ import annotations
+
+import random
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.services.models import Ticket
+from app.services.pagination import ranked_page
+from app.services.rank_store import rank_store
+from app.services.scoring import STATUS_ORDER, score_projects
+
+from .conftest import add_tickets
+
+NOW = datetime(2026, 3, 1)
+
+
+def specs(seed: int, n: int):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield {"priority": rng.choice(["Highest", "High", "Medium", "Low", "Backlog"]),
+               "status": rng.choice(list(STATUS_ORDER)),
+               "created_at": rng.choice([datetime(2025, 9, 1), NOW - timedelta(days=rng.randint(0, 300))])}
+
+
+def listing(client, limit, **params):
+    """Every page of /api/tickets, concatenated."""
+    items, cursor = [], None
+    while True:
+        resp = client.get("/api/tickets", params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200, resp.text
+        body = resp.json()
+        items += body["items"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_listing_pages_concatenate_to_the_full_listing(client, session, make_project):
+    pid = make_project("pages")
+    add_tickets(session, pid, specs(1, 120))
+    score_projects(session, [pid])
+    full = listing(client, 1000, project_id=pid)
+    assert len(full) == 120
+    keys = [(t["status"], t["ticket_order_id"], t["id"]) for t in full]
+    assert keys == sorted(keys)
+    assert len({(t["status"], t["ticket_order_id"]) for t in full}) == 120
+    for limit in (1, 7, 50):
+        assert listing(client, limit, project_id=pid) == full
+    only = listing(client, 9, project_id=pid, status="Backlog")
+    assert only == [t for t in full if t["status"] == "Backlog"]
+
+
+def test_listing_rejects_bad_cursors_and_fields(client):
+    assert client.get("/api/tickets", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/tickets", params={"fields": "id,nope"}).status_code == 400
+
+
+def test_ranked_pages_follow_the_rank_order(session, make_project):
+    pid = make_project("ranked")
+    add_tickets(session, pid, specs(2, 150))
+    for status in STATUS_ORDER:
+        expected = rank_store.ranked(session, pid, status, NOW).ids.tolist()
+        seen, cursor = [], None
+        while True:
+            rows, cursor = ranked_page(session, pid, status, 11, cursor, as_of=NOW)
+            seen += [t.id for t, _ in rows]
+            if cursor is None:
+                break
+            assert cursor.shown == len(seen)
+        assert seen == expected
+
+
+def test_dashboard_load_more_pages(client, session, make_project):
+    pid = make_project("dashboard")
+    add_tickets(session, pid, [{"status": "Active", "created_at": NOW - timedelta(days=i)} for i in range(23)])
+    home = client.get("/", params={"project_id": pid, "limit": 5})
+    assert home.status_code == 200
+    assert client.get("/", params={"project_id": pid, "limit": 5},
+                      headers={"If-None-Match": home.headers["ETag"]}).status_code == 304
+    cursor = re.search(r'data-status="Active" data-cursor="([^"]+)"', home.text).group(1)
+    rows = 5
+    while cursor:
+        resp = client.get("/dashboard/tickets", params={"project_id": pid, "status": "Active",
+                                                         "cursor": cursor, "limit": 5})
+        assert resp.status_code == 200
+        rows += resp.text.count("<tr>")
+        cursor = resp.headers.get("X-Next-Cursor")
+    assert rows == 23
+    assert client.get("/dashboard/tickets", params={"project_id": pid, "status": "Active",
+                                                     "cursor": "garbage"}).status_code == 400
+
+
+def test_validators_change_with_writes_from_any_connection(client, session, make_project):
+    pid = make_project("etag")
+    ids = add_tickets(session, pid, specs(4, 10))
+    first = client.get("/api/tickets", params={"project_id": pid, "fresh": True})
+    etag = first.headers["ETag"]
+    assert client.get("/api/tickets", params={"project_id": pid}, headers={"If-None-Match": etag}).status_code == 304
+
+    # Not through this app's write paths: only the database version changes.
+    with Session(engine) as other:
+        other.execute(update(Ticket).where(Ticket.id == ids[0]).values(title="renamed elsewhere"))
+        other.commit()
+    changed = client.get("/api/tickets", params={"project_id": pid}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "renamed elsewhere" in {t["title"] for t in changed.json()["items"]}
+
+    # A score pass rewrites stored columns without a write.
+    etag = changed.headers["ETag"]
+    client.post("/api/tickets/recalc")
+    assert client.get("/api/tickets", params={"project_id": pid}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def link_duplicates(session, ids, rng):
+    """Link about half of ``ids`` to an older ticket, as dedup does; returns ``id -> group``."""
+    group = {tid: tid for tid in ids}
+    for i, tid in enumerate(ids[1:], 1):
+        if rng.random() < 0.5:
+            group[tid] = group[ids[rng.randrange(i)]]
+            session.execute(update(Ticket).where(Ticket.id == tid).values(duplicate_of=group[tid]))
+    session.commit()
+    return group
+
+
+def first_of_each_group(ids, group):
+    seen = set()
+    return [tid for tid in ids if not (group[tid] in seen or seen.add(group[tid]))]
+
+
+def test_collapsed_pages_keep_the_best_of_each_group(client, session, make_project):
+    pid = make_project("collapse")
+    ids = add_tickets(session, pid, specs(5, 120))
+    group = link_duplicates(session, ids, random.Random(5))
+    score_projects(session, [pid])
+    for status in STATUS_ORDER:
+        expected = first_of_each_group(rank_store.ranked(session, pid, status, NOW).ids.tolist(), group)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = ranked_page(session, pid, status, 7, cursor, as_of=NOW, collapse=cursor is None)
+            seen += [t.id for t, _ in rows]
+            if cursor is None:
+                break
+            assert cursor.collapse
+        assert seen == expected
+
+    full = listing(client, 1000, project_id=pid)
+    collapsed = listing(client, 9, project_id=pid, collapse=True)
+    assert [t["id"] for t in collapsed] == [
+        tid for status in STATUS_ORDER
+        for tid in first_of_each_group([t["id"] for t in full if t["status"] == status], group)
+    ]
+    assert len(collapsed) < len(full)
+
+
+def test_dashboard_collapses_near_duplicates(client, session, make_project):
+    pid = make_project("dashboard")
+    ids = add_tickets(session, pid, [{"status": "Active", "created_at": NOW - timedelta(days=i)} for i in range(12)])
+    session.execute(update(Ticket).where(Ticket.id.in_(ids[1::2])).values(duplicate_of=ids[0]))
+    session.commit()
+    full = client.get("/", params={"project_id": pid, "limit": 20})
+    collapsed = client.get("/", params={"project_id": pid, "limit": 20, "collapse": True})
+    assert full.headers["ETag"] != collapsed.headers["ETag"]
+    assert full.text.count("<tr>") - collapsed.text.count("<tr>") == 6
+
+    # "Load more" follows the first page's cursor, collapsed too.
+    home = client.get("/", params={"project_id": pid, "limit": 2, "collapse": True})
+    cursor = re.search(r'data-status="Active" data-cursor="([^"]+)"', home.text).group(1)
+    rows = 2
+    while cursor:
+        resp = client.get("/dashboard/tickets", params={"project_id": pid, "status": "Active",
+                                                         "cursor": cursor, "limit": 2})
+        rows += resp.text.count("<tr>")
+        cursor = resp.headers.get("X-Next-Cursor")
+    assert rows == 6
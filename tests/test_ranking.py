@@ -0,0 +1,135 @@
+"""In-memory rankings (rank store, rank cache, next-up) against the SQL ranking."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.services.models import Project, Ticket
+from app.services.next_up import OPEN_STATUSES, next_up
+from app.services.rank_cache import rank_cache
+from app.services.rank_store import rank_store, record_writes
+from app.services.scoring import (
+    STATUS_ORDER, apply_score_coefficients, live_pscore_expr, ranked_tickets_stmt, score_projects,
+)
+from app.services.versions import lock_versions, read_versions
+
+from .conftest import add_tickets
+
+NOW = datetime(2026, 3, 1)
+PRIORITIES = ["Highest", "High", "Medium", "Low", "Backlog", None]
+
+
+def mixed_specs(seed: int, n: int = 300, category: str = None):
+    """Tickets with plenty of ties: shared created_at values, future-dated and flat lines."""
+    rng = random.Random(seed)
+    shared = [datetime(2026, 2, 1), datetime(2026, 6, 1), NOW]
+    for _ in range(n):
+        created = rng.choice(shared) if rng.random() < 0.3 else NOW + timedelta(days=rng.uniform(-300, 30))
+        yield {"priority": rng.choice(PRIORITIES), "status": rng.choice(list(STATUS_ORDER)),
+               "created_at": created, "category": category}
+
+
+def sql_order(session, project_id, status, now):
+    return [t.id for t in session.execute(ranked_tickets_stmt(project_id, now)).scalars() if t.status == status]
+
+
+def sql_next_up(session, now, limit, category=None):
+    stmt = select(Ticket.id).where(Ticket.status.in_(OPEN_STATUSES), Ticket.project_id.in_(select(Project.id)))
+    if category is not None:
+        stmt = stmt.where(Ticket.category == category)
+    score = live_pscore_expr(now)
+    return session.execute(stmt.order_by(score.desc(), Ticket.created_at, Ticket.id).limit(limit)).scalars().all()
+
+
+def test_rank_store_matches_ranked_tickets_stmt(session, make_project):
+    pid = make_project("rank")
+    add_tickets(session, pid, mixed_specs(1))
+    # Later dates bring future-dated tickets off their base weight.
+    for now in (NOW, NOW + timedelta(days=45)):
+        for status in STATUS_ORDER:
+            assert rank_store.ranked(session, pid, status, now).ids.tolist() == sql_order(session, pid, status, now)
+
+
+def test_stored_ranks_match_ranked_tickets_stmt(session, make_project):
+    pid = make_project("stored")
+    add_tickets(session, pid, mixed_specs(2))
+    score_projects(session, [pid], NOW)
+    for status in STATUS_ORDER:
+        stored = session.execute(
+            select(Ticket.id).where(Ticket.project_id == pid, Ticket.status == status).order_by(Ticket.ticket_order_id)
+        ).scalars().all()
+        assert stored == sql_order(session, pid, status, NOW)
+
+
+def test_rank_cache_follows_writes_from_other_connections(session, make_project):
+    pid = make_project("cache")
+    ids = add_tickets(session, pid, mixed_specs(3, n=50))
+    view = rank_cache.view(session, pid, "Active", NOW)
+    assert rank_cache.view(session, pid, "Active", NOW) is view
+
+    # A writer that never reports to this process: only the database version tells the cache.
+    with Session(engine) as other:
+        t = other.get(Ticket, ids[-1])
+        t.status, t.priority, t.created_at = "Active", "Highest", datetime(2020, 1, 1)
+        apply_score_coefficients(t)
+        other.commit()
+    fresh = rank_cache.view(session, pid, "Active", NOW)
+    assert fresh is not view
+    assert fresh.ids[0] == ids[-1]
+
+
+def test_next_up_matches_sql_order(session, make_project):
+    category = f"next-up-{make_project('next')}"
+    for _ in range(2):
+        add_tickets(session, make_project("next"), mixed_specs(4, category=category))
+    for limit in (1, 7, 50, 400, 1000):
+        got = [tid for tid, _, _ in next_up.top(session, limit, now=NOW, category=category)]
+        assert got == sql_next_up(session, NOW, limit, category)
+
+
+def test_next_up_keeps_sql_tie_break_across_writes(session, make_project):
+    pid = make_project("ties")
+    category = f"ties-{pid}"
+    # Same lane, same created_at in the future: all clamped at base, tied on every key but id.
+    ids = add_tickets(session, pid, [{"priority": "High", "status": "Backlog", "created_at": NOW + timedelta(days=90),
+                                      "category": category}] * 3)
+    assert [tid for tid, _, _ in next_up.top(session, 1, now=NOW, category=category)] == [ids[0]]
+    reloads = next_up.stats()["reloads"]
+
+    first = session.get(Ticket, ids[0])
+    for status in ("Active", "Backlog"):
+        before = lock_versions(session, [pid])
+        first.status = status
+        session.flush()
+        after = read_versions(session, [pid])
+        session.commit()
+        record_writes(before, after, [first])
+    # Re-inserted last, the lowest id still ranks first among its ties.
+    for limit in (1, 2, 3):
+        assert [tid for tid, _, _ in next_up.top(session, limit, now=NOW, category=category)] == ids[:limit]
+    assert next_up.stats()["reloads"] == reloads
+
+
+def test_next_up_merges_a_burst_of_writes(session, make_project):
+    pid = make_project("burst")
+    category = f"burst-{pid}"
+    ids = add_tickets(session, pid, mixed_specs(5, n=200, category=category))
+    next_up.top(session, 1, now=NOW)
+    rng = random.Random(6)
+    for tid in rng.sample(ids, 40):
+        t = session.get(Ticket, tid)
+        before = lock_versions(session, [pid])
+        t.priority, t.status = rng.choice(PRIORITIES[:-1]), rng.choice(OPEN_STATUSES)
+        apply_score_coefficients(t)
+        session.flush()
+        after = read_versions(session, [pid])
+        session.commit()
+        record_writes(before, after, [t])
+    reloads = next_up.stats()["reloads"]
+    got = [tid for tid, _, _ in next_up.top(session, 100, now=NOW, category=category)]
+    assert got == sql_next_up(session, NOW, 100, category)
+    assert next_up.stats()["reloads"] == reloads
@@ -0,0 +1,112 @@
+"""Rescore scheduler freshness and the per-project scoring watermark."""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db import engine
+from app.services.models import Ticket
+from app.services.rescoring import RescoreScheduler
+from app.services.scoring import score_projects
+from app.services.scoring_state import stale_projects
+from app.services.versions import read_validators, unscored_projects
+
+from .conftest import add_tickets
+
+
+def stored_orders(session, project_id):
+    session.expire_all()
+    return dict(session.execute(
+        select(Ticket.id, Ticket.ticket_order_id).where(Ticket.project_id == project_id)
+    ).all())
+
+
+def test_wait_fresh_rescores_inline_without_a_running_scheduler(session, make_project):
+    pid = make_project("inline")
+    ids = add_tickets(session, pid, [{"priority": "Low"}, {"priority": "Highest"}])
+    scheduler = RescoreScheduler(debounce=60, max_staleness=60)
+    scheduler.engine = engine
+
+    assert scheduler.mark_dirty([pid]) == {pid: 1}
+    assert not scheduler.is_fresh(pid)
+    assert scheduler.wait_fresh([pid])
+    assert scheduler.is_fresh(pid)
+    orders = stored_orders(session, pid)
+    assert orders[ids[1]] < orders[ids[0]]
+
+
+def test_wait_fresh_skips_the_debounce(session, make_project):
+    pid = make_project("urgent")
+    add_tickets(session, pid, [{"priority": "High"}])
+    scheduler = RescoreScheduler(debounce=60, max_staleness=60)
+    scheduler.start(engine)
+    try:
+        scheduler.mark_dirty([pid])
+        started = time.monotonic()
+        assert scheduler.wait_fresh([pid], timeout=10)
+        assert time.monotonic() - started < 10
+        assert scheduler.is_fresh(pid)
+        assert scheduler.stats()["projects_rescored"] == 1
+    finally:
+        scheduler.stop()
+
+
+def test_a_burst_of_writes_is_rescored_once(session, make_project):
+    pid = make_project("burst")
+    add_tickets(session, pid, [{"priority": "Medium"}])
+    scheduler = RescoreScheduler(debounce=60, max_staleness=60)
+    scheduler.engine = engine
+    for _ in range(5):
+        scheduler.mark_dirty([pid])
+    assert not scheduler.is_fresh(pid)
+    scheduler.flush()
+    assert scheduler.is_fresh(pid)
+    assert scheduler.stats() == {"dirty_projects": 0, "marks": 5, "rescores": 1, "projects_rescored": 1}
+
+
+def test_api_writes_are_fresh_after_fresh_listing(client, make_project):
+    pid = make_project("api")
+    for priority in ("Low", "Highest", "Medium"):
+        resp = client.post("/api/tickets", json={"title": f"{priority} one", "project_id": pid,
+                                                 "priority": priority, "status": "Active"})
+        assert resp.status_code == 200, resp.text
+    listed = client.get("/api/tickets", params={"project_id": pid, "fresh": True}).json()["items"]
+    assert [t["priority"] for t in listed] == ["Highest", "Medium", "Low"]
+    assert [t["ticket_order_id"] for t in listed] == sorted(t["ticket_order_id"] for t in listed)
+
+
+def test_score_passes_advance_the_watermark(session, make_project):
+    pid = make_project("watermark")
+    ids = add_tickets(session, pid, [{"priority": "Low"}])
+    assert pid in unscored_projects(session)
+    assert pid in stale_projects(session)
+
+    score_projects(session, [pid], datetime(2026, 3, 1))
+    assert pid not in unscored_projects(session)
+    assert pid not in stale_projects(session)
+
+    # Any writer bumps the version; score passes only move the watermark and rescore count.
+    (_, version, rescores), = read_validators(session, [pid])[0]
+    session.execute(update(Ticket).where(Ticket.id == ids[0]).values(title="renamed"))
+    session.commit()
+    assert pid in unscored_projects(session)
+    score_projects(session, [pid], datetime(2026, 3, 1))
+    assert read_validators(session, [pid])[0] == ((pid, version + 1, rescores + 1),)
+    assert pid not in unscored_projects(session)
+
+
+def test_api_and_form_writes_store_the_same_pscore(client, session, make_project):
+    pid = make_project("pscore")
+    created = client.post("/api/tickets", json={"title": "api", "project_id": pid, "priority": "High"}).json()
+    client.post("/add_ticket", data={"title": "form", "project_id": pid, "priority": "High", "status": "Backlog",
+                                     "category": "Product Management"})
+    session.expire_all()
+    form = session.execute(select(Ticket).where(Ticket.project_id == pid, Ticket.title == "form")).scalar_one()
+    assert created["pscore"] > 0
+    assert created["pscore"] == pytest.approx(form.pscore, abs=0.01)
+
+    updated = client.patch(f"/api/tickets/{created['id']}", json={"priority": "Highest"}).json()
+    assert updated["pscore"] > created["pscore"]
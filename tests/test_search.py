@@ -0,0 +1,27 @@
+"""Full-text search: every match is ranked, however old."""
+from __future__ import annotations
+
+from app.services.search import SEARCH_CANDIDATES, search_tickets
+
+from .conftest import add_tickets
+
+
+def test_oldest_best_match_outranks_newer_weak_ones(session, make_project):
+    pid = make_project("search")
+    word = f"quokka{pid}"
+    best, *_ = add_tickets(session, pid, [{"title": f"{word} {word} crashes"}])
+    add_tickets(session, pid, [{"title": f"report {i} mentions {word} once among many other words"}
+                               for i in range(SEARCH_CANDIDATES + 50)])
+    items = search_tickets(session, word, ["id", "title"], limit=5)
+    assert items[0]["id"] == best
+    assert len(search_tickets(session, word, ["id"], limit=500, project_id=pid)) == SEARCH_CANDIDATES + 51
+
+
+def test_filters_are_exact(session, make_project):
+    pid, other = make_project("search"), make_project("search")
+    word = f"wombat{pid}"
+    mine = add_tickets(session, pid, [{"title": word, "status": s} for s in ("Active", "Completed")])
+    add_tickets(session, other, [{"title": word}])
+    assert {i["id"] for i in search_tickets(session, word, ["id"], project_id=pid)} == set(mine)
+    assert [i["id"] for i in search_tickets(session, word, ["id"], project_id=pid, status="Completed")] == mine[1:]
+    assert search_tickets(session, "!!!", ["id"]) == []
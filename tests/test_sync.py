@@ -0,0 +1,53 @@
+"""Manual sync triggers: configured scopes only, and a bounded wait."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.db import engine
+from app.integrations.base import SyncResult
+from app.integrations.engine import SourceSpec, SyncEngine
+from app.routers import sync as sync_router
+from app.services.ingest import IngestReport
+
+
+class FakeClient:
+    """Syncs a scope instantly, except ``slow``, which outlasts any wait."""
+
+    async def sync_scope(self, scope: str) -> SyncResult:
+        if scope == "slow":
+            await asyncio.sleep(60)
+        return SyncResult("fake", scope, IngestReport("fake"))
+
+    async def aclose(self) -> None:
+        pass
+
+
+def run_trigger(monkeypatch, scope, wait: bool):
+    fake = SyncEngine(sources={"fake": SourceSpec("fake", ["fast", "slow"], factory=lambda *a: FakeClient())},
+                      platform_map={})
+    monkeypatch.setattr(sync_router, "sync_engine", fake)
+    monkeypatch.setattr(sync_router, "WAIT_TIMEOUT", 0.2)
+
+    async def go():
+        await fake.start(engine, schedule=False)
+        try:
+            return await sync_router.trigger_sync("fake", scope, wait)
+        finally:
+            await fake.stop()
+    return asyncio.run(go())
+
+
+def test_unconfigured_scopes_are_rejected(monkeypatch):
+    with pytest.raises(HTTPException) as e:
+        run_trigger(monkeypatch, ["fast", "someone-elses/repo"], wait=False)
+    assert e.value.status_code == 404
+    assert "someone-elses/repo" in e.value.detail
+
+
+def test_wait_returns_pending_scopes_after_the_timeout(monkeypatch):
+    body = run_trigger(monkeypatch, ["fast", "slow"], wait=True)
+    assert [r["scope"] for r in body["results"]] == ["fast"]
+    assert body["pending"] == ["slow"]